@@ -0,0 +1,79 @@
+"""
+Backfill team_members from the legacy Registration.members blob
+Walks bulk registrations that have no team_members rows yet in id order and
+inserts their members in batches (one multi-row INSERT per batch).
+Safe to re-run: registrations that already have members are skipped.
+
+Usage:
+    python backfill_team_members.py              # default batch size (500)
+    python backfill_team_members.py 1000         # custom batch size
+"""
+import sys
+
+from sqlalchemy import select, insert, exists
+
+from database import SessionLocal
+from models.registration import Registration
+from models.team_member import TeamMember
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def backfill_team_members(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Migrate members blobs batch by batch, returns the number of registrations migrated"""
+    db = SessionLocal()
+    last_id = 0
+    migrated = 0
+    try:
+        while True:
+            batch = db.execute(
+                select(
+                    Registration.id,
+                    Registration.name,
+                    Registration.email,
+                    Registration.phone,
+                    Registration.members
+                )
+                .where(
+                    Registration.id > last_id,
+                    Registration.members.isnot(None),
+                    ~exists().where(TeamMember.registration_id == Registration.id)
+                )
+                .order_by(Registration.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+
+            rows = []
+            for reg in batch:
+                member_names = TeamMember.parse_names(reg.members)
+                if member_names:
+                    rows.extend(
+                        {"registration_id": reg.id, **row}
+                        for row in TeamMember.build_rows(reg.name, reg.email, reg.phone, member_names)
+                    )
+                    migrated += 1
+
+            if rows:
+                db.execute(insert(TeamMember), rows)
+            db.commit()
+
+            last_id = batch[-1].id
+            print(f"  ✅ Migrated up to registration #{last_id} ({migrated} total)")
+
+        return migrated
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill failed after registration #{last_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH_SIZE
+    print(f"🔧 Backfilling team_members (batch size {size})...")
+    count = backfill_team_members(size)
+    print(f"✅ Backfill complete: {count} registration(s) migrated")
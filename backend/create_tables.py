@@ -22,6 +22,9 @@ from models.settings import (
     EmailTemplateConfig
 )
 from models.team_member import TeamMember
+from models.venue_counter import VenueCounter
+from models.gate_rollup import GateRollup
+from migrate import stamp_db
 
 def create_tables():
     """Create all database tables"""
@@ -37,13 +40,16 @@ def create_tables():
         print("📦 Creating new tables...")
         Base.metadata.create_all(bind=engine)
         
+        # Fresh schema already matches the latest migration
+        stamp_db()
+        
         print("\n✅ Database tables created successfully!")
         print("\n📋 Core Tables (Active):")
         print("  1. registrations - Main registration data")
         print("  2. team_members - Team member details (normalized)")
         print("  3. payments - Payment records (no redundant payment_type)")
-        print("  4. tickets - Generated QR code tickets")
-        print("  5. attendance - Check-in/check-out tracking")
+        print("  4. tickets - Generated QR code tickets with check-in state")
+        print("  5. attendance - Legacy check-in records (state now on tickets)")
         print("  6. messages - Email/notification logs")
         print("  7. admins - Admin user accounts")
         print("  8. audit_logs - Admin action tracking")
@@ -1,10 +1,19 @@
 import os
+import ssl
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from utils.db_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -37,11 +46,194 @@ else:
         }
     }
 
+# Connection pool tuning
+# DB_POOL_PRE_PING: "always" pings on every checkout (one extra round trip),
+# "never" skips it and relies on DB_POOL_RECYCLE to retire idle connections
+# before the server or a proxy drops them
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").lower()
+DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "True").lower() == "true"
+
+if DB_POOL_PRE_PING not in ("always", "never"):
+    raise ValueError("DB_POOL_PRE_PING must be 'always' or 'never'")
+
+pool_args = {
+    "poolclass": InstrumentedQueuePool,
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING == "always",
+    # LIFO keeps a small hot set of connections busy so idle extras can time out
+    "pool_use_lifo": DB_POOL_USE_LIFO,
+}
+
 # Create SQLAlchemy engine for PostgreSQL with SSL
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, **ssl_args)
+engine = create_engine(DATABASE_URL, **pool_args, **ssl_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+def get_async_database_url(url: str) -> str:
+    """
+    Derive the async driver URL from DATABASE_URL
+    postgresql[+psycopg2]:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        # asyncpg takes SSL settings through connect_args, not libpq query options
+        parsed = parsed.set(drivername="postgresql+asyncpg").difference_update_query(
+            ["sslmode", "sslrootcert"]
+        )
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+
+
+def get_async_connect_args(url: str) -> dict:
+    """
+    asyncpg SSL: verify against the bundled CA when present, otherwise just require TLS
+    """
+    if make_url(url).get_backend_name() != "postgresql":
+        return {}
+    if os.path.exists(cert_path):
+        return {"ssl": ssl.create_default_context(cafile=cert_path)}
+    return {"ssl": "require"}
+
+
+async_connect_args = get_async_connect_args(ASYNC_DATABASE_URL)
+
+async_pool_args = dict(pool_args, poolclass=InstrumentedAsyncQueuePool)
+
+# Async engine for routes on the request hot path (ticket scanning, registration, admin lists)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=async_connect_args,
+    **async_pool_args
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# ==================== READ REPLICA ====================
+# Reporting queries (admin lists, stats, audit browsing, exports) can be routed to a
+# replica via get_read_db / get_async_read_db. Without DATABASE_READ_URL, or when the
+# replica is unreachable or lags more than DB_READ_MAX_LAG_SECONDS, they use the primary.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+DB_READ_MAX_LAG_SECONDS = float(os.getenv("DB_READ_MAX_LAG_SECONDS", 5))
+DB_READ_LAG_CHECK_INTERVAL = float(os.getenv("DB_READ_LAG_CHECK_INTERVAL", 5))
+
+# Seconds behind the primary; 0 when all received WAL is replayed (idle replica)
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+read_engine = None
+async_read_engine = None
+ReadSessionLocal = SessionLocal
+AsyncReadSessionLocal = AsyncSessionLocal
+
+if DATABASE_READ_URL:
+    read_engine = create_engine(DATABASE_READ_URL, **pool_args, **ssl_args)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+    ASYNC_DATABASE_READ_URL = get_async_database_url(DATABASE_READ_URL)
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_READ_URL,
+        connect_args=get_async_connect_args(ASYNC_DATABASE_READ_URL),
+        **async_pool_args
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=async_read_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+class ReplicaState:
+    """
+    Cached replica health - re-checked at most every DB_READ_LAG_CHECK_INTERVAL seconds
+    """
+
+    def __init__(self):
+        self.checked_at = 0.0
+        self.usable = read_engine is not None
+        self.lag_seconds = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+    def due(self) -> bool:
+        return time.monotonic() - self.checked_at >= DB_READ_LAG_CHECK_INTERVAL
+
+    def record(self, lag_seconds):
+        self.checked_at = time.monotonic()
+        self.lag_seconds = float(lag_seconds or 0)
+        self.usable = self.lag_seconds <= DB_READ_MAX_LAG_SECONDS
+        self.error = None
+
+    def record_failure(self, error: Exception):
+        self.checked_at = time.monotonic()
+        self.usable = False
+        self.error = str(error)
+
+    def check(self) -> bool:
+        if read_engine is None:
+            return False
+        if self.due():
+            with self._lock:
+                if self.due():
+                    try:
+                        with read_engine.connect() as conn:
+                            self.record(self._measure(conn))
+                    except Exception as e:
+                        self.record_failure(e)
+        return self.usable
+
+    async def check_async(self) -> bool:
+        if async_read_engine is None:
+            return False
+        if self.due():
+            async with self._async_lock:
+                if self.due():
+                    try:
+                        async with async_read_engine.connect() as conn:
+                            self.record(await conn.run_sync(self._measure))
+                    except Exception as e:
+                        self.record_failure(e)
+        return self.usable
+
+    @staticmethod
+    def _measure(conn):
+        if conn.dialect.name != "postgresql":
+            return 0
+        return conn.execute(REPLICA_LAG_SQL).scalar()
+
+    def status(self) -> dict:
+        return {
+            "configured": read_engine is not None,
+            "usable": self.usable,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": DB_READ_MAX_LAG_SECONDS,
+            "error": self.error,
+        }
+
+
+replica_state = ReplicaState()
+
+
 # Create Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
@@ -57,6 +249,46 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Get async database session
+    Use in async routes so queries do not block the event loop
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db():
+    """
+    Get read-only database session
+    Bound to the replica when it is configured and fresh enough, otherwise the primary
+    """
+    db = ReadSessionLocal() if replica_state.check() else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_read_session():
+    """
+    Async read-only session outside a request (replica with primary fallback)
+    For work that may outlive the request that started it, e.g. shared cache loads
+    """
+    session_factory = AsyncReadSessionLocal if await replica_state.check_async() else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """
+    Get async read-only database session (replica with primary fallback)
+    """
+    async with async_read_session() as db:
+        yield db
+
+
 def get_supabase():
     """
     Get Supabase client
@@ -67,5 +299,19 @@ def get_supabase():
 def init_db():
     """
     Initialize database tables
+    A fresh database is built with create_all and stamped at the latest migration;
+    an existing one is brought up to date with the pending migrations.
+    Set AUTO_MIGRATE=false to run `python migrate.py` manually instead.
     """
+    from migrate import upgrade_db, stamp_db
+
+    auto_migrate = os.getenv("AUTO_MIGRATE", "True").lower() == "true"
+    fresh = not inspect(engine).has_table("registrations")
+
+    if auto_migrate and not fresh:
+        upgrade_db()
+
     Base.metadata.create_all(bind=engine)
+
+    if auto_migrate and fresh:
+        stamp_db()
@@ -4,14 +4,23 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from database import init_db
-from routes import registration, admin, ticket, test, settings
+from routes import registration, admin, ticket, test, settings, files
 from utils.storage import initialize_storage_buckets
+from utils.ticket_bundle import shutdown_bundle_workers
+from utils.email_templates import load_templates
+from utils.bulk_mailer import resume_mail_jobs, stop_mail_jobs
+from utils.ticket_index import ticket_index, TICKET_INDEX_ENABLED
+from utils.invalidation import invalidation_bus
+from utils.occupancy import ensure_counters
+from utils.gate_stats import gate_stats, GATE_STATS_ENABLED
+from utils.scanner_hub import scanner_hub, SCANNER_PUSH_ENABLED
 
 # Import for test route
 from fastapi import File, UploadFile, HTTPException
@@ -23,14 +32,46 @@ async def lifespan(app: FastAPI):
     """Initialize database and storage on startup"""
     print("🚀 Initializing database...")
     init_db()
+    ensure_counters()
     print("✅ Database initialized successfully!")
     
-    print("☁️  Initializing Cloudinary storage...")
+    print("☁️  Initializing file storage...")
     await initialize_storage_buckets()
-    print("✅ Cloudinary storage ready!")
+    print("✅ File storage ready!")
+    
+    load_templates()
+    
+    # Bulk mail jobs - resumes jobs left unfinished by a previous run or crashed worker
+    mail_supervisor = asyncio.create_task(resume_mail_jobs())
+    
+    # Cache invalidations from other workers / replicas (Postgres LISTEN)
+    invalidation_listener = asyncio.create_task(invalidation_bus.run())
+    
+    # Ticket state for /verify-ticket - loaded in the background, then kept in sync
+    ticket_index_sync = asyncio.create_task(ticket_index.run()) if TICKET_INDEX_ENABLED else None
+    
+    # Per-gate scan stats - flushed to gate_rollups in the background
+    gate_stats_flusher = asyncio.create_task(gate_stats.run()) if GATE_STATS_ENABLED else None
+    
+    # Ticket state changes pushed to scanners on /ws/scanner
+    scanner_push = asyncio.create_task(scanner_hub.run()) if SCANNER_PUSH_ENABLED else None
     
     yield
     print("👋 Shutting down...")
+    mail_supervisor.cancel()
+    invalidation_listener.cancel()
+    if ticket_index_sync:
+        ticket_index_sync.cancel()
+    if scanner_push:
+        scanner_push.cancel()
+    if gate_stats_flusher:
+        gate_stats_flusher.cancel()
+        try:
+            await gate_stats.flush()
+        except Exception as e:
+            print(f"⚠️  Final gate stats flush failed: {e}")
+    await stop_mail_jobs()
+    shutdown_bundle_workers()
 
 
 app = FastAPI(
@@ -104,8 +145,9 @@ app.add_middleware(
     allow_origins=["*"] if "*" in str(cors_origins) else cors_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With"],
-    expose_headers=["Content-Length", "Content-Type"],
+    allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With", "Idempotency-Key",
+                   "X-Scanner-Gate", "X-Scanner-Device", "X-Scan-Latency-Ms"],
+    expose_headers=["Content-Length", "Content-Type", "Idempotent-Replayed"],
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
@@ -128,11 +170,17 @@ app.include_router(admin.router)
 app.include_router(ticket.router)
 app.include_router(test.router)  # Test endpoints
 app.include_router(settings.router)  # Settings API
+app.include_router(files.router)  # Local/memory storage file serving
 
 # Import admin management and audit routers
-from routes import admin_management, audit
+from routes import admin_management, audit, metrics, mail_jobs, export, search, scanner_ws
 app.include_router(admin_management.router)  # Admin CRUD API
 app.include_router(audit.router)  # Audit logs API
+app.include_router(metrics.router)  # Runtime metrics API
+app.include_router(mail_jobs.router)  # Bulk announcement / reminder mail
+app.include_router(export.router)  # CSV / XLSX exports
+app.include_router(search.router)  # Participant search
+app.include_router(scanner_ws.router)  # Scanner device WebSocket
 
 
 @app.get("/")
@@ -150,8 +198,8 @@ async def root(request: Request):
 @limiter.limit("5/minute")
 async def test_upload(request: Request, file: UploadFile = File(...)):
     """
-    Test endpoint to verify Cloudinary upload is working
-    Upload any image file to test the integration
+    Test endpoint to verify file storage upload is working
+    Upload any image file to test the configured storage backend
     """
     try:
         # Validate file type
@@ -165,18 +213,18 @@ async def test_upload(request: Request, file: UploadFile = File(...)):
         # Read file content
         file_content = await file.read()
         
-        # Upload to Cloudinary
+        # Upload to the configured storage backend
         file_url = await upload_payment_screenshot(file_content, file.filename)
         
         if not file_url:
             raise HTTPException(
                 status_code=500,
-                detail="Failed to upload file to Cloudinary"
+                detail="Failed to upload file to storage"
             )
         
         return {
             "success": True,
-            "message": "File uploaded successfully to Cloudinary!",
+            "message": "File uploaded successfully!",
             "file_url": file_url,
             "filename": file.filename,
             "content_type": file.content_type,
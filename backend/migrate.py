@@ -0,0 +1,45 @@
+"""
+Schema migration runner
+Wraps Alembic so the app, create_tables.py and operators share one entry point
+
+Usage:
+    python migrate.py            # upgrade to the latest revision
+    python migrate.py stamp      # mark a create_all-built database as up to date
+"""
+import os
+import sys
+
+from alembic import command
+from alembic.config import Config
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    # Keep the application's logging setup when invoked in-process
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_db(revision: str = "head"):
+    """Apply pending migrations"""
+    command.upgrade(get_alembic_config(), revision)
+
+
+def stamp_db(revision: str = "head"):
+    """Record the schema as migrated without running migrations"""
+    command.stamp(get_alembic_config(), revision)
+
+
+if __name__ == "__main__":
+    action = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if action == "upgrade":
+        upgrade_db()
+    elif action == "stamp":
+        stamp_db()
+    else:
+        print(f"Unknown action '{action}'. Use: upgrade, stamp")
+        sys.exit(1)
+    print(f"✅ Migration '{action}' complete")
@@ -0,0 +1,72 @@
+"""
+Alembic environment - uses the application's engine and model metadata
+"""
+from logging.config import fileConfig
+import os
+import sys
+
+from alembic import context
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, engine
+import models.registration  # noqa: F401 - register tables on Base.metadata
+import models.settings  # noqa: F401
+import models.team_member  # noqa: F401
+import models.mail_job  # noqa: F401
+import models.idempotency_key  # noqa: F401
+import models.venue_counter  # noqa: F401
+import models.gate_rollup  # noqa: F401
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Serializes migrations when several workers start at once (Postgres only)
+MIGRATION_LOCK_ID = 804200301
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout instead of executing it (alembic upgrade head --sql)"""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                # SQLite cannot ALTER most things in place
+                render_as_batch=connection.dialect.name == "sqlite",
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,51 @@
+"""
+Dialect-aware helpers shared by migration scripts
+Index operations are idempotent so they are safe on databases built by create_all
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+
+def is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def true_literal() -> str:
+    return "true" if is_postgres() else "1"
+
+
+def has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(op.get_bind()).get_columns(table))
+
+
+def create_index(
+    name: str, table: str, columns: str, where: str = None, unique: bool = False, using: str = None
+):
+    """
+    CREATE INDEX IF NOT EXISTS - built CONCURRENTLY on Postgres so live tables stay writable
+    Skipped when the table does not exist yet (create_all builds it with the index)
+    """
+    if not has_table(table):
+        return
+    unique_sql = "UNIQUE " if unique else ""
+    where_sql = f" WHERE {where}" if where else ""
+    using_sql = f" USING {using}" if using else ""
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.execute(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}{using_sql} ({columns}){where_sql}"
+            )
+    else:
+        op.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns}){where_sql}")
+
+
+def drop_index(name: str):
+    if is_postgres():
+        with op.get_context().autocommit_block():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    else:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
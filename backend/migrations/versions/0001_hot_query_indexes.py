@@ -0,0 +1,54 @@
+"""Indexes for hot query filters
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Covers the filters used by ticket scanning, the admin dashboard and audit browsing:
+- payments.status and pending payments (partial)
+- tickets.registration_id
+- registrations.created_at (dashboard ordering)
+- audit_logs (admin_id, created_at)
+- attendance check-ins (partial)
+- messages / team_members registration_id foreign keys
+"""
+from typing import Sequence, Union
+
+from migrations.helpers import create_index, drop_index, true_literal
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index("ix_payments_status", "payments", "status")
+    create_index("ix_payments_pending", "payments", "created_at", where="status = 'PENDING'")
+    create_index("ix_tickets_registration_id", "tickets", "registration_id")
+    create_index("ix_registrations_created_at", "registrations", "created_at")
+    create_index("ix_audit_logs_admin_id_created_at", "audit_logs", "admin_id, created_at")
+    create_index(
+        "ix_attendance_checked_in", "attendance", "check_in_time",
+        where=f"checked_in = {true_literal()}"
+    )
+    create_index("ix_messages_registration_id", "messages", "registration_id")
+    create_index("ix_team_members_registration_id", "team_members", "registration_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in [
+        "ix_team_members_registration_id",
+        "ix_messages_registration_id",
+        "ix_attendance_checked_in",
+        "ix_audit_logs_admin_id_created_at",
+        "ix_registrations_created_at",
+        "ix_tickets_registration_id",
+        "ix_payments_pending",
+        "ix_payments_status",
+    ]:
+        drop_index(name)
@@ -0,0 +1,36 @@
+"""Ticket serial sequence
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+Sequence used by utils.serials.SerialAllocator to reserve blocks of ticket
+serial numbers (Postgres only - other databases use an in-process counter).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migrations.helpers import is_postgres
+from utils.serials import SERIAL_BLOCK_SIZE
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if is_postgres():
+        op.execute(
+            f"CREATE SEQUENCE IF NOT EXISTS ticket_serial_seq START WITH 1 INCREMENT BY {SERIAL_BLOCK_SIZE}"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if is_postgres():
+        op.execute("DROP SEQUENCE IF EXISTS ticket_serial_seq")
@@ -0,0 +1,61 @@
+"""Mail jobs for bulk announcements
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Adds the mail_jobs table used by utils.bulk_mailer.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_table
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+message_type = sa.Enum("CONFIRMATION", "APPROVAL", "REJECTION", "REMINDER", name="messagetype", create_type=False)
+mail_job_state = sa.Enum("PENDING", "RUNNING", "COMPLETED", "FAILED", "CANCELLED", name="mailjobstate")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if has_table("mail_jobs"):
+        return
+    op.create_table(
+        "mail_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("message_type", message_type, nullable=False),
+        sa.Column("subject", sa.String(255), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("status_filter", sa.String(20), nullable=True),
+        sa.Column("payment_type_filter", sa.String(20), nullable=True),
+        sa.Column("state", mail_job_state, nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("sent", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("last_registration_id", sa.Integer(), nullable=False),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("worker_id", sa.String(64), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("created_by", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_mail_jobs_id", "mail_jobs", ["id"])
+    op.create_index("ix_mail_jobs_state", "mail_jobs", ["state"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_mail_jobs_state", table_name="mail_jobs")
+    op.drop_index("ix_mail_jobs_id", table_name="mail_jobs")
+    op.drop_table("mail_jobs")
+    mail_job_state.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,54 @@
+"""Idempotency keys for requests and outbound messages
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+Adds messages.idempotency_key (unique) and the idempotency_keys table used by
+utils.idempotency.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_table, has_column, create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_column("messages", "idempotency_key"):
+        op.add_column("messages", sa.Column("idempotency_key", sa.String(128), nullable=True))
+    create_index("uq_messages_idempotency_key", "messages", "idempotency_key", unique=True)
+
+    if has_table("idempotency_keys"):
+        return
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("key", sa.String(255), nullable=False),
+        sa.Column("scope", sa.String(255), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("response_body", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("key", "scope", name="uq_idempotency_keys_key_scope"),
+    )
+    op.create_index("ix_idempotency_keys_id", "idempotency_keys", ["id"])
+    op.create_index("ix_idempotency_keys_created_at", "idempotency_keys", ["created_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_idempotency_keys_created_at", table_name="idempotency_keys")
+    op.drop_index("ix_idempotency_keys_id", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
+    drop_index("uq_messages_idempotency_key")
+    with op.batch_alter_table("messages") as batch_op:
+        batch_op.drop_column("idempotency_key")
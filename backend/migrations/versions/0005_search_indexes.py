@@ -0,0 +1,57 @@
+"""Participant search indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+Postgres only - enables pg_trgm and adds the GIN indexes behind /api/admin/search:
+- registrations: trigram index on the search document, tsvector on name + team name
+- team_members: trigram index on lower(name)
+- tickets: trigram index on serial_code
+The expressions must match models.registration.search_document / search_tsvector.
+SQLite uses the in-memory index in utils.search_index instead.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from migrations.helpers import is_postgres, create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not is_postgres():
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    create_index(
+        "ix_registrations_search_trgm", "registrations",
+        "lower(name || ' ' || email || ' ' || phone || ' ' || coalesce(team_name, '')) gin_trgm_ops",
+        using="gin"
+    )
+    create_index(
+        "ix_registrations_search_tsv", "registrations",
+        "to_tsvector('simple', name || ' ' || coalesce(team_name, ''))",
+        using="gin"
+    )
+    create_index("ix_team_members_name_trgm", "team_members", "lower(name) gin_trgm_ops", using="gin")
+    create_index("ix_tickets_serial_code_trgm", "tickets", "serial_code gin_trgm_ops", using="gin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not is_postgres():
+        return
+    for name in [
+        "ix_tickets_serial_code_trgm",
+        "ix_team_members_name_trgm",
+        "ix_registrations_search_tsv",
+        "ix_registrations_search_trgm",
+    ]:
+        drop_index(name)
@@ -0,0 +1,42 @@
+"""Changes cursor for the worker ticket index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Adds tickets.updated_at (backfilled from created_at) and indexes updated_at on
+tickets, attendance, payments and registrations - utils.ticket_index polls
+each of them for rows changed since its last sync.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_column, create_index, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CURSOR_TABLES = ("tickets", "attendance", "payments", "registrations")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_column("tickets", "updated_at"):
+        op.add_column("tickets", sa.Column("updated_at", sa.DateTime(), nullable=True))
+        op.execute("UPDATE tickets SET updated_at = created_at")
+    for table in CURSOR_TABLES:
+        create_index(f"ix_{table}_updated_at", table, "updated_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in CURSOR_TABLES:
+        drop_index(f"ix_{table}_updated_at")
+    with op.batch_alter_table("tickets") as batch_op:
+        batch_op.drop_column("updated_at")
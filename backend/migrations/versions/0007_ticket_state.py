@@ -0,0 +1,78 @@
+"""Denormalized ticket state
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+Adds tickets.state, checked_in_at and checked_out_at and fills them from the
+payment status, the is_active flag and the attendance rows, so verification
+reads one ticket row. The attendance table is kept (no longer written).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_column, is_postgres, true_literal
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ticket_state = sa.Enum(
+    "PENDING", "VALID", "REJECTED", "DEACTIVATED", "CHECKED_IN", "CHECKED_OUT", name="ticketstate"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if has_column("tickets", "state"):
+        return
+    ticket_state.create(op.get_bind(), checkfirst=True)
+    op.add_column("tickets", sa.Column("state", ticket_state, nullable=True))
+    op.add_column("tickets", sa.Column("checked_in_at", sa.DateTime(), nullable=True))
+    op.add_column("tickets", sa.Column("checked_out_at", sa.DateTime(), nullable=True))
+
+    true = true_literal()
+    op.execute(f"""
+        UPDATE tickets SET
+            checked_in_at = (
+                SELECT check_in_time FROM attendance
+                WHERE attendance.ticket_id = tickets.id AND attendance.checked_in = {true}
+            ),
+            checked_out_at = (
+                SELECT check_out_time FROM attendance
+                WHERE attendance.ticket_id = tickets.id AND attendance.checked_out = {true}
+            )
+    """)
+    state_sql = f"""CASE
+        WHEN is_active <> {true} THEN 'DEACTIVATED'
+        WHEN checked_out_at IS NOT NULL THEN 'CHECKED_OUT'
+        WHEN checked_in_at IS NOT NULL THEN 'CHECKED_IN'
+        ELSE CASE (
+            SELECT CAST(payments.status AS VARCHAR) FROM payments
+            WHERE payments.registration_id = tickets.registration_id
+        )
+            WHEN 'APPROVED' THEN 'VALID'
+            WHEN 'REJECTED' THEN 'REJECTED'
+            ELSE 'PENDING'
+        END
+    END"""
+    if is_postgres():
+        state_sql = f"CAST({state_sql} AS ticketstate)"
+    op.execute(f"UPDATE tickets SET state = {state_sql}")
+
+    with op.batch_alter_table("tickets") as batch_op:
+        batch_op.alter_column("state", existing_type=ticket_state, nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("tickets") as batch_op:
+        batch_op.drop_column("checked_out_at")
+        batch_op.drop_column("checked_in_at")
+        batch_op.drop_column("state")
+    ticket_state.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,44 @@
+"""Striped venue occupancy counters
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+Adds the venue_counters table used by utils.occupancy. The rows are seeded
+from the ticket check-in / check-out times on the next application start.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_table
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if has_table("venue_counters"):
+        return
+    op.create_table(
+        "venue_counters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False),
+        sa.Column("stripe", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("name", "stripe", name="uq_venue_counters_name_stripe"),
+    )
+    op.create_index("ix_venue_counters_id", "venue_counters", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_venue_counters_id", table_name="venue_counters")
+    op.drop_table("venue_counters")
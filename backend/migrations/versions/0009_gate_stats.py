@@ -0,0 +1,65 @@
+"""Per-gate scan attribution and rollups
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+
+Adds tickets.check_in_by / check_out_by (the gate and device that scanned the
+ticket, copied from the legacy attendance columns) and the gate_rollups table
+written by utils.gate_stats.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_table, has_column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not has_column("tickets", "check_in_by"):
+        op.add_column("tickets", sa.Column("check_in_by", sa.String(255), nullable=True))
+        op.add_column("tickets", sa.Column("check_out_by", sa.String(255), nullable=True))
+        op.execute("""
+            UPDATE tickets SET
+                check_in_by = (SELECT check_in_by FROM attendance WHERE attendance.ticket_id = tickets.id),
+                check_out_by = (SELECT check_out_by FROM attendance WHERE attendance.ticket_id = tickets.id)
+        """)
+
+    if has_table("gate_rollups"):
+        return
+    op.create_table(
+        "gate_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("minute", sa.DateTime(), nullable=False),
+        sa.Column("gate", sa.String(100), nullable=False),
+        sa.Column("device", sa.String(100), nullable=False),
+        sa.Column("scans", sa.Integer(), nullable=False),
+        sa.Column("check_ins", sa.Integer(), nullable=False),
+        sa.Column("check_outs", sa.Integer(), nullable=False),
+        sa.Column("rejected", sa.Integer(), nullable=False),
+        sa.Column("server_latency", sa.Text(), nullable=True),
+        sa.Column("client_latency", sa.Text(), nullable=True),
+        sa.Column("last_scan_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_gate_rollups_id", "gate_rollups", ["id"])
+    op.create_index("ix_gate_rollups_minute_gate", "gate_rollups", ["minute", "gate"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_gate_rollups_minute_gate", table_name="gate_rollups")
+    op.drop_index("ix_gate_rollups_id", table_name="gate_rollups")
+    op.drop_table("gate_rollups")
+    with op.batch_alter_table("tickets") as batch_op:
+        batch_op.drop_column("check_out_by")
+        batch_op.drop_column("check_in_by")
@@ -0,0 +1,39 @@
+"""
+Gate Rollup model - per-minute scan throughput and latency per gate / device
+Written by utils.gate_stats: every worker appends its in-memory buckets every
+few seconds, so one (minute, gate, device) can have several rows - readers add
+them up. Latency columns hold JSON histograms {bucket upper bound ms: count}.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from datetime import datetime
+
+from database import Base
+
+
+class GateRollup(Base):
+    """
+    Gate rollups table - one row per (minute, gate, device) per flush
+    """
+    __tablename__ = "gate_rollups"
+    __table_args__ = (
+        # Live dashboard: the last N minutes
+        Index("ix_gate_rollups_minute_gate", "minute", "gate"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    minute = Column(DateTime, nullable=False)  # UTC, truncated to the minute
+    gate = Column(String(100), nullable=False)  # X-Scanner-Gate, "unassigned" when missing
+    device = Column(String(100), nullable=False, default="")  # X-Scanner-Device
+    
+    # Counts
+    scans = Column(Integer, default=0, nullable=False)
+    check_ins = Column(Integer, default=0, nullable=False)
+    check_outs = Column(Integer, default=0, nullable=False)
+    rejected = Column(Integer, default=0, nullable=False)  # Scans turned away (invalid, already used, ...)
+    
+    # Latency histograms (JSON)
+    server_latency = Column(Text, nullable=True)  # Request handling time
+    client_latency = Column(Text, nullable=True)  # Device-reported scan time
+    
+    last_scan_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,31 @@
+"""
+Idempotency Key model - responses of admin/registration POSTs keyed by the
+client's Idempotency-Key header, so a retried request is answered from here
+instead of running twice
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from datetime import datetime
+
+from database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Idempotency keys table
+    A row is inserted (status_code NULL) when a request starts and completed with
+    its response; keys are scoped to the method + path they were used on
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("key", "scope", name="uq_idempotency_keys_key_scope"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(255), nullable=False)
+    scope = Column(String(255), nullable=False)  # e.g. "POST /api/admin/registrations/5/approve"
+    
+    # Stored response (NULL while the first request is still running)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)  # JSON
+    
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,56 @@
+"""
+Mail Job model - bulk announcement / reminder campaigns
+One row per campaign; progress and the resume cursor are updated after every batch
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum
+from datetime import datetime
+import enum
+
+from database import Base
+from models.registration import MessageType
+
+
+class MailJobState(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class MailJob(Base):
+    """
+    Mail jobs table - a bulk email to every registration matching the filters
+    Recipients are processed in registration id order, so last_registration_id
+    is enough to resume a job after a crash
+    """
+    __tablename__ = "mail_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Content
+    message_type = Column(Enum(MessageType), default=MessageType.REMINDER, nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)  # Plain text written by the admin
+    
+    # Recipient filters (None = any)
+    status_filter = Column(String(20), nullable=True)  # pending / approved / rejected
+    payment_type_filter = Column(String(20), nullable=True)  # individual / bulk
+    
+    # Progress
+    state = Column(Enum(MailJobState), default=MailJobState.PENDING, nullable=False, index=True)
+    total = Column(Integer, default=0, nullable=False)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    last_registration_id = Column(Integer, default=0, nullable=False)  # Resume cursor
+    error_message = Column(Text, nullable=True)
+    
+    # Lease - the worker running the job refreshes heartbeat_at after each batch
+    worker_id = Column(String(64), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    
+    # Audit
+    created_by = Column(String(255), nullable=True)  # Admin email
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -2,13 +2,18 @@
 Database models for event ticketing system
 Production-grade 7-table architecture for individual + bulk registrations
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum, DECIMAL
+from sqlalchemy import (
+    Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Enum, DECIMAL, Index, text,
+    DDL, event, func, literal_column
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import secrets
 import enum
 
 from database import Base
+from models.team_member import TeamMember  # noqa: F401 - resolves Registration.team_members
+from utils.serials import format_serial
 
 
 # ==================== ENUMS ====================
@@ -24,6 +29,19 @@ class PaymentType(str, enum.Enum):
     BULK = "bulk"  # Group of 4-5 people
 
 
+class TicketState(str, enum.Enum):
+    PENDING = "pending"  # Payment not reviewed yet
+    VALID = "valid"  # Payment approved, ready for check-in
+    REJECTED = "rejected"  # Payment rejected
+    DEACTIVATED = "deactivated"  # Disabled by an admin
+    CHECKED_IN = "checked_in"
+    CHECKED_OUT = "checked_out"
+
+
+# Tickets that have been through the gate
+ENTERED_STATES = (TicketState.CHECKED_IN, TicketState.CHECKED_OUT)
+
+
 class MessageType(str, enum.Enum):
     CONFIRMATION = "confirmation"
     APPROVAL = "approval"
@@ -37,6 +55,32 @@ class AdminRole(str, enum.Enum):
     REVIEWER = "reviewer"
 
 
+# ==================== SEARCH EXPRESSIONS ====================
+# Participant search (routes/search.py) queries these exact expressions so Postgres
+# can use the GIN indexes declared on the tables - keep indexes and queries in step.
+
+_SPACE = literal_column("' '", String)
+_EMPTY = literal_column("''", String)
+
+
+def search_document(name, email, phone, team_name):
+    """Lowercased name / email / phone / team name - trigram (fuzzy + substring) index"""
+    return func.lower(name + _SPACE + email + _SPACE + phone + _SPACE + func.coalesce(team_name, _EMPTY))
+
+
+def search_tsvector(name, team_name):
+    """Words of the name and team name - full-text index for multi-word prefix search"""
+    return func.to_tsvector(literal_column("'simple'"), name + _SPACE + func.coalesce(team_name, _EMPTY))
+
+
+# Trigram operator classes for the search indexes
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+
 # ==================== TABLE 1: REGISTRATIONS ====================
 
 class Registration(Base):
@@ -55,19 +99,38 @@ class Registration(Base):
     
     # Team Information (Optional)
     team_name = Column(String(255), nullable=True)
-    members = Column(Text, nullable=True)  # JSON array of team member names
+    members = Column(Text, nullable=True)  # Legacy JSON/comma-separated names (see team_members)
     
     # Payment Type
     payment_type = Column(Enum(PaymentType), default=PaymentType.INDIVIDUAL, nullable=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Dashboard ordering
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        # Participant search (Postgres only - SQLite uses the in-memory index in utils.search_index)
+        Index(
+            "ix_registrations_search_trgm",
+            search_document(name, email, phone, team_name).label("search_document"),
+            postgresql_using="gin",
+            postgresql_ops={"search_document": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_registrations_search_tsv",
+            search_tsvector(name, team_name),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
     
     # Relationships
     payment = relationship("Payment", back_populates="registration", uselist=False, cascade="all, delete-orphan")
     tickets = relationship("Ticket", back_populates="registration", cascade="all, delete-orphan")
     messages = relationship("Message", back_populates="registration", cascade="all, delete-orphan")
+    team_members = relationship(
+        "TeamMember", back_populates="registration", cascade="all, delete-orphan",
+        order_by="TeamMember.position"
+    )
 
 
 # ==================== TABLE 2: PAYMENTS ====================
@@ -77,6 +140,14 @@ class Payment(Base):
     Payment table - payment record linked to each registration
     """
     __tablename__ = "payments"
+    __table_args__ = (
+        # Pending review queue (partial index)
+        Index(
+            "ix_payments_pending", "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     registration_id = Column(Integer, ForeignKey("registrations.id"), unique=True, nullable=False)
@@ -87,7 +158,7 @@ class Payment(Base):
     payment_method = Column(String(50), nullable=True)  # UPI, Card, etc.
     
     # Approval Status
-    status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING, nullable=False)
+    status = Column(Enum(PaymentStatus), default=PaymentStatus.PENDING, nullable=False, index=True)
     rejection_reason = Column(Text, nullable=True)
     
     # Approval Details
@@ -96,7 +167,7 @@ class Payment(Base):
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     registration = relationship("Registration", back_populates="payment")
@@ -113,52 +184,72 @@ class Ticket(Base):
     __tablename__ = "tickets"
     
     id = Column(Integer, primary_key=True, index=True)
-    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False)
+    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False, index=True)
     
     # Ticket Holder Information
     member_name = Column(String(255), nullable=False)  # Person this ticket belongs to
     
     # Ticket Identity
-    serial_code = Column(String(50), unique=True, index=True, nullable=False)  # EVT25-000123 or TEAM45-A
+    serial_code = Column(String(50), unique=True, index=True, nullable=False)  # EVT25-000123-K or TEAM000045-A-K (legacy: EVT25-000123, TEAM045-A)
     qr_code_path = Column(String(500), nullable=True)  # Supabase Storage URL
     
-    # Status
+    # Status - state is the single source of validity, kept in step by
+    # approve / reject / deactivate / check-in (is_active mirrors deactivation)
     is_active = Column(Boolean, default=True, nullable=False)  # Can be deactivated
+    state = Column(Enum(TicketState), default=TicketState.PENDING, nullable=False)
+    
+    # Check-in / check-out (folded in from the attendance table)
+    checked_in_at = Column(DateTime, nullable=True)
+    check_in_by = Column(String(255), nullable=True)  # Scanner gate / device
+    checked_out_at = Column(DateTime, nullable=True)
+    check_out_by = Column(String(255), nullable=True)  # Scanner gate / device
     
     # Timestamps
     issued_at = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Ticket index changes cursor
+    
+    __table_args__ = (
+        # Serial substring search at the help desk (Postgres only)
+        Index(
+            "ix_tickets_serial_code_trgm", "serial_code",
+            postgresql_using="gin",
+            postgresql_ops={"serial_code": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     
     # Relationships
     registration = relationship("Registration", back_populates="tickets")
-    attendance = relationship("Attendance", back_populates="ticket", uselist=False, cascade="all, delete-orphan")
+    attendance = relationship("Attendance", back_populates="ticket", uselist=False, cascade="all, delete-orphan")  # Legacy
     
     @staticmethod
-    def generate_serial_code(registration_id, is_bulk=False, member_index=0):
+    def generate_serial_code(serial_number, is_bulk=False, member_index=0):
         """
-        Generate a unique serial code for a ticket
-        - Individual: EVT25-000123 format
-        - Bulk: TEAM45-A, TEAM45-B, etc. format (based on registration ID and member index)
+        Generate a serial code from a number reserved by utils.serials.serial_allocator
+        - Individual: EVT25-000123-K format
+        - Bulk: TEAM000045-A-K, TEAM000045-B-7, etc. (one number per team, letter per member)
+        The trailing character is a check digit so scanners can reject typos offline
         """
-        if is_bulk:
-            # For bulk registrations, use team format with letter suffix
-            member_letter = chr(65 + member_index)  # A, B, C, D for indices 0, 1, 2, 3
-            return f"TEAM{registration_id:03d}-{member_letter}"
-        else:
-            # For individual registrations, use EVT format
-            year = datetime.now().strftime('%y')
-            # Use registration ID padded to 6 digits
-            return f"EVT{year}-{registration_id:06d}"
+        return format_serial(serial_number, is_bulk=is_bulk, member_index=member_index)
 
 
 # ==================== TABLE 4: ATTENDANCE ====================
 
 class Attendance(Base):
     """
-    Attendance table - tracks check-in/check-out per ticket
-    Each ticket has one attendance record
+    Attendance table - legacy check-in/check-out records
+    Check-in state now lives on tickets (state, checked_in_at, checked_out_at);
+    migration 0007 copied these rows over. New tickets get no attendance row.
     """
     __tablename__ = "attendance"
+    __table_args__ = (
+        # Checked-in attendees only (partial index)
+        Index(
+            "ix_attendance_checked_in", "check_in_time",
+            postgresql_where=text("checked_in = true"),
+            sqlite_where=text("checked_in = 1")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     ticket_id = Column(Integer, ForeignKey("tickets.id"), unique=True, nullable=False)
@@ -178,7 +269,7 @@ class Attendance(Base):
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     ticket = relationship("Ticket", back_populates="attendance")
@@ -193,7 +284,7 @@ class Message(Base):
     __tablename__ = "messages"
     
     id = Column(Integer, primary_key=True, index=True)
-    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False)
+    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False, index=True)
     
     # Message Details
     message_type = Column(Enum(MessageType), nullable=False)
@@ -210,6 +301,9 @@ class Message(Base):
     sent_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     
+    # De-duplication - registration id, message type and content hash (see utils.idempotency)
+    idempotency_key = Column(String(128), unique=True, nullable=True)
+    
     # Timestamp
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -282,6 +376,10 @@ class AuditLog(Base):
     - REGISTRATION_VIEW: Registration details viewed
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Per-admin activity, newest first
+        Index("ix_audit_logs_admin_id_created_at", "admin_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=False)
@@ -2,7 +2,11 @@
 Team Member model - Normalized team member storage
 Replaces the JSON 'members' field in Registration table
 """
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, func
+from sqlalchemy.orm import relationship
+from typing import List, Optional
+import json
+
 from database import Base
 
 
@@ -14,7 +18,7 @@ class TeamMember(Base):
     __tablename__ = "team_members"
     
     id = Column(Integer, primary_key=True, index=True)
-    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False)
+    registration_id = Column(Integer, ForeignKey("registrations.id"), nullable=False, index=True)
     
     # Member Information
     name = Column(String(255), nullable=False)
@@ -23,3 +27,58 @@ class TeamMember(Base):
     
     # Position in team (0 = leader, 1-4 = members)
     position = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        # Member name search (Postgres only) - queried as TeamMember.search_name()
+        Index(
+            "ix_team_members_name_trgm",
+            func.lower(name).label("lower_name"),
+            postgresql_using="gin",
+            postgresql_ops={"lower_name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+    
+    # Relationships
+    registration = relationship("Registration", back_populates="team_members")
+    
+    @classmethod
+    def search_name(cls):
+        return func.lower(cls.name)
+    
+    @staticmethod
+    def parse_names(members: Optional[str]) -> List[str]:
+        """
+        Parse a legacy 'members' blob into a list of names
+        Accepts a JSON array or a comma-separated string (brackets left over
+        from a sanitized JSON array are stripped)
+        """
+        if not members:
+            return []
+        try:
+            names = json.loads(members)
+            if isinstance(names, list):
+                return [str(n).strip() for n in names if str(n).strip()]
+            return [str(names).strip()] if str(names).strip() else []
+        except json.JSONDecodeError:
+            return [m.strip() for m in members.strip().strip('[]').split(',') if m.strip()]
+    
+    @staticmethod
+    def build_rows(leader_name: str, leader_email: str, leader_phone: str,
+                   member_names: List[str]) -> List[dict]:
+        """
+        Column values for a team: the leader at position 0, members at 1..n
+        """
+        rows = [{
+            "name": leader_name,
+            "email": leader_email,
+            "phone": leader_phone,
+            "position": 0
+        }]
+        for idx, member_name in enumerate(member_names, start=1):
+            rows.append({
+                "name": member_name,
+                "email": None,
+                "phone": None,
+                "position": idx
+            })
+        return rows
@@ -0,0 +1,28 @@
+"""
+Venue Counter model - striped counters for live occupancy
+Each counter is split over several rows (stripes); a check-in or check-out adds
+to one randomly picked stripe, so concurrent scanners rarely wait on the same
+row lock, and a read sums a handful of rows instead of counting tickets
+"""
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from datetime import datetime
+
+from database import Base
+
+
+class VenueCounter(Base):
+    """
+    Venue counters table - one row per (counter name, stripe)
+    The value of a counter is the sum of its stripes
+    """
+    __tablename__ = "venue_counters"
+    __table_args__ = (
+        UniqueConstraint("name", "stripe", name="uq_venue_counters_name_stripe"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False)  # e.g. "checked_in", "checked_out"
+    stripe = Column(Integer, nullable=False)
+    value = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
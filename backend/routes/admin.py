@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Header
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
@@ -8,19 +10,34 @@ import os
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from database import get_db
-from models.registration import Registration, Payment, Ticket, Attendance, Message, PaymentStatus, PaymentType, MessageType, Admin
-from utils.qr_generator import generate_ticket_qr
+from database import get_db, get_async_read_db, async_read_session
+from models.registration import Registration, Payment, Ticket, TicketState, ENTERED_STATES, Message, PaymentStatus, PaymentType, MessageType, Admin
+from utils.qr_generator import generate_ticket_qr, qr_payload_expires, qr_code_outdated
 from utils.email import send_approval_email, send_rejection_email
+from utils.ticket_bundle import get_ticket_bundle
 from utils.audit import log_audit, AuditAction
+from utils.idempotency import idempotent, message_key, claim_message, finish_message, IDEMPOTENCY_HEADER
+from utils.invalidation import notify, Channel
+from utils.ticket_index import reindex_tickets
+from utils.admin_auth import SECRET_KEY, ALGORITHM, current_admin, AdminIdentity
+from utils.singleflight import SingleFlightCache
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 limiter = Limiter(key_func=get_remote_address)
 
-SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 12
 
+# Dashboard reads are shared by concurrent admins and refreshed in the background once stale
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "5"))
+DASHBOARD_CACHE_STALE_SECONDS = float(os.getenv("DASHBOARD_CACHE_STALE_SECONDS", "30"))
+
+dashboard_cache = SingleFlightCache(
+    "dashboard",
+    ttl=DASHBOARD_CACHE_TTL_SECONDS,
+    stale_ttl=DASHBOARD_CACHE_STALE_SECONDS,
+    channels=(Channel.REGISTRATIONS, Channel.TICKETS),
+)
+
 
 class LoginRequest(BaseModel):
     email: str
@@ -70,6 +87,11 @@ class RejectRequest(BaseModel):
     reason: Optional[str] = None
 
 
+class DeactivateTicketRequest(BaseModel):
+    """Request body for deactivating a ticket"""
+    reason: Optional[str] = None
+
+
 class RegistrationsResponse(BaseModel):
     total: int
     pending: int
@@ -146,40 +168,53 @@ async def admin_login(
 
 
 @router.get("/registrations", response_model=RegistrationsResponse)
-async def get_all_registrations(
-    status_filter: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
+async def get_all_registrations(status_filter: Optional[str] = None):
     """
     Get all registrations with optional status filter
     Joins with Payment table to get approval status
     """
+    if status_filter and status_filter not in ["pending", "approved", "rejected"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid status filter. Use: pending, approved, or rejected"
+        )
+    return await dashboard_cache.get(
+        ("registrations", status_filter or None),
+        lambda: _load_registrations(status_filter),
+    )
+
+
+async def _load_registrations(status_filter: Optional[str]) -> RegistrationsResponse:
+    async with async_read_session() as db:
+        return await _query_registrations(db, status_filter)
+
+
+async def _query_registrations(db: AsyncSession, status_filter: Optional[str]) -> RegistrationsResponse:
+    # Ticket counts per registration in one grouped subquery (no per-row COUNT)
+    ticket_counts = (
+        select(Ticket.registration_id, func.count(Ticket.id).label("tickets_count"))
+        .group_by(Ticket.registration_id)
+        .subquery()
+    )
+    
     # Join Registration with Payment table
-    query = db.query(Registration, Payment).join(
-        Payment, Registration.id == Payment.registration_id
+    query = (
+        select(Registration, Payment, func.coalesce(ticket_counts.c.tickets_count, 0))
+        .join(Payment, Registration.id == Payment.registration_id)
+        .outerjoin(ticket_counts, ticket_counts.c.registration_id == Registration.id)
     )
     
     # Apply filter if provided
     if status_filter:
-        if status_filter not in ["pending", "approved", "rejected"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid status filter. Use: pending, approved, or rejected"
-            )
-        query = query.filter(Payment.status == status_filter)
+        query = query.where(Payment.status == PaymentStatus(status_filter))
     
-    results = query.order_by(Registration.created_at.desc()).all()
+    results = (await db.execute(query.order_by(Registration.created_at.desc()))).all()
     
     # Calculate counts from all payments
-    all_payments = db.query(Payment).all()
-    counts = {
-        "pending": sum(1 for p in all_payments if p.status == PaymentStatus.PENDING),
-        "approved": sum(1 for p in all_payments if p.status == PaymentStatus.APPROVED),
-        "rejected": sum(1 for p in all_payments if p.status == PaymentStatus.REJECTED),
-    }
+    counts = await _payment_status_counts(db)
     
     return RegistrationsResponse(
-        total=len(all_payments),
+        total=sum(counts.values()),
         pending=counts["pending"],
         approved=counts["approved"],
         rejected=counts["rejected"],
@@ -199,24 +234,35 @@ async def get_all_registrations(
                     payment_method=payment.payment_method,
                     payment_screenshot=payment.payment_screenshot
                 ),
-                tickets_count=db.query(Ticket).filter(Ticket.registration_id == reg.id).count(),
+                tickets_count=tickets_count,
                 created_at=reg.created_at.isoformat()
             )
-            for reg, payment in results
+            for reg, payment, tickets_count in results
         ]
     )
 
 
+async def _payment_status_counts(db: AsyncSession) -> dict:
+    """Count payments per status with a single GROUP BY"""
+    rows = (await db.execute(
+        select(Payment.status, func.count(Payment.id)).group_by(Payment.status)
+    )).all()
+    counts = {s.value: 0 for s in PaymentStatus}
+    for payment_status, count in rows:
+        counts[payment_status.value] = count
+    return counts
+
+
 @router.get("/registrations/{registration_id}")
 async def get_registration_detail(
     registration_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get detailed information for a specific registration
-    Includes all tickets and their attendance records
+    Includes all tickets with their state and check-in times
     """
-    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    registration = await db.get(Registration, registration_id)
     
     if not registration:
         raise HTTPException(
@@ -225,26 +271,29 @@ async def get_registration_detail(
         )
     
     # Get related payment info
-    payment = db.query(Payment).filter(Payment.registration_id == registration_id).first()
+    payment = (await db.execute(
+        select(Payment).where(Payment.registration_id == registration_id)
+    )).scalar_one_or_none()
     
-    # Get all tickets for this registration
-    tickets = db.query(Ticket).filter(Ticket.registration_id == registration_id).all()
+    # Get all tickets - check-in state lives on the ticket row
+    tickets = (await db.execute(
+        select(Ticket).where(Ticket.registration_id == registration_id).order_by(Ticket.id)
+    )).scalars().all()
     
-    # Get attendance for each ticket
     tickets_data = []
     for ticket in tickets:
-        attendance = db.query(Attendance).filter(Attendance.ticket_id == ticket.id).first()
         tickets_data.append({
             "id": ticket.id,
             "member_name": ticket.member_name,
             "serial_code": ticket.serial_code,
             "qr_code_path": ticket.qr_code_path,
             "is_active": ticket.is_active,
+            "state": ticket.state.value,
             "attendance": {
-                "checked_in": attendance.checked_in if attendance else False,
-                "check_in_time": attendance.check_in_time.isoformat() if attendance and attendance.check_in_time else None,
-                "checked_out": attendance.checked_out if attendance else False,
-                "check_out_time": attendance.check_out_time.isoformat() if attendance and attendance.check_out_time else None,
+                "checked_in": ticket.state in ENTERED_STATES,
+                "check_in_time": ticket.checked_in_at.isoformat() if ticket.checked_in_at else None,
+                "checked_out": ticket.state == TicketState.CHECKED_OUT,
+                "check_out_time": ticket.checked_out_at.isoformat() if ticket.checked_out_at else None,
             }
         })
     
@@ -274,32 +323,49 @@ async def get_registration_detail(
 
 
 @router.get("/stats")
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics():
     """
     Get dashboard statistics from Payment table
     """
-    all_payments = db.query(Payment).all()
-    all_registrations = db.query(Registration).all()
+    return await dashboard_cache.get("stats", _load_statistics)
+
+
+async def _load_statistics() -> dict:
+    async with async_read_session() as db:
+        return await _query_statistics(db)
+
+
+async def _query_statistics(db: AsyncSession) -> dict:
+    counts = await _payment_status_counts(db)
+    with_teams = (await db.execute(
+        select(func.count(Registration.id)).where(
+            Registration.team_name.isnot(None), Registration.team_name != ""
+        )
+    )).scalar_one()
     
     return {
-        "total_registrations": len(all_payments),
-        "pending": sum(1 for p in all_payments if p.status == PaymentStatus.PENDING),
-        "approved": sum(1 for p in all_payments if p.status == PaymentStatus.APPROVED),
-        "rejected": sum(1 for p in all_payments if p.status == PaymentStatus.REJECTED),
-        "with_teams": sum(1 for r in all_registrations if r.team_name),
+        "total_registrations": sum(counts.values()),
+        "pending": counts["pending"],
+        "approved": counts["approved"],
+        "rejected": counts["rejected"],
+        "with_teams": with_teams,
     }
 
 
 @router.post("/registrations/{registration_id}/approve")
+@idempotent()
 async def approve_registration(
     registration_id: int,
     request: Request,
     approved_by: str = "admin",
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    admin: AdminIdentity = Depends(current_admin),
     db: Session = Depends(get_db)
 ):
     """
     Approve a registration and send tickets via email
     Generates QR codes for all tickets (1 for individual, N for bulk)
+    Send an Idempotency-Key header to make retries safe
     """
     registration = db.query(Registration).filter(Registration.id == registration_id).first()
     
@@ -334,30 +400,46 @@ async def approve_registration(
                 detail="No tickets found for this registration"
             )
         
-        # Generate QR codes for all tickets
+        # The email key covers this approval of this payment state: a double-click
+        # maps to the same key, re-approving after a rejection does not
+        approval_key = message_key(
+            registration.id, MessageType.APPROVAL,
+            payment.updated_at, *sorted(t.serial_code for t in tickets)
+        )
+        
+        # Generate QR codes for tickets that do not have one yet or have one under
+        # a guessable key (uploads that succeeded on an earlier attempt are reused
+        # unless their token can expire)
+        renew = qr_payload_expires()
         qr_code_paths = []
         for ticket in tickets:
-            qr_code_path = await generate_ticket_qr(
-                serial_code=ticket.serial_code,
-                name=ticket.member_name,
-                email=registration.email
-            )
-            
-            # Update ticket with QR code path
-            ticket.qr_code_path = qr_code_path
-            qr_code_paths.append(qr_code_path)
+            if renew or qr_code_outdated(ticket.qr_code_path, ticket.serial_code):
+                ticket.qr_code_path = await generate_ticket_qr(
+                    serial_code=ticket.serial_code,
+                    name=ticket.member_name,
+                    email=registration.email,
+                    replaces=ticket.qr_code_path
+                )
+            qr_code_paths.append(ticket.qr_code_path)
         
         # Update payment status
         payment.status = PaymentStatus.APPROVED
         payment.approved_by = approved_by
         payment.approved_at = datetime.utcnow()
         
+        # Tickets become valid for check-in (deactivated / used tickets keep their state)
+        for ticket in tickets:
+            if ticket.state in (TicketState.PENDING, TicketState.REJECTED):
+                ticket.state = TicketState.VALID
+        notify(db, Channel.TICKETS, registration_id)
+        
         db.commit()
+        reindex_tickets(db, registration_id)
         
         # Log approval action
         log_audit(
             db=db,
-            admin_id=1,  # TODO: Get from JWT token
+            admin_id=admin.admin_id,
             action=AuditAction.APPROVE_PAYMENT,
             details={
                 "registration_id": registration_id,
@@ -370,36 +452,41 @@ async def approve_registration(
             user_agent=request.headers.get("user-agent", None)
         )
         
-        # Send approval email with all tickets
-        email_sent = await send_approval_email(
-            to_email=registration.email,
-            name=registration.name,
-            serial_code=tickets[0].serial_code,  # Send first ticket serial as reference
-            qr_code_path=qr_code_paths[0] if len(qr_code_paths) == 1 else None,  # Single QR for individual
-            team_name=registration.team_name,
-            qr_code_paths=qr_code_paths if len(qr_code_paths) > 1 else None  # Multiple QRs for bulk
-        )
-        
-        # Log email in Message table
-        message = Message(
+        # Log email in Message table before sending - a duplicate is skipped
+        message = claim_message(
+            db,
+            approval_key,
             registration_id=registration.id,
             message_type=MessageType.APPROVAL,
             subject="🎉 Event Registration Approved - Your Ticket(s) Inside!",
             body=f"Approval email sent to {registration.email} with {len(tickets)} ticket(s)",
-            sent=email_sent,
-            sent_at=datetime.utcnow() if email_sent else None,
             recipient_email=registration.email,
             has_attachment=True,
             attachment_path=qr_code_paths[0] if qr_code_paths else None
         )
-        db.add(message)
-        db.commit()
+        
+        email_sent = False
+        if message:
+            # Team tickets go out as one PDF bundle (cached for re-sends)
+            ticket_bundle = await get_ticket_bundle(registration, tickets) if len(tickets) > 1 else None
+            
+            # Send approval email with all tickets
+            email_sent = await send_approval_email(
+                to_email=registration.email,
+                name=registration.name,
+                serial_code=tickets[0].serial_code,  # Send first ticket serial as reference
+                qr_code_path=qr_code_paths[0] if len(qr_code_paths) == 1 else None,  # Single QR for individual
+                team_name=registration.team_name,
+                qr_code_paths=qr_code_paths if len(qr_code_paths) > 1 else None,  # Multiple QRs for bulk
+                ticket_bundle=ticket_bundle
+            )
+            finish_message(db, message, email_sent)
         
         # Log email sending in audit trail
         if email_sent:
             log_audit(
                 db=db,
-                admin_id=1,  # TODO: Extract from JWT token
+                admin_id=admin.admin_id,
                 action=AuditAction.SEND_APPROVAL_EMAIL,
                 details={
                     "email": registration.email,
@@ -414,6 +501,7 @@ async def approve_registration(
         return {
             "message": "Registration approved successfully",
             "email_sent": email_sent,
+            "email_deduplicated": message is None,
             "qr_codes_generated": len(qr_code_paths),
             "tickets_count": len(tickets),
             "registration": {
@@ -444,16 +532,137 @@ async def approve_registration(
         )
 
 
+@router.post("/registrations/{registration_id}/resend-tickets")
+@idempotent()
+async def resend_tickets(
+    registration_id: int,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    admin: AdminIdentity = Depends(current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Re-send the approval email for an approved registration
+    Reuses the stored QR codes and the cached PDF bundle for team tickets
+    Send an Idempotency-Key header to make retries safe
+    """
+    registration = db.query(Registration).filter(Registration.id == registration_id).first()
+    
+    if not registration:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Registration not found"
+        )
+    
+    payment = db.query(Payment).filter(Payment.registration_id == registration_id).first()
+    if not payment or payment.status != PaymentStatus.APPROVED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only approved registrations can have their tickets re-sent"
+        )
+    
+    tickets = db.query(Ticket).filter(Ticket.registration_id == registration_id).order_by(Ticket.id).all()
+    if not tickets:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No tickets found for this registration"
+        )
+    
+    # The email key covers the next re-send: concurrent clicks share it and only one
+    # sends, while a later deliberate re-send (after this one was sent) gets a new key
+    sent_before = db.query(func.count(Message.id)).filter(
+        Message.registration_id == registration_id,
+        Message.message_type == MessageType.APPROVAL,
+        Message.sent.is_(True)
+    ).scalar()
+    resend_key = message_key(
+        registration.id, MessageType.APPROVAL,
+        "resend", sent_before, *sorted(t.serial_code for t in tickets)
+    )
+    message = claim_message(
+        db,
+        resend_key,
+        registration_id=registration.id,
+        message_type=MessageType.APPROVAL,
+        subject="🎉 Event Registration Approved - Your Ticket(s) Inside!",
+        body=f"Tickets re-sent to {registration.email} ({len(tickets)} ticket(s))",
+        recipient_email=registration.email,
+        has_attachment=True
+    )
+    if not message:
+        return {
+            "message": "Tickets are already being re-sent",
+            "email_sent": False,
+            "tickets_count": len(tickets),
+            "bundle_attached": False
+        }
+    
+    # Regenerate QR codes that are missing (e.g. tickets approved before upload worked),
+    # stored under a guessable key, or whose signed token may have expired since
+    renew = qr_payload_expires()
+    for ticket in tickets:
+        if renew or qr_code_outdated(ticket.qr_code_path, ticket.serial_code):
+            ticket.qr_code_path = await generate_ticket_qr(
+                serial_code=ticket.serial_code,
+                name=ticket.member_name,
+                email=registration.email,
+                replaces=ticket.qr_code_path
+            )
+    db.commit()
+    qr_code_paths = [t.qr_code_path for t in tickets]
+    
+    ticket_bundle = await get_ticket_bundle(registration, tickets) if len(tickets) > 1 else None
+    
+    email_sent = await send_approval_email(
+        to_email=registration.email,
+        name=registration.name,
+        serial_code=tickets[0].serial_code,
+        qr_code_path=qr_code_paths[0] if len(qr_code_paths) == 1 else None,
+        team_name=registration.team_name,
+        qr_code_paths=qr_code_paths if len(qr_code_paths) > 1 else None,
+        ticket_bundle=ticket_bundle
+    )
+    message.attachment_path = qr_code_paths[0]
+    finish_message(db, message, email_sent)
+    
+    if email_sent:
+        log_audit(
+            db=db,
+            admin_id=admin.admin_id,
+            action=AuditAction.SEND_APPROVAL_EMAIL,
+            details={
+                "email": registration.email,
+                "ticket_count": len(tickets),
+                "serial_codes": [t.serial_code for t in tickets],
+                "resend": True
+            },
+            registration_id=registration.id,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent", None)
+        )
+    
+    return {
+        "message": "Tickets re-sent successfully" if email_sent else "Failed to send tickets email",
+        "email_sent": email_sent,
+        "tickets_count": len(tickets),
+        "bundle_attached": ticket_bundle is not None
+    }
+
+
 @router.post("/registrations/{registration_id}/reject")
+@idempotent()
 async def reject_registration(
     registration_id: int,
     reject_data: RejectRequest,
     request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    admin: AdminIdentity = Depends(current_admin),
     db: Session = Depends(get_db)
 ):
     """
     Reject a registration and send rejection email
     Updates Payment table status to REJECTED
+    Send an Idempotency-Key header to make retries safe
     """
     registration = db.query(Registration).filter(Registration.id == registration_id).first()
     
@@ -479,15 +688,27 @@ async def reject_registration(
         )
     
     try:
+        rejection_key = message_key(
+            registration.id, MessageType.REJECTION, payment.updated_at, reject_data.reason
+        )
+        
         # Update payment status
         payment.status = PaymentStatus.REJECTED
         payment.rejection_reason = reject_data.reason
+        
+        # Unused tickets can no longer be checked in
+        db.query(Ticket).filter(
+            Ticket.registration_id == registration_id,
+            Ticket.state.in_([TicketState.PENDING, TicketState.VALID])
+        ).update({Ticket.state: TicketState.REJECTED}, synchronize_session=False)
+        notify(db, Channel.TICKETS, registration_id)
         db.commit()
+        reindex_tickets(db, registration_id)
         
         # Log rejection action
         log_audit(
             db=db,
-            admin_id=1,  # TODO: Get from JWT token
+            admin_id=admin.admin_id,
             action=AuditAction.REJECT_PAYMENT,
             details={
                 "registration_id": registration_id,
@@ -500,32 +721,33 @@ async def reject_registration(
             user_agent=request.headers.get("user-agent", None)
         )
         
-        # Send rejection email
-        email_sent = await send_rejection_email(
-            to_email=registration.email,
-            name=registration.name,
-            reason=reject_data.reason
-        )
-        
-        # Log email in Message table
-        message = Message(
+        # Log email in Message table before sending - a duplicate is skipped
+        message = claim_message(
+            db,
+            rejection_key,
             registration_id=registration.id,
             message_type=MessageType.REJECTION,
             subject="❌ Event Registration - Payment Not Approved",
             body=f"Rejection email sent to {registration.email}: {reject_data.reason}",
-            sent=email_sent,
-            sent_at=datetime.utcnow() if email_sent else None,
             recipient_email=registration.email,
             has_attachment=False
         )
-        db.add(message)
-        db.commit()
+        
+        # Send rejection email
+        email_sent = False
+        if message:
+            email_sent = await send_rejection_email(
+                to_email=registration.email,
+                name=registration.name,
+                reason=reject_data.reason
+            )
+            finish_message(db, message, email_sent)
         
         # Log email sending in audit trail
         if email_sent:
             log_audit(
                 db=db,
-                admin_id=1,  # TODO: Extract from JWT token
+                admin_id=admin.admin_id,
                 action=AuditAction.SEND_REJECTION_EMAIL,
                 details={
                     "email": registration.email,
@@ -539,6 +761,7 @@ async def reject_registration(
         return {
             "message": "Registration rejected successfully",
             "email_sent": email_sent,
+            "email_deduplicated": message is None,
             "registration": {
                 "id": registration.id,
                 "name": registration.name,
@@ -554,3 +777,59 @@ async def reject_registration(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to reject registration: {str(e)}"
         )
+
+
+@router.post("/tickets/{serial_code}/deactivate")
+async def deactivate_ticket(
+    serial_code: str,
+    request: Request,
+    data: DeactivateTicketRequest = DeactivateTicketRequest(),
+    admin: AdminIdentity = Depends(current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Deactivate a single ticket (lost, transferred, refunded)
+    It can no longer be checked in; the rest of the registration is unaffected
+    """
+    ticket = db.query(Ticket).filter(Ticket.serial_code == serial_code.strip().upper()).first()
+    
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket not found"
+        )
+    
+    if ticket.state == TicketState.DEACTIVATED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ticket is already deactivated"
+        )
+    
+    previous_state = ticket.state
+    ticket.state = TicketState.DEACTIVATED
+    ticket.is_active = False
+    notify(db, Channel.TICKETS, ticket.registration_id)
+    db.commit()
+    reindex_tickets(db, ticket.registration_id)
+    
+    log_audit(
+        db=db,
+        admin_id=admin.admin_id,
+        action=AuditAction.DEACTIVATE_TICKET,
+        details={
+            "serial_code": ticket.serial_code,
+            "member_name": ticket.member_name,
+            "previous_state": previous_state.value,
+            "reason": data.reason
+        },
+        registration_id=ticket.registration_id,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent", None)
+    )
+    
+    return {
+        "message": "Ticket deactivated successfully",
+        "serial_code": ticket.serial_code,
+        "previous_state": previous_state.value,
+        "state": ticket.state.value
+    }
@@ -7,7 +7,7 @@ from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_read_db
 from models.registration import Admin, AdminRole, AuditLog
 from utils.audit import log_audit, AuditAction
 
@@ -46,7 +46,7 @@ class AdminResponse(BaseModel):
 
 
 @router.get("", response_model=List[AdminResponse])
-def get_all_admins(db: Session = Depends(get_db)):
+def get_all_admins(db: Session = Depends(get_read_db)):
     """Get all admin users"""
     admins = db.query(Admin).order_by(Admin.created_at.desc()).all()
     return admins
@@ -8,7 +8,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from database import get_db
+from database import get_read_db
 from models.registration import AuditLog, Admin
 
 router = APIRouter(prefix="/api/admin/audit", tags=["Audit Logs"])
@@ -36,7 +36,7 @@ def get_audit_logs(
     offset: int = Query(0, ge=0),
     action: Optional[str] = Query(None),
     admin_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get audit logs with pagination and filtering
@@ -77,7 +77,7 @@ def get_audit_logs(
 
 
 @router.get("/stats")
-def get_audit_stats(db: Session = Depends(get_db)):
+def get_audit_stats(db: Session = Depends(get_read_db)):
     """
     Get audit log statistics
     """
@@ -0,0 +1,266 @@
+"""
+Export routes - registrations and payments as CSV or XLSX
+Rows are streamed from a server-side cursor (yield_per) over the joined
+registration / payment / ticket data - check-in columns come from the ticket's own
+state, checked_in_at and checked_out_at - so worker memory stays flat however many
+rows are exported:
+- CSV is written to the response batch by batch
+- XLSX is built by xlsxwriter in constant_memory mode (rows are flushed to a
+  temp file as they are written) and the finished file is streamed from disk
+"""
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime, date, time
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse, FileResponse
+from sqlalchemy import select
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import xlsxwriter
+
+from database import (
+    AsyncSessionLocal, AsyncReadSessionLocal, SessionLocal, ReadSessionLocal, replica_state
+)
+from models.registration import Registration, Payment, Ticket, TicketState, ENTERED_STATES, PaymentStatus, PaymentType
+from utils.audit import log_audit_async, AuditAction
+from utils.admin_auth import current_admin, AdminIdentity
+
+router = APIRouter(prefix="/api/admin/export", tags=["Export"])
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# name -> (header, column expression); ticket columns add one row per ticket
+EXPORT_COLUMNS = {
+    "registration_id": ("Registration ID", Registration.id),
+    "registration_code": ("Registration Code", Registration.id),
+    "name": ("Name", Registration.name),
+    "email": ("Email", Registration.email),
+    "phone": ("Phone", Registration.phone),
+    "team_name": ("Team Name", Registration.team_name),
+    "payment_type": ("Payment Type", Registration.payment_type),
+    "registered_at": ("Registered At", Registration.created_at),
+    "status": ("Payment Status", Payment.status),
+    "amount": ("Amount", Payment.amount),
+    "payment_method": ("Payment Method", Payment.payment_method),
+    "payment_screenshot": ("Payment Screenshot", Payment.payment_screenshot),
+    "approved_by": ("Approved By", Payment.approved_by),
+    "approved_at": ("Approved At", Payment.approved_at),
+    "rejection_reason": ("Rejection Reason", Payment.rejection_reason),
+    "ticket_serial": ("Ticket Serial", Ticket.serial_code),
+    "member_name": ("Ticket Holder", Ticket.member_name),
+    "ticket_active": ("Ticket Active", Ticket.is_active),
+    "ticket_state": ("Ticket State", Ticket.state),
+    "checked_in": ("Checked In", Ticket.state.in_(ENTERED_STATES)),
+    "check_in_time": ("Check-in Time", Ticket.checked_in_at),
+    "checked_out": ("Checked Out", Ticket.state == TicketState.CHECKED_OUT),
+    "check_out_time": ("Check-out Time", Ticket.checked_out_at),
+}
+TICKET_COLUMNS = {
+    "ticket_serial", "member_name", "ticket_active", "ticket_state",
+    "checked_in", "check_in_time", "checked_out", "check_out_time"
+}
+# Values formatted in Python after fetching
+EXPORT_FORMATTERS = {
+    "registration_code": lambda registration_id: f"REG-{registration_id:06d}",
+}
+DEFAULT_COLUMNS = [
+    "registration_code", "name", "email", "phone", "team_name", "payment_type",
+    "status", "amount", "registered_at", "ticket_serial", "member_name", "checked_in", "check_in_time"
+]
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def parse_columns(columns: Optional[str]) -> List[str]:
+    if not columns:
+        return DEFAULT_COLUMNS
+    selected = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in selected if c not in EXPORT_COLUMNS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export column(s): {', '.join(unknown) or '-'}. "
+                   f"Available: {', '.join(EXPORT_COLUMNS)}"
+        )
+    return selected
+
+
+def build_export_query(
+    columns: List[str],
+    status_filter: Optional[str],
+    payment_type: Optional[str],
+    date_from: Optional[date],
+    date_to: Optional[date]
+):
+    """One row per registration, or per ticket when ticket columns are selected"""
+    query = (
+        select(*(EXPORT_COLUMNS[c][1].label(c) for c in columns))
+        .select_from(Registration)
+        .join(Payment, Payment.registration_id == Registration.id)
+    )
+    order_by = [Registration.id]
+    if TICKET_COLUMNS.intersection(columns):
+        query = query.outerjoin(Ticket, Ticket.registration_id == Registration.id)
+        order_by.append(Ticket.id)
+
+    if status_filter:
+        query = query.where(Payment.status == PaymentStatus(status_filter))
+    if payment_type:
+        query = query.where(Registration.payment_type == PaymentType(payment_type))
+    if date_from:
+        query = query.where(Registration.created_at >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.where(Registration.created_at <= datetime.combine(date_to, time.max))
+    return query.order_by(*order_by).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def _plain(value):
+    """Enum / bool / Decimal / datetime values as they appear in a spreadsheet"""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    # Keep spreadsheet apps from evaluating user-provided text as a formula
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+def _formatters(columns: List[str]) -> list:
+    return [EXPORT_FORMATTERS.get(c) for c in columns]
+
+
+def _format_row(row, formatters) -> list:
+    return [fmt(value) if fmt and value is not None else value for value, fmt in zip(row, formatters)]
+
+
+async def stream_csv(query, columns: List[str]):
+    """CSV text, one chunk per cursor batch"""
+    formatters = _formatters(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([EXPORT_COLUMNS[c][0] for c in columns])
+
+    session_factory = AsyncReadSessionLocal if await replica_state.check_async() else AsyncSessionLocal
+    async with session_factory() as db:
+        result = await db.stream(query)
+        async for rows in result.partitions(EXPORT_BATCH_SIZE):
+            writer.writerows([_csv_cell(v) for v in _format_row(row, formatters)] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def write_xlsx(path: str, query, columns: List[str]) -> int:
+    """Write the export to an XLSX file, returns the number of data rows"""
+    formatters = _formatters(columns)
+    headers = [EXPORT_COLUMNS[c][0] for c in columns]
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "remove_timezone": True})
+    worksheet = workbook.add_worksheet("Registrations")
+    bold = workbook.add_format({"bold": True})
+    datetime_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+
+    worksheet.write_row(0, 0, headers, bold)
+    worksheet.freeze_panes(1, 0)
+    worksheet.set_column(0, len(headers) - 1, 18)
+
+    db = ReadSessionLocal() if replica_state.check() else SessionLocal()
+    row_index = 0
+    try:
+        for row in db.execute(query):
+            row_index += 1
+            for col, value in enumerate(_format_row(row, formatters)):
+                if isinstance(value, datetime):
+                    worksheet.write_datetime(row_index, col, value, datetime_format)
+                elif isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                    worksheet.write_number(row_index, col, float(value))
+                else:
+                    # write_string - never interpreted as a formula
+                    worksheet.write_string(row_index, col, str(_plain(value)))
+    finally:
+        db.close()
+        workbook.close()
+    return row_index
+
+
+@router.get("/registrations")
+async def export_registrations(
+    request: Request,
+    file_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    columns: Optional[str] = Query(None, description="Comma-separated column names"),
+    status_filter: Optional[PaymentStatus] = Query(None, alias="status"),
+    payment_type: Optional[PaymentType] = Query(None),
+    date_from: Optional[date] = Query(None, description="Registered on or after (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Registered on or before (YYYY-MM-DD)"),
+    admin: AdminIdentity = Depends(current_admin)
+):
+    """
+    Export registrations with their payment, tickets and ticket state (check-in / check-out)
+    One row per ticket when ticket columns are selected, otherwise one per registration
+    """
+    selected = parse_columns(columns)
+    query = build_export_query(
+        selected,
+        status_filter.value if status_filter else None,
+        payment_type.value if payment_type else None,
+        date_from,
+        date_to
+    )
+    filename = f"registrations-{datetime.utcnow():%Y%m%d-%H%M%S}.{file_format}"
+
+    async with AsyncSessionLocal() as db:
+        await log_audit_async(
+            db=db,
+            admin_id=admin.admin_id,
+            action=AuditAction.EXPORT_DATA,
+            details={
+                "format": file_format,
+                "columns": selected,
+                "status": status_filter.value if status_filter else None,
+                "payment_type": payment_type.value if payment_type else None,
+                "date_from": str(date_from) if date_from else None,
+                "date_to": str(date_to) if date_to else None
+            },
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent", None)
+        )
+
+    if file_format == "csv":
+        return StreamingResponse(
+            stream_csv(query, selected),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        rows = await run_in_threadpool(write_xlsx, path, query, selected)
+    except Exception:
+        os.unlink(path)
+        raise
+    print(f"📊 Exported {rows} row(s) to XLSX")
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=filename,
+        background=BackgroundTask(os.unlink, path)
+    )
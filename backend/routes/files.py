@@ -0,0 +1,34 @@
+"""
+File serving routes for the local and memory storage backends
+Cloudinary URLs point straight at the CDN and never hit this router
+"""
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse, Response
+import os
+
+from utils.storage import get_storage, guess_content_type, FILES_ROUTE
+
+router = APIRouter(prefix=FILES_ROUTE, tags=["Files"])
+
+
+@router.get("/{key:path}")
+async def serve_file(key: str):
+    """
+    Serve a stored file
+    Disk-backed files are sent with FileResponse (sendfile, no copy through Python)
+    """
+    storage = get_storage()
+    if storage.name == "cloudinary":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    headers = {"Cache-Control": "public, max-age=3600"}
+    path = storage.local_path(key)
+    if path:
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        return FileResponse(path, media_type=guess_content_type(key), headers=headers)
+
+    content = await storage.aget(key)
+    if content is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return Response(content=content, media_type=guess_content_type(key), headers=headers)
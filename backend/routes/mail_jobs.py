@@ -0,0 +1,169 @@
+"""
+Bulk mail routes - announcement / reminder campaigns
+Jobs are sent in the background by utils.bulk_mailer; these endpoints create,
+monitor and cancel them
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+from database import get_async_db, get_async_read_db
+from models.registration import MessageType, PaymentStatus, PaymentType
+from models.mail_job import MailJob, MailJobState
+from utils.audit import log_audit_async, AuditAction
+from utils.bulk_mailer import count_recipients, start_mail_job
+from utils.admin_auth import current_admin, AdminIdentity
+
+router = APIRouter(prefix="/api/admin/mail-jobs", tags=["Bulk Mail"])
+
+
+class MailJobCreate(BaseModel):
+    subject: str = Field(..., min_length=1, max_length=255)
+    body: str = Field(..., min_length=1)  # Paragraphs separated by blank lines
+    message_type: MessageType = MessageType.REMINDER
+    status: Optional[PaymentStatus] = None  # None = every registration
+    payment_type: Optional[PaymentType] = None
+
+
+class MailJobResponse(BaseModel):
+    id: int
+    message_type: MessageType
+    subject: str
+    status_filter: Optional[str]
+    payment_type_filter: Optional[str]
+    state: MailJobState
+    total: int
+    sent: int
+    failed: int
+    percent: float
+    rate_per_second: Optional[float]
+    eta_seconds: Optional[int]
+    error_message: Optional[str]
+    created_by: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+def job_progress(job: MailJob) -> dict:
+    """Job row plus percent done, send rate and estimated time left"""
+    processed = job.sent + job.failed
+    percent = round(100.0 * processed / job.total, 1) if job.total else 100.0
+    rate = None
+    eta = None
+    if job.started_at and processed:
+        elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+        if elapsed > 0:
+            rate = round(processed / elapsed, 2)
+            if job.state == MailJobState.RUNNING:
+                eta = int(max(job.total - processed, 0) / rate)
+    return {
+        "id": job.id,
+        "message_type": job.message_type,
+        "subject": job.subject,
+        "status_filter": job.status_filter,
+        "payment_type_filter": job.payment_type_filter,
+        "state": job.state,
+        "total": job.total,
+        "sent": job.sent,
+        "failed": job.failed,
+        "percent": min(percent, 100.0),
+        "rate_per_second": rate,
+        "eta_seconds": eta,
+        "error_message": job.error_message,
+        "created_by": job.created_by,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+@router.post("", response_model=MailJobResponse, status_code=202)
+async def create_mail_job(
+    data: MailJobCreate,
+    request: Request,
+    admin: AdminIdentity = Depends(current_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue a bulk email to every registration matching the filters
+    Sending starts immediately in the background - poll GET /{id} for progress
+    """
+    job = MailJob(
+        message_type=data.message_type,
+        subject=data.subject,
+        body=data.body,
+        status_filter=data.status.value if data.status else None,
+        payment_type_filter=data.payment_type.value if data.payment_type else None,
+        state=MailJobState.PENDING,
+        last_registration_id=0,
+        created_by=admin.email or "admin"
+    )
+    job.total = await count_recipients(db, job)
+    db.add(job)
+    await db.commit()
+
+    await log_audit_async(
+        db=db,
+        admin_id=admin.admin_id,
+        action=AuditAction.SEND_BULK_EMAIL,
+        details={
+            "mail_job_id": job.id,
+            "subject": job.subject,
+            "status": job.status_filter,
+            "payment_type": job.payment_type_filter,
+            "recipients": job.total
+        },
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent", None)
+    )
+
+    start_mail_job(job.id)
+    print(f"📨 Mail job {job.id} queued for {job.total} recipient(s)")
+    return job_progress(job)
+
+
+@router.get("", response_model=List[MailJobResponse])
+async def list_mail_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Most recent mail jobs first"""
+    jobs = (await db.scalars(select(MailJob).order_by(MailJob.id.desc()).limit(limit))).all()
+    return [job_progress(job) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=MailJobResponse)
+async def get_mail_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Progress of a mail job (reads the primary so progress is never behind)"""
+    job = await db.get(MailJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Mail job not found")
+    return job_progress(job)
+
+
+@router.post("/{job_id}/cancel", response_model=MailJobResponse)
+async def cancel_mail_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancel a pending or running job
+    The worker stops before its next batch; emails already sent stay sent
+    """
+    result = await db.execute(
+        update(MailJob)
+        .where(
+            MailJob.id == job_id,
+            MailJob.state.in_([MailJobState.PENDING, MailJobState.RUNNING])
+        )
+        .values(state=MailJobState.CANCELLED, finished_at=datetime.utcnow())
+    )
+    await db.commit()
+
+    job = await db.get(MailJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Mail job not found")
+    if result.rowcount == 0:
+        raise HTTPException(status_code=400, detail=f"Mail job is already {job.state.value}")
+    return job_progress(job)
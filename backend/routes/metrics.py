@@ -0,0 +1,76 @@
+"""
+Runtime metrics routes for the admin dashboard
+"""
+from fastapi import APIRouter, Query
+from datetime import datetime, timedelta
+import os
+
+from database import engine, async_engine, read_engine, async_read_engine, replica_state
+from utils.db_metrics import pool_status
+from utils.singleflight import caches, SingleFlightCache
+from utils.gate_stats import gate_stats, load_rollups, gate_report
+from utils.scanner_hub import scanner_hub
+
+GATE_DASHBOARD_CACHE_SECONDS = float(os.getenv("GATE_DASHBOARD_CACHE_SECONDS", "2"))
+
+gate_rollup_cache = SingleFlightCache("gate_rollups", ttl=GATE_DASHBOARD_CACHE_SECONDS, max_entries=16)
+
+router = APIRouter(prefix="/api/admin/metrics", tags=["Metrics"])
+
+
+@router.get("/db-pool")
+async def get_db_pool_metrics(reset: bool = False):
+    """
+    Live connection pool statistics (primary and, when configured, the read replica)
+    Checked out / overflow counts plus a checkout wait-time histogram since startup
+    (or since the last reset=true call)
+    """
+    pools = {
+        "primary": engine,
+        "primary_async": async_engine.sync_engine,
+    }
+    if read_engine is not None:
+        pools["replica"] = read_engine
+        pools["replica_async"] = async_read_engine.sync_engine
+    result = {name: pool_status(pool_engine) for name, pool_engine in pools.items()}
+    if reset:
+        for pool_engine in pools.values():
+            if hasattr(pool_engine.pool, "metrics"):
+                pool_engine.pool.metrics.reset()
+    result["replica_state"] = replica_state.status()
+    return result
+
+
+@router.get("/caches")
+async def get_cache_metrics():
+    """
+    Single-flight cache statistics for this worker
+    Hits, stale hits (served while refreshing), misses and coalesced waiters per cache
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+@router.get("/gates")
+async def get_gate_metrics(minutes: int = Query(15, ge=1, le=240)):
+    """
+    Live per-gate throughput for the doors-open dashboard
+    Check-ins per minute, rejected scans, and server / device-reported scan latency
+    percentiles (upper bound of the histogram bucket, in ms) for each gate and
+    device over the last `minutes`. Built from the flushed rollups of every worker
+    plus this worker's unflushed scans, so other workers lag by up to
+    GATE_STATS_FLUSH_SECONDS
+    """
+    since = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=minutes - 1)
+    flushed = await gate_rollup_cache.get(since, lambda: load_rollups(since))
+    pending = [(minute, gate, device, bucket) for (minute, gate, device), bucket in gate_stats.pending().items()]
+    return {
+        "since": since.isoformat(),
+        "as_of": datetime.utcnow().isoformat(),
+        "gates": gate_report(flushed + pending, since),
+    }
+
+
+@router.get("/scanners")
+async def get_scanner_metrics():
+    """Scanner WebSocket connections of this worker and ticket push counters"""
+    return scanner_hub.stats()
@@ -1,26 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Header
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 import os
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-import httpx
 from io import BytesIO
 
-from database import get_db
-from models.registration import Registration, Payment, Ticket, Attendance, Message, PaymentStatus, PaymentType, MessageType
+from database import get_async_db, AsyncSessionLocal
+from models.registration import Registration, Payment, Ticket, TicketState, PaymentStatus, PaymentType, MessageType
 from models.settings import Settings
+from models.team_member import TeamMember
 from utils.email import send_pending_confirmation_email
-from utils.storage import upload_payment_screenshot
-import json
-from datetime import datetime
+from utils.storage import upload_payment_screenshot, fetch_file
+from utils.serials import serial_allocator
+from utils.idempotency import idempotent, message_key, claim_message, finish_message, IDEMPOTENCY_HEADER
+from utils.invalidation import Channel, notify_async
+from utils.singleflight import SingleFlightCache
 import re
 
 router = APIRouter(prefix="/api", tags=["Registration"])
 limiter = Limiter(key_func=get_remote_address)
 
+# Payment QR images are fetched from storage once per TTL, not once per visitor
+PAYMENT_QR_CACHE_TTL_SECONDS = float(os.getenv("PAYMENT_QR_CACHE_TTL_SECONDS", "300"))
+PAYMENT_QR_CACHE_STALE_SECONDS = float(os.getenv("PAYMENT_QR_CACHE_STALE_SECONDS", "3600"))
+
+payment_qr_cache = SingleFlightCache(
+    "payment-qr",
+    ttl=PAYMENT_QR_CACHE_TTL_SECONDS,
+    stale_ttl=PAYMENT_QR_CACHE_STALE_SECONDS,
+    channels=(Channel.SETTINGS,),
+)
+
 
 class RegistrationCreate(BaseModel):
     name: str = Field(..., min_length=2, max_length=255)
@@ -54,6 +68,7 @@ class RegistrationResponse(BaseModel):
 
 @router.post("/register", response_model=RegistrationResponse, status_code=status.HTTP_201_CREATED)
 @limiter.limit("3/minute")
+@idempotent(status_code=status.HTTP_201_CREATED)
 async def register(
     request: Request,
     name: str = Form(...),
@@ -64,8 +79,14 @@ async def register(
     payment_type: str = Form(...),
     payment_screenshot: UploadFile = File(...),
     amount: str = Form(...),
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    Submit a registration with its payment screenshot
+    Send an Idempotency-Key header so a retry after a timeout returns the
+    original response instead of uploading and registering again
+    """
     name = re.sub(r'[<>\"\'&]', '', name.strip())
     email = email.strip().lower()
     phone = re.sub(r'[^\d\+\-\s()]', '', phone.strip())
@@ -89,8 +110,19 @@ async def register(
             detail="Invalid payment type. Use 'individual' or 'bulk'"
         )
     
+    member_names = []
+    if payment_type == "bulk":
+        member_names = TeamMember.parse_names(members)
+        if len(member_names) != 4:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Bulk registration requires exactly 4 members. Got {len(member_names)} members."
+            )
+    
     # Check if email already exists
-    existing = db.query(Registration).filter(Registration.email == email).first()
+    existing = (await db.execute(
+        select(Registration.id).where(Registration.email == email)
+    )).first()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -116,6 +148,18 @@ async def register(
         )
     
     try:
+        # Serials come from pre-reserved blocks, so the whole registration
+        # (payment, tickets, team members) is built up front and
+        # written in a single flush - the ORM batches each table into one INSERT
+        serial_number = (await serial_allocator.allocate(db))[0]
+        if payment_type == "individual":
+            ticket_holders = [(name, Ticket.generate_serial_code(serial_number, is_bulk=False))]
+        else:
+            ticket_holders = [
+                (member_name, Ticket.generate_serial_code(serial_number, is_bulk=True, member_index=idx))
+                for idx, member_name in enumerate(member_names)
+            ]
+        
         new_registration = Registration(
             name=name,
             email=email,
@@ -124,77 +168,32 @@ async def register(
             members=members,
             payment_type=PaymentType.BULK if payment_type == "bulk" else PaymentType.INDIVIDUAL
         )
-        db.add(new_registration)
-        db.flush()
-        
-        new_payment = Payment(
-            registration_id=new_registration.id,
+        new_registration.payment = Payment(
             payment_screenshot=file_url,
             status=PaymentStatus.PENDING,
             amount=float(amount),
             payment_method="UPI"
         )
-        db.add(new_payment)
-        db.flush()
-        
-        # Create tickets based on payment type
-        tickets_created = []
-        if payment_type == "individual":
-            ticket = Ticket(
-                registration_id=new_registration.id,
-                member_name=name,
-                serial_code=Ticket.generate_serial_code(new_registration.id, is_bulk=False)
-            )
-            db.add(ticket)
-            db.flush()
-            tickets_created.append(ticket)
-            
-            attendance = Attendance(
-                ticket_id=ticket.id,
-                checked_in=False
-            )
-            db.add(attendance)
-            
-        else:
-            member_names = []
-            if members:
-                try:
-                    member_names = json.loads(members)
-                    if not isinstance(member_names, list):
-                        member_names = [str(members)]
-                except json.JSONDecodeError:
-                    member_names = [m.strip() for m in members.split(',') if m.strip()]
-            if len(member_names) != 4:
-                db.rollback()
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Bulk registration requires exactly 4 members. Got {len(member_names)} members."
-                )
-            
-            for idx, member_name in enumerate(member_names):
-                ticket = Ticket(
-                    registration_id=new_registration.id,
-                    member_name=member_name,
-                    serial_code=Ticket.generate_serial_code(new_registration.id, is_bulk=True, member_index=idx)
-                )
-                db.add(ticket)
-                db.flush()
-                tickets_created.append(ticket)
-                
-                attendance = Attendance(
-                    ticket_id=ticket.id,
-                    checked_in=False
-                )
-                db.add(attendance)
+        tickets_created = [
+            Ticket(member_name=member_name, serial_code=serial_code, state=TicketState.PENDING)
+            for member_name, serial_code in ticket_holders
+        ]
+        new_registration.tickets = tickets_created
+        if member_names:
+            new_registration.team_members = [
+                TeamMember(**row) for row in TeamMember.build_rows(name, email, phone, member_names)
+            ]
+        db.add(new_registration)
+        # New names, email, phone and serials for the participant search
+        await notify_async(db, Channel.REGISTRATIONS)
         
-        db.commit()
-        db.refresh(new_registration)
+        await db.commit()
         
         ip_address = request.client.host if request.client else None
         user_agent = request.headers.get("user-agent", None)
         
-        from utils.audit import log_audit, AuditAction
-        log_audit(
+        from utils.audit import log_audit_async, AuditAction
+        await log_audit_async(
             db=db,
             admin_id=1,  # System user for public registrations
             action=AuditAction.NEW_REGISTRATION,
@@ -212,24 +211,25 @@ async def register(
         )
         
         try:
-            email_sent = await send_pending_confirmation_email(email, name, tickets_created[0].serial_code if tickets_created else "PENDING")
-            
-            email_log = Message(
+            reference_serial = tickets_created[0].serial_code if tickets_created else "PENDING"
+            email_log = await db.run_sync(
+                claim_message,
+                message_key(new_registration.id, MessageType.CONFIRMATION, email, reference_serial),
                 registration_id=new_registration.id,
                 message_type=MessageType.CONFIRMATION,
                 subject="Event Registration Received - Pending Review",
                 body=f"Confirmation email sent to {email}. Created {len(tickets_created)} ticket(s).",
-                sent=email_sent,
                 recipient_email=email,
                 has_attachment=False
             )
-            if email_sent:
-                email_log.sent_at = datetime.utcnow()
-            db.add(email_log)
-            db.commit()
+            
+            email_sent = False
+            if email_log:
+                email_sent = await send_pending_confirmation_email(email, name, reference_serial)
+                await db.run_sync(finish_message, email_log, email_sent)
             
             if email_sent:
-                log_audit(
+                await log_audit_async(
                     db=db,
                     admin_id=1,
                     action=AuditAction.SEND_PENDING_EMAIL,
@@ -250,8 +250,10 @@ async def register(
             message="Registration submitted successfully! You will receive a confirmation email shortly. Our team will review your payment and send your ticket within 24-48 hours."
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create registration: {str(e)}"
@@ -259,21 +261,24 @@ async def register(
 
 
 @router.get("/registration/status/{email}")
-async def check_registration_status(email: str, db: Session = Depends(get_db)):
-    registration = db.query(Registration).filter(Registration.email == email).first()
+async def check_registration_status(email: str, db: AsyncSession = Depends(get_async_db)):
+    registration = (await db.execute(
+        select(Registration).where(Registration.email == email)
+    )).scalar_one_or_none()
     if not registration:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No registration found with this email"
         )
     
-    payment = db.query(Payment).filter(Payment.registration_id == registration.id).first()
+    payment = (await db.execute(
+        select(Payment).where(Payment.registration_id == registration.id)
+    )).scalar_one_or_none()
     payment_status = payment.status.value if payment else "pending"
     
-    tickets_count = db.query(Ticket).filter(Ticket.registration_id == registration.id).count()
-    
-    tickets = db.query(Ticket).filter(Ticket.registration_id == registration.id).all()
-    ticket_serials = [t.serial_code for t in tickets]
+    ticket_serials = (await db.execute(
+        select(Ticket.serial_code).where(Ticket.registration_id == registration.id)
+    )).scalars().all()
     
     return {
         "id": registration.id,
@@ -281,23 +286,33 @@ async def check_registration_status(email: str, db: Session = Depends(get_db)):
         "email": registration.email,
         "payment_type": registration.payment_type.value,
         "status": payment_status,
-        "tickets_count": tickets_count,
-        "ticket_serials": ticket_serials,
+        "tickets_count": len(ticket_serials),
+        "ticket_serials": list(ticket_serials),
         "created_at": registration.created_at.isoformat()
     }
 
 
 @router.get("/payment-qr/{qr_type}")
 @limiter.limit("20/minute")
-async def get_payment_qr_code(
-    request: Request,
-    qr_type: str,
-    db: Session = Depends(get_db)
-):
+async def get_payment_qr_code(request: Request, qr_type: str):
     if qr_type not in ["individual", "bulk"]:
         raise HTTPException(status_code=400, detail="Invalid QR type. Use 'individual' or 'bulk'")
     
-    settings = db.query(Settings).first()
+    content, content_type = await payment_qr_cache.get(qr_type, lambda: _load_payment_qr(qr_type))
+    return StreamingResponse(
+        BytesIO(content),
+        media_type=content_type,
+        headers={
+            "Cache-Control": "public, max-age=3600",
+            "Content-Disposition": f"inline; filename={qr_type}_payment_qr.png"
+        }
+    )
+
+
+async def _load_payment_qr(qr_type: str):
+    """(image bytes, content type) of the uploaded payment QR"""
+    async with AsyncSessionLocal() as db:
+        settings = (await db.execute(select(Settings).limit(1))).scalar_one_or_none()
     if not settings:
         raise HTTPException(status_code=404, detail="Settings not configured")
     
@@ -307,24 +322,15 @@ async def get_payment_qr_code(
         raise HTTPException(status_code=404, detail=f"{qr_type.capitalize()} QR code not uploaded yet")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(qr_url)
-            response.raise_for_status()
-            
-            content_type = "image/png"
-            if ".jpg" in qr_url or ".jpeg" in qr_url:
-                content_type = "image/jpeg"
-            elif ".svg" in qr_url:
-                content_type = "image/svg+xml"
-            
-            return StreamingResponse(
-                BytesIO(response.content),
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=3600",
-                    "Content-Disposition": f"inline; filename={qr_type}_payment_qr.png"
-                }
-            )
-    
+        content = await fetch_file(qr_url)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch QR code: {str(e)}")
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"{qr_type.capitalize()} QR code file is missing")
+    
+    content_type = "image/png"
+    if ".jpg" in qr_url or ".jpeg" in qr_url:
+        content_type = "image/jpeg"
+    elif ".svg" in qr_url:
+        content_type = "image/svg+xml"
+    return content, content_type
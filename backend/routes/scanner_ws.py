@@ -0,0 +1,185 @@
+"""
+Persistent WebSocket channel for scanner devices
+A scanner opens /ws/scanner once, authenticates with its admin JWT in the first
+frame, and then sends scans as small JSON frames over the same connection - no
+TLS handshake or HTTP middleware per scan. Each request runs the same code as
+the matching HTTP endpoint in routes.ticket, so the answers are identical.
+
+Protocol (JSON text frames):
+    -> {"type": "auth", "token": "<JWT>", "gate": "north", "device": "a1b2"}
+    <- {"type": "ready", "protocol": 1}
+    -> {"type": "scan", "id": 7, "serial": "...", "auto_checkin": true, "latency_ms": 180}
+    <- {"type": "result", "id": 7, "status": 200, "body": {...same as POST /scan...}}
+Request types: verify, scan, checkin (/mark-used), checkout, group,
+group_checkin (with "serial_codes"). Errors come back as a result with the
+HTTP status and {"detail": ...}.
+
+The server also pushes {"type": "tickets", "tickets": [...]} when tickets
+change (approvals, deactivations, check-ins at other gates) and
+{"type": "resync"} when changes may have been missed (utils.scanner_hub).
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status
+import jwt
+
+from database import AsyncSessionLocal
+from utils.admin_auth import SECRET_KEY, ALGORITHM, UNATTRIBUTED_ADMIN_ID, admin_id_for_email
+from routes.ticket import (
+    verify_ticket, scan_ticket, mark_ticket_used, check_out_ticket_scan,
+    scan_group, check_in_group_tickets, GroupCheckinRequest
+)
+from utils.gate_stats import ScanSource, recording, parse_latency
+from utils.scanner_hub import scanner_hub
+
+router = APIRouter(tags=["Ticket Verification"])
+
+SCANNER_WS_AUTH_TIMEOUT_SECONDS = float(os.getenv("SCANNER_WS_AUTH_TIMEOUT_SECONDS", "10"))
+PROTOCOL_VERSION = 1
+
+CLOSE_UNAUTHORIZED = 4401  # Missing, invalid or expired token - log in again
+
+REQUEST_TYPES = ("verify", "scan", "checkin", "checkout", "group", "group_checkin")
+
+
+class ScannerConnection:
+    """One authenticated scanner socket"""
+
+    def __init__(
+        self, websocket: WebSocket, email: str, expires_at: float, admin_id: int, gate=None, device=None
+    ):
+        self.websocket = websocket
+        self.email = email
+        self.admin_id = admin_id
+        self.expires_at = expires_at
+        self.gate = gate
+        self.device = device
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, message: dict):
+        # Replies and pushes come from different tasks
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message))
+
+    async def abort(self):
+        try:
+            await self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+
+
+def authenticate(message: dict):
+    """(email, expiry timestamp) from the auth frame, or None"""
+    if message.get("type") != "auth" or not isinstance(message.get("token"), str):
+        return None
+    try:
+        payload = jwt.decode(message["token"], SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    return payload.get("sub"), float(payload.get("exp") or 0)
+
+
+async def handle_request(connection: ScannerConnection, message: dict):
+    """
+    Run one scan request through the HTTP endpoint code - returns (status, body)
+    The socket stands in for the Request (client address / user agent for audit rows)
+    """
+    kind = message.get("type")
+    if kind not in REQUEST_TYPES:
+        return status.HTTP_400_BAD_REQUEST, {"detail": f"Unknown request type: {kind}"}
+    serial = message.get("serial")
+    if not isinstance(serial, str) or not serial:
+        return status.HTTP_422_UNPROCESSABLE_ENTITY, {"detail": "serial is required"}
+
+    source = ScanSource(
+        connection.gate, connection.device, parse_latency(message.get("latency_ms")), connection.admin_id
+    )
+    websocket = connection.websocket
+    with recording(source):
+        async with AsyncSessionLocal() as db:
+            if kind == "verify":
+                result = await verify_ticket(serial, source=source, db=db)
+            elif kind == "scan":
+                result = await scan_ticket(
+                    serial, websocket, auto_checkin=bool(message.get("auto_checkin")), source=source, db=db
+                )
+            elif kind == "checkin":
+                result = await mark_ticket_used(serial, websocket, source=source, db=db)
+            elif kind == "checkout":
+                result = await check_out_ticket_scan(serial, websocket, source=source, db=db)
+            elif kind == "group":
+                result = await scan_group(serial, source=source, db=db)
+            else:
+                data = GroupCheckinRequest(serial_codes=message.get("serial_codes"))
+                result = await check_in_group_tickets(serial, websocket, data=data, source=source, db=db)
+    return status.HTTP_200_OK, result.model_dump()
+
+
+async def serve(connection: ScannerConnection):
+    """Answer requests in order until the device disconnects or its token expires"""
+    websocket = connection.websocket
+    while True:
+        try:
+            message = json.loads(await websocket.receive_text())
+        except (ValueError, KeyError):  # Not JSON, or a binary frame
+            await connection.send({"type": "error", "detail": "Frames must be JSON"})
+            continue
+        if not isinstance(message, dict):
+            await connection.send({"type": "error", "detail": "Frames must be JSON objects"})
+            continue
+
+        if message.get("type") == "ping":
+            await connection.send({"type": "pong"})
+            continue
+        if time.time() >= connection.expires_at:
+            await websocket.close(code=CLOSE_UNAUTHORIZED, reason="Token expired")
+            return
+
+        try:
+            result_status, body = await handle_request(connection, message)
+        except HTTPException as e:
+            result_status, body = e.status_code, {"detail": e.detail}
+        except Exception as e:
+            print(f"⚠️  Scanner socket request failed: {e}")
+            result_status, body = status.HTTP_500_INTERNAL_SERVER_ERROR, {"detail": "Internal server error"}
+        await connection.send({"type": "result", "id": message.get("id"), "status": result_status, "body": body})
+
+
+@router.websocket("/ws/scanner")
+async def scanner_socket(websocket: WebSocket):
+    """
+    Scanner device channel - see the module docstring for the protocol
+    Authenticate within SCANNER_WS_AUTH_TIMEOUT_SECONDS or the socket is closed
+    """
+    await websocket.accept()
+    try:
+        message = json.loads(await asyncio.wait_for(websocket.receive_text(), SCANNER_WS_AUTH_TIMEOUT_SECONDS))
+        auth = authenticate(message) if isinstance(message, dict) else None
+    except (asyncio.TimeoutError, ValueError, KeyError):
+        auth = None
+    except WebSocketDisconnect:
+        return
+    if auth is None:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="Authentication required")
+        return
+
+    email, expires_at = auth
+    admin_id = await admin_id_for_email(email) if email else None
+    connection = ScannerConnection(
+        websocket, email, expires_at, admin_id or UNATTRIBUTED_ADMIN_ID, message.get("gate"), message.get("device")
+    )
+    await connection.send({
+        "type": "ready",
+        "protocol": PROTOCOL_VERSION,
+        "server_time": datetime.utcnow().isoformat(),
+    })
+    scanner_hub.add(connection)
+    try:
+        await serve(connection)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        scanner_hub.discard(connection)
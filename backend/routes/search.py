@@ -0,0 +1,145 @@
+"""
+Participant search for the help desk
+Matches registration name, email, phone, team name, member names and ticket
+serials by substring / prefix and tolerates typos:
+- Postgres: pg_trgm word similarity + tsvector prefix queries on GIN indexes
+- SQLite: the in-memory index in utils.search_index
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, func, literal, literal_column, union_all, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from pydantic import BaseModel
+
+from database import get_async_read_db
+from models.registration import Registration, Payment, Ticket, search_document, search_tsvector
+from models.team_member import TeamMember
+from utils.search_index import search_index, tokenize, SEARCH_FUZZY_THRESHOLD
+
+router = APIRouter(prefix="/api/admin/search", tags=["Search"])
+
+
+class SearchResult(BaseModel):
+    id: int
+    serial_code: str
+    name: str
+    email: str
+    phone: str
+    team_name: Optional[str]
+    status: str
+    payment_type: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def postgres_search_query(term: str, limit: int):
+    """Best score per registration over registration, member and ticket matches"""
+    term = term.lower()
+    like = _like_pattern(term)
+    document = search_document(Registration.name, Registration.email, Registration.phone, Registration.team_name)
+    member_name = TeamMember.search_name()
+
+    parts = [
+        # Fuzzy words and substrings of name / email / phone / team name
+        select(
+            Registration.id.label("registration_id"),
+            func.word_similarity(term, document).label("score")
+        ).where(or_(document.op("%>")(term), document.like(like, escape="\\"))),
+        # Fuzzy / substring member names
+        select(
+            TeamMember.registration_id,
+            func.word_similarity(term, member_name)
+        ).where(or_(member_name.op("%>")(term), member_name.like(like, escape="\\"))),
+        # Ticket serial substrings
+        select(Ticket.registration_id, literal(1.0)).where(
+            Ticket.serial_code.like(_like_pattern(term.upper()), escape="\\")
+        ),
+    ]
+    words = tokenize(term)
+    if len(words) > 1:
+        # Every word as a prefix of a name / team name word ("jo sm" -> John Smith)
+        prefix_query = " & ".join(f"{word}:*" for word in words)
+        parts.append(
+            select(Registration.id, literal(0.95)).where(
+                search_tsvector(Registration.name, Registration.team_name).op("@@")(
+                    func.to_tsquery(literal_column("'simple'"), prefix_query)
+                )
+            )
+        )
+
+    hits = union_all(*parts).subquery()
+    best = (
+        select(hits.c.registration_id, func.max(hits.c.score).label("score"))
+        .group_by(hits.c.registration_id)
+        .subquery()
+    )
+    return (
+        select(Registration, Payment.status, best.c.score)
+        .join(best, best.c.registration_id == Registration.id)
+        .join(Payment, Payment.registration_id == Registration.id)
+        .order_by(best.c.score.desc(), Registration.id)
+        .limit(limit)
+    )
+
+
+def _result(reg: Registration, payment_status, score: float) -> SearchResult:
+    return SearchResult(
+        id=reg.id,
+        serial_code=f"REG-{reg.id:06d}",
+        name=reg.name,
+        email=reg.email,
+        phone=reg.phone,
+        team_name=reg.team_name,
+        status=payment_status.value,
+        payment_type=reg.payment_type.value,
+        score=round(float(score), 3)
+    )
+
+
+@router.get("", response_model=SearchResponse)
+async def search_participants(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Search participants by name, email, phone, team, member name or ticket serial
+    Prefix and typo-tolerant; best matches first
+    """
+    q = q.strip()
+
+    if db.bind.dialect.name == "postgresql":
+        # Word similarity cut-off for the %> operator, for this transaction only
+        await db.execute(select(func.set_config(
+            "pg_trgm.word_similarity_threshold", str(SEARCH_FUZZY_THRESHOLD), True
+        )))
+        rows = (await db.execute(postgres_search_query(q, limit))).all()
+        return SearchResponse(query=q, results=[_result(reg, st, score) for reg, st, score in rows])
+
+    await search_index.refresh(db)
+    ranked = search_index.search(q, limit)
+    if not ranked:
+        return SearchResponse(query=q, results=[])
+    rows = (await db.execute(
+        select(Registration, Payment.status)
+        .join(Payment, Payment.registration_id == Registration.id)
+        .where(Registration.id.in_([registration_id for registration_id, _ in ranked]))
+    )).all()
+    by_id = {reg.id: (reg, payment_status) for reg, payment_status in rows}
+    return SearchResponse(
+        query=q,
+        results=[
+            _result(*by_id[registration_id], score)
+            for registration_id, score in ranked
+            if registration_id in by_id
+        ]
+    )
@@ -5,23 +5,14 @@ from database import get_db
 from models.settings import Settings
 from pydantic import BaseModel
 from typing import Optional
-import cloudinary
-import cloudinary.uploader
-import os
 from io import BytesIO
-import httpx
 from utils.audit import log_audit, AuditAction
+from utils.storage import upload_payment_qr, fetch_file
+from utils.invalidation import notify, Channel
 
 
 router = APIRouter(prefix="/api/admin/settings", tags=["settings"])
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
-
 
 class SettingsUpdate(BaseModel):
     event_name: Optional[str] = None
@@ -78,6 +69,7 @@ def get_settings(db: Session = Depends(get_db)):
         # Create default settings if none exist
         settings = Settings()
         db.add(settings)
+        notify(db, Channel.SETTINGS)
         db.commit()
         db.refresh(settings)
     
@@ -104,6 +96,7 @@ def update_settings(
     for field, value in update_data.items():
         setattr(settings, field, value)
     
+    notify(db, Channel.SETTINGS)  # Every worker re-reads on its next email
     db.commit()
     db.refresh(settings)
     
@@ -141,14 +134,10 @@ async def upload_qr_code(
         # Read file content
         contents = await file.read()
         
-        # Upload to Cloudinary in dedicated qr_codes folder
-        upload_result = cloudinary.uploader.upload(
-            contents,
-            folder="qr_codes/payment",
-            public_id=f"{qr_type}_qr",
-            overwrite=True,
-            resource_type="image"
-        )
+        # Upload to storage in dedicated qr_codes folder
+        qr_url = await upload_payment_qr(contents, qr_type, file.filename)
+        if not qr_url:
+            raise HTTPException(status_code=500, detail="Failed to upload QR code to storage")
         
         # Get settings
         settings = db.query(Settings).first()
@@ -157,12 +146,12 @@ async def upload_qr_code(
             db.add(settings)
         
         # Update QR URL in database
-        qr_url = upload_result["secure_url"]
         if qr_type == "individual":
             settings.individual_qr_code = qr_url
         else:
             settings.bulk_qr_code = qr_url
         
+        notify(db, Channel.SETTINGS)  # Also drops cached payment QR images (same URL on re-upload)
         db.commit()
         
         # Log QR upload
@@ -186,6 +175,8 @@ async def upload_qr_code(
             "qr_type": qr_type
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -212,26 +203,28 @@ async def get_qr_code(
         raise HTTPException(status_code=404, detail=f"{qr_type.capitalize()} QR code not uploaded yet")
     
     try:
-        # Fetch image from Cloudinary
-        async with httpx.AsyncClient() as client:
-            response = await client.get(qr_url)
-            response.raise_for_status()
-            
-            # Determine content type from Cloudinary URL
-            content_type = "image/png"
-            if ".jpg" in qr_url or ".jpeg" in qr_url:
-                content_type = "image/jpeg"
-            elif ".svg" in qr_url:
-                content_type = "image/svg+xml"
-            
-            return StreamingResponse(
-                BytesIO(response.content),
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=3600",
-                    "Content-Disposition": f"inline; filename={qr_type}_qr.png"
-                }
-            )
+        # Fetch image from storage
+        content = await fetch_file(qr_url)
+        if content is None:
+            raise HTTPException(status_code=404, detail=f"{qr_type.capitalize()} QR code file is missing")
+        
+        # Determine content type from storage URL
+        content_type = "image/png"
+        if ".jpg" in qr_url or ".jpeg" in qr_url:
+            content_type = "image/jpeg"
+        elif ".svg" in qr_url:
+            content_type = "image/svg+xml"
+        
+        return StreamingResponse(
+            BytesIO(content),
+            media_type=content_type,
+            headers={
+                "Cache-Control": "public, max-age=3600",
+                "Content-Disposition": f"inline; filename={qr_type}_qr.png"
+            }
+        )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch QR code: {str(e)}")
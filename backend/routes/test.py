@@ -1,13 +1,14 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Depends
 from typing import Optional
 from sqlalchemy.orm import Session
-from utils.storage import upload_payment_screenshot, upload_qr_code
+from utils.storage import upload_payment_screenshot
 from utils.email import (
     send_approval_email, 
     send_rejection_email, 
     send_pending_confirmation_email
 )
 from database import get_db
+from utils.invalidation import notify, Channel
 from models.registration import Registration, Ticket
 import os
 from datetime import datetime
@@ -239,6 +240,7 @@ async def delete_ticket(serial_code: str, db: Session = Depends(get_db)):
         
         ticket_id = ticket.id
         db.delete(ticket)
+        notify(db, Channel.REGISTRATIONS)
         db.commit()
         
         return {
@@ -302,6 +304,7 @@ async def delete_registration(serial_code: str, db: Session = Depends(get_db)):
         
         # Delete registration
         db.delete(registration)
+        notify(db, Channel.REGISTRATIONS)
         db.commit()
         
         return {
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
-from database import get_db
-from models.registration import Registration, Ticket, Attendance, PaymentStatus, Payment
+from database import get_async_db
+from models.registration import Ticket, TicketState, Payment, ENTERED_STATES
 from datetime import datetime
-from utils.audit import log_audit, AuditAction
+from utils.audit import add_audit_rows, audit_row, AuditAction
+from utils.serials import is_valid_serial
+from utils.ticket_token import is_ticket_token, decode_ticket_token, TicketTokenError
+from utils.ticket_index import ticket_state_select, ticket_index, lookup_ticket
+from utils.occupancy import add_to_counter, get_occupancy, Counter
+from utils.gate_stats import scan_source, ScanSource
+from utils.invalidation import notify_async, Channel
+from utils.scanner_hub import SCANNER_PUSH_ENABLED
 
 router = APIRouter(tags=["Ticket Verification"])
 
@@ -20,6 +29,8 @@ class TicketDetails(BaseModel):
     is_active: bool
     checked_in: bool
     check_in_time: Optional[str]
+    checked_out: bool = False
+    check_out_time: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -31,80 +42,519 @@ class TicketVerifyResponse(BaseModel):
     details: Optional[TicketDetails] = None
 
 
+class ScanResponse(TicketVerifyResponse):
+    checked_in_now: bool = False  # True only for the scan that performed the check-in
+
+
+class CheckoutResponse(TicketVerifyResponse):
+    checked_out_now: bool = False  # True only for the scan that performed the check-out
+
+
+class OccupancyResponse(BaseModel):
+    inside: int  # Checked in minus checked out
+    checked_in: int
+    checked_out: int
+    as_of: str
+
+
 class MarkUsedResponse(BaseModel):
     success: bool
     message: str
 
 
-@router.get("/verify-ticket/{serial}", response_model=TicketVerifyResponse)
-async def verify_ticket(
-    serial: str,
-    db: Session = Depends(get_db)
-):
-    ticket = db.query(Ticket).filter(
-        Ticket.serial_code == serial.upper()
-    ).first()
-    
-    if not ticket:
-        return TicketVerifyResponse(
-            valid=False,
-            message="Invalid serial code. Ticket not found.",
-            details=None
-        )
-    
-    registration = db.query(Registration).filter(Registration.id == ticket.registration_id).first()
-    if not registration:
-        return TicketVerifyResponse(
-            valid=False,
-            message="Registration not found for this ticket.",
-            details=None
-        )
-    
-    payment = db.query(Payment).filter(Payment.registration_id == registration.id).first()
-    if not payment or payment.status != PaymentStatus.APPROVED:
+class GroupTicket(BaseModel):
+    serial_code: str
+    member_name: str
+    is_active: bool
+    checked_in: bool
+    check_in_time: Optional[str]
+    can_check_in: bool
+    message: str
+
+
+class GroupScanResponse(BaseModel):
+    registration_id: int
+    scanned_serial: str
+    team_name: Optional[str]
+    email: str
+    phone: str
+    payment_status: str
+    tickets: List[GroupTicket]
+    checked_in_now: List[str] = []
+    message: str
+
+
+class GroupCheckinRequest(BaseModel):
+    serial_codes: Optional[List[str]] = None  # None = every ticket that can be checked in
+
+
+class InvalidSerial(Exception):
+    """Serial / QR token rejected before any database lookup"""
+
+
+def resolve_serial(serial: str) -> str:
+    """Serial code from a scanned value - signed QR tokens are decoded, check digit verified"""
+    # Signed QR tokens carry the serial - forged or expired ones are rejected here
+    if is_ticket_token(serial):
+        try:
+            serial = decode_ticket_token(serial).serial_code
+        except TicketTokenError as e:
+            raise InvalidSerial(f"{e}.")
+
+    # Mistyped or forged codes fail the check digit without a database hit
+    if not is_valid_serial(serial):
+        raise InvalidSerial("Invalid serial code. Check digit does not match.")
+    return serial.upper()
+
+
+def ticket_state_query(serial_code: str):
+    return ticket_state_select().where(Ticket.serial_code == serial_code)
+
+
+def group_state_query(serial_code: str):
+    """Every ticket of the registration the scanned ticket belongs to, with its payment status"""
+    scanned = aliased(Ticket)
+    return (
+        ticket_state_select()
+        .add_columns(Payment.status.label("payment_status"))
+        .outerjoin(Payment, Payment.registration_id == Ticket.registration_id)
+        .where(Ticket.registration_id == select(scanned.registration_id).where(
+            scanned.serial_code == serial_code
+        ).scalar_subquery())
+        .order_by(Ticket.id)
+    )
+
+
+async def load_ticket_state(db: AsyncSession, serial_code: str):
+    return (await db.execute(ticket_state_query(serial_code))).one_or_none()
+
+
+async def current_ticket_state(db: AsyncSession, serial_code: str):
+    """Ticket state from the worker's ticket index, falling back to the database on a miss"""
+    record = lookup_ticket(serial_code)
+    if record is not None:
+        return record
+    row = await load_ticket_state(db, serial_code)
+    if row is not None:
+        ticket_index.put_rows([row])
+    return row
+
+
+# Ticket state -> why it cannot be checked in
+STATE_PROBLEMS = {
+    TicketState.PENDING: "payment",
+    TicketState.REJECTED: "payment",
+    TicketState.DEACTIVATED: "inactive",
+    TicketState.CHECKED_IN: "checked_in",
+    TicketState.CHECKED_OUT: "checked_out",
+}
+
+# Payment status a ticket was refused for, when the payment row is not loaded
+PAYMENT_STATE_LABELS = {
+    TicketState.PENDING: "pending",
+    TicketState.REJECTED: "rejected",
+}
+
+
+def ticket_problem(row) -> Optional[str]:
+    """Why a ticket cannot be checked in - not_found, payment, inactive, checked_in, checked_out - or None"""
+    if row is None:
+        return "not_found"
+    return STATE_PROBLEMS.get(row.state)
+
+
+def payment_status_label(row) -> str:
+    """
+    Payment status shown for a ticket row - Payment.status when the row carries it
+    (group rows), otherwise the pending / rejected ticket state it was refused for
+    """
+    payment_status = getattr(row, "payment_status", None)
+    if payment_status is not None:
+        return payment_status.value
+    return PAYMENT_STATE_LABELS.get(row.state, "unknown")
+
+
+def _time(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def ticket_details(row) -> TicketDetails:
+    return TicketDetails(
+        serial_code=row.serial_code,
+        member_name=row.member_name,
+        email=row.email,
+        phone=row.phone,
+        team_name=row.team_name,
+        is_active=row.state != TicketState.DEACTIVATED,
+        checked_in=row.state in ENTERED_STATES,
+        check_in_time=_time(row.checked_in_at) if row.state in ENTERED_STATES else None,
+        checked_out=row.state == TicketState.CHECKED_OUT,
+        check_out_time=_time(row.checked_out_at) if row.state == TicketState.CHECKED_OUT else None
+    )
+
+
+def scanned(source: ScanSource, response):
+    """Mark scans the scanner has to turn away as rejected in the gate stats"""
+    source.rejected = not response.valid
+    return response
+
+
+def verify_response(row) -> TicketVerifyResponse:
+    """Scanner verification result for a loaded ticket row"""
+    problem = ticket_problem(row)
+    if problem == "not_found":
+        return TicketVerifyResponse(valid=False, message="Invalid serial code. Ticket not found.")
+    if problem == "payment":
+        payment_status = payment_status_label(row)
         return TicketVerifyResponse(
             valid=False,
-            message=f"Ticket payment is not approved. Status: {payment.status.value if payment else 'unknown'}",
-            details=None
+            message=f"Ticket payment is not approved. Status: {payment_status}"
         )
-    
-    if not ticket.is_active:
+    if problem == "inactive":
+        return TicketVerifyResponse(valid=False, message="Ticket has been deactivated.")
+    if problem == "checked_in":
         return TicketVerifyResponse(
             valid=False,
-            message="Ticket has been deactivated.",
-            details=None
+            message=f"Ticket already checked in at {_time(row.checked_in_at) or 'unknown time'}.",
+            details=ticket_details(row)
         )
-    
-    attendance = db.query(Attendance).filter(Attendance.ticket_id == ticket.id).first()
-    if attendance and attendance.checked_in:
+    if problem == "checked_out":
         return TicketVerifyResponse(
             valid=False,
-            message=f"Ticket already checked in at {attendance.check_in_time.isoformat() if attendance.check_in_time else 'unknown time'}.",
-            details=TicketDetails(
-                serial_code=ticket.serial_code,
-                member_name=ticket.member_name,
-                email=registration.email,
-                phone=registration.phone,
-                team_name=registration.team_name,
-                is_active=ticket.is_active,
-                checked_in=True,
-                check_in_time=attendance.check_in_time.isoformat() if attendance.check_in_time else None
-            )
+            message=f"Ticket already checked out at {_time(row.checked_out_at) or 'unknown time'}.",
+            details=ticket_details(row)
         )
-    
     return TicketVerifyResponse(
         valid=True,
         message="Ticket is valid and ready for check-in.",
-        details=TicketDetails(
-            serial_code=ticket.serial_code,
-            member_name=ticket.member_name,
-            email=registration.email,
-            phone=registration.phone,
-            team_name=registration.team_name,
-            is_active=ticket.is_active,
-            checked_in=False,
-            check_in_time=None
+        details=ticket_details(row)
+    )
+
+
+async def check_in_ticket(db: AsyncSession, serial_code: str, now: datetime, by: str = None) -> bool:
+    """
+    Check in one ticket with a single conditional UPDATE on its serial
+    The ticket must be valid (paid, active, not yet checked in) at the moment
+    the row is written, so two scanners racing on the same ticket cannot both win.
+    Nothing is committed. Returns False when the ticket was not eligible.
+    """
+    result = await db.execute(
+        update(Ticket)
+        .where(Ticket.serial_code == serial_code, Ticket.state == TicketState.VALID)
+        .values(state=TicketState.CHECKED_IN, checked_in_at=now, check_in_by=by)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def announce_ticket_states(db: AsyncSession, serial_codes: List[str]):
+    """Push the new state of these tickets to connected scanners once the transaction commits"""
+    if SCANNER_PUSH_ENABLED and serial_codes:
+        await notify_async(db, Channel.TICKET_STATE, ",".join(serial_codes))
+
+
+def checkin_audit_row(row, check_in_time: datetime, request: Request, source: ScanSource) -> dict:
+    return audit_row(
+        admin_id=source.admin_id,
+        action=AuditAction.TICKET_CHECKIN,
+        details={
+            "serial_code": row.serial_code,
+            "member_name": row.member_name,
+            "registration_id": row.registration_id,
+            "check_in_time": check_in_time.isoformat(),
+            **source.audit_details()
+        },
+        registration_id=row.registration_id,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent", None)
+    )
+
+
+async def scan_and_check_in(db: AsyncSession, serial_code: str, request: Request, source: ScanSource):
+    """
+    Check a ticket in and load its state, all in the caller's transaction
+    Returns (row, checked_in_now); the audit entry is added but not committed
+    """
+    now = datetime.utcnow()
+    checked_in = await check_in_ticket(db, serial_code, now, source.label)
+    row = await load_ticket_state(db, serial_code)
+
+    if checked_in:
+        source.check_ins = 1
+        await add_to_counter(db, Counter.CHECKED_IN)
+        await announce_ticket_states(db, [serial_code])
+        await add_audit_rows(db, [checkin_audit_row(row, now, request, source)])
+    return row, checked_in
+
+
+async def check_out_ticket(db: AsyncSession, serial_code: str, now: datetime, by: str = None) -> bool:
+    """Check out one checked-in ticket with a single conditional UPDATE - nothing is committed"""
+    result = await db.execute(
+        update(Ticket)
+        .where(Ticket.serial_code == serial_code, Ticket.state == TicketState.CHECKED_IN)
+        .values(state=TicketState.CHECKED_OUT, checked_out_at=now, check_out_by=by)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def scan_and_check_out(db: AsyncSession, serial_code: str, request: Request, source: ScanSource):
+    """check_out_ticket plus its counter and audit entry - returns (row, checked_out_now), not committed"""
+    now = datetime.utcnow()
+    checked_out = await check_out_ticket(db, serial_code, now, source.label)
+    row = await load_ticket_state(db, serial_code)
+
+    if checked_out:
+        source.check_outs = 1
+        await add_to_counter(db, Counter.CHECKED_OUT)
+        await announce_ticket_states(db, [serial_code])
+        await add_audit_rows(db, [audit_row(
+            admin_id=source.admin_id,
+            action=AuditAction.TICKET_CHECKOUT,
+            details={
+                "serial_code": row.serial_code,
+                "member_name": row.member_name,
+                "registration_id": row.registration_id,
+                "check_out_time": now.isoformat(),
+                **source.audit_details()
+            },
+            registration_id=row.registration_id,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent", None)
+        )])
+    return row, checked_out
+
+
+async def load_group_state(db: AsyncSession, serial_code: str):
+    return (await db.execute(group_state_query(serial_code))).all()
+
+
+def group_response(rows, serial_code: str, checked_in_now: List[str] = None, message: str = None) -> GroupScanResponse:
+    """All tickets of a registration with their check-in state"""
+    tickets = []
+    for row in rows:
+        verdict = verify_response(row)
+        tickets.append(GroupTicket(
+            serial_code=row.serial_code,
+            member_name=row.member_name,
+            is_active=row.state != TicketState.DEACTIVATED,
+            checked_in=row.state in ENTERED_STATES,
+            check_in_time=_time(row.checked_in_at) if row.state in ENTERED_STATES else None,
+            can_check_in=verdict.valid,
+            message=verdict.message
+        ))
+    first = rows[0]
+    ready = sum(ticket.can_check_in for ticket in tickets)
+    return GroupScanResponse(
+        registration_id=first.registration_id,
+        scanned_serial=serial_code,
+        team_name=first.team_name,
+        email=first.email,
+        phone=first.phone,
+        payment_status=payment_status_label(first),
+        tickets=tickets,
+        checked_in_now=checked_in_now or [],
+        message=message or f"{ready} of {len(tickets)} ticket(s) ready for check-in."
+    )
+
+
+async def check_in_group(
+    db: AsyncSession, registration_id: int, serial_codes: List[str], now: datetime, by: str = None
+) -> List[int]:
+    """
+    Check in several tickets of one registration with a single multi-row UPDATE
+    Same rules as check_in_ticket, applied per row. Nothing is committed.
+    Returns the ids of the tickets this call checked in.
+    """
+    result = await db.execute(
+        update(Ticket)
+        .where(
+            Ticket.registration_id == registration_id,
+            Ticket.serial_code.in_(serial_codes),
+            Ticket.state == TicketState.VALID
         )
+        .values(state=TicketState.CHECKED_IN, checked_in_at=now, check_in_by=by)
+        .returning(Ticket.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars())
+
+
+@router.get("/verify-ticket/{serial}", response_model=TicketVerifyResponse)
+async def verify_ticket(
+    serial: str,
+    source: ScanSource = Depends(scan_source),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        serial_code = resolve_serial(serial)
+    except InvalidSerial as e:
+        return scanned(source, TicketVerifyResponse(valid=False, message=str(e), details=None))
+
+    return scanned(source, verify_response(await current_ticket_state(db, serial_code)))
+
+
+@router.post("/scan/{serial}", response_model=ScanResponse)
+async def scan_ticket(
+    serial: str,
+    request: Request,
+    auto_checkin: bool = Query(False, description="Check the ticket in if it is valid"),
+    source: ScanSource = Depends(scan_source),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Verify a ticket and, with auto_checkin, check it in - one request, one transaction
+    Returns the same payload as /verify-ticket; checked_in_now tells whether this
+    scan performed the check-in
+    """
+    try:
+        serial_code = resolve_serial(serial)
+    except InvalidSerial as e:
+        return scanned(source, ScanResponse(valid=False, message=str(e), details=None))
+
+    if not auto_checkin:
+        row = await current_ticket_state(db, serial_code)
+        return scanned(source, ScanResponse(**verify_response(row).model_dump()))
+
+    row, checked_in_now = await scan_and_check_in(db, serial_code, request, source)
+    await db.commit()
+    if row is not None:
+        ticket_index.put_rows([row])
+
+    if not checked_in_now:
+        return scanned(source, ScanResponse(**verify_response(row).model_dump()))
+    return ScanResponse(
+        valid=True,
+        message=f"Ticket checked in successfully for {row.member_name}",
+        details=ticket_details(row),
+        checked_in_now=True
+    )
+
+
+@router.post("/scan/{serial}/checkout", response_model=CheckoutResponse)
+async def check_out_ticket_scan(
+    serial: str,
+    request: Request,
+    source: ScanSource = Depends(scan_source),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Check a ticket out as its holder leaves the venue
+    Only checked-in tickets can be checked out; the occupancy counter is
+    updated in the same transaction
+    """
+    try:
+        serial_code = resolve_serial(serial)
+    except InvalidSerial as e:
+        return scanned(source, CheckoutResponse(valid=False, message=str(e), details=None))
+
+    row, checked_out_now = await scan_and_check_out(db, serial_code, request, source)
+    await db.commit()
+    if row is None:
+        return scanned(source, CheckoutResponse(valid=False, message="Invalid serial code. Ticket not found."))
+    ticket_index.put_rows([row])
+
+    if checked_out_now:
+        return CheckoutResponse(
+            valid=True,
+            message=f"Ticket checked out successfully for {row.member_name}",
+            details=ticket_details(row),
+            checked_out_now=True
+        )
+    if row.state == TicketState.VALID:
+        return scanned(source, CheckoutResponse(
+            valid=False, message="Ticket is not checked in.", details=ticket_details(row)
+        ))
+    return scanned(source, CheckoutResponse(**verify_response(row).model_dump()))
+
+
+@router.get("/occupancy", response_model=OccupancyResponse)
+async def venue_occupancy():
+    """
+    People inside the venue right now (checked in minus checked out)
+    Read from striped counters and shared for OCCUPANCY_CACHE_SECONDS - cheap to poll every second
+    """
+    return await get_occupancy()
+
+
+def _group_serial(serial: str) -> str:
+    try:
+        return resolve_serial(serial)
+    except InvalidSerial as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/scan/{serial}/group", response_model=GroupScanResponse)
+async def scan_group(
+    serial: str,
+    source: ScanSource = Depends(scan_source),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Scan any ticket of a team - returns every ticket of the registration
+    with its state, ready for POST /scan/{serial}/group/checkin
+    """
+    serial_code = _group_serial(serial)
+    rows = await load_group_state(db, serial_code)
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found")
+    return group_response(rows, serial_code)
+
+
+@router.post("/scan/{serial}/group/checkin", response_model=GroupScanResponse)
+async def check_in_group_tickets(
+    serial: str,
+    request: Request,
+    data: GroupCheckinRequest = GroupCheckinRequest(),
+    source: ScanSource = Depends(scan_source),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Check in several tickets of the scanned ticket's registration at once
+    serial_codes picks the subset (default: every ticket that can be checked in).
+    One multi-row UPDATE and one multi-row audit INSERT, in a single transaction;
+    tickets that are not eligible are skipped and reported in their message
+    """
+    serial_code = _group_serial(serial)
+    rows = await load_group_state(db, serial_code)
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found")
+
+    by_serial = {row.serial_code: row for row in rows}
+    if data.serial_codes is None:
+        requested = [code for code, row in by_serial.items() if ticket_problem(row) is None]
+    else:
+        requested = list(dict.fromkeys(code.strip().upper() for code in data.serial_codes))
+        unknown = [code for code in requested if code not in by_serial]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Ticket(s) not part of this registration: {', '.join(unknown)}"
+            )
+
+    checked_in_ids = set()
+    if requested:
+        now = datetime.utcnow()
+        checked_in_ids.update(await check_in_group(db, rows[0].registration_id, requested, now, source.label))
+
+    if checked_in_ids:
+        rows = await load_group_state(db, serial_code)
+        checked = [row for row in rows if row.ticket_id in checked_in_ids]
+        source.check_ins = len(checked)
+        await add_to_counter(db, Counter.CHECKED_IN, len(checked))
+        await announce_ticket_states(db, [row.serial_code for row in checked])
+        await add_audit_rows(db, [checkin_audit_row(row, now, request, source) for row in checked])
+        await db.commit()
+        ticket_index.put_rows(rows)
+    else:
+        checked = []
+        source.rejected = True
+
+    return group_response(
+        rows,
+        serial_code,
+        checked_in_now=[row.serial_code for row in checked],
+        message=f"Checked in {len(checked)} of {len(requested)} ticket(s)."
     )
 
 
@@ -112,72 +562,45 @@ async def verify_ticket(
 async def mark_ticket_used(
     serial: str,
     request: Request,
-    db: Session = Depends(get_db)
+    source: ScanSource = Depends(scan_source),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    ticket = db.query(Ticket).filter(
-        Ticket.serial_code == serial.upper()
-    ).first()
-    
-    if not ticket:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ticket not found"
+    try:
+        serial_code = resolve_serial(serial)
+    except InvalidSerial as e:
+        detail = str(e).rstrip(".") if is_ticket_token(serial) else "Invalid serial code"
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+    row, checked_in_now = await scan_and_check_in(db, serial_code, request, source)
+    await db.commit()
+    if row is not None:
+        ticket_index.put_rows([row])
+
+    if checked_in_now:
+        return MarkUsedResponse(
+            success=True,
+            message=f"Ticket checked in successfully for {row.member_name}"
         )
-    
-    if not ticket.is_active:
+
+    problem = ticket_problem(row)
+    if problem == "not_found":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found")
+    if problem == "inactive":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ticket is deactivated and cannot be used"
         )
-    
-    registration = db.query(Registration).filter(Registration.id == ticket.registration_id).first()
-    payment = db.query(Payment).filter(Payment.registration_id == ticket.registration_id).first()
-    
-    if not payment or payment.status != PaymentStatus.APPROVED:
+    if problem == "payment":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payment not approved. Cannot check in."
         )
-    
-    attendance = db.query(Attendance).filter(Attendance.ticket_id == ticket.id).first()
-    
-    if not attendance:
-        attendance = Attendance(
-            ticket_id=ticket.id,
-            checked_in=False
-        )
-        db.add(attendance)
-        db.flush()
-    
-    if attendance.checked_in:
+    if problem == "checked_out":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Ticket already checked in at {attendance.check_in_time.isoformat() if attendance.check_in_time else 'unknown time'}"
+            detail=f"Ticket already checked out at {_time(row.checked_out_at) or 'unknown time'}"
         )
-    
-    attendance.checked_in = True
-    attendance.check_in_time = datetime.utcnow()
-    db.commit()
-    
-    ip_address = request.client.host if request.client else None
-    user_agent = request.headers.get("user-agent", None)
-    
-    log_audit(
-        db=db,
-        admin_id=1,
-        action=AuditAction.TICKET_CHECKIN,
-        details={
-            "serial_code": ticket.serial_code,
-            "member_name": ticket.member_name,
-            "registration_id": registration.id,
-            "check_in_time": attendance.check_in_time.isoformat()
-        },
-        registration_id=registration.id,
-        ip_address=ip_address,
-        user_agent=user_agent
-    )
-    
-    return MarkUsedResponse(
-        success=True,
-        message=f"Ticket checked in successfully for {ticket.member_name}"
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Ticket already checked in at {_time(row.checked_in_at) or 'unknown time'}"
     )
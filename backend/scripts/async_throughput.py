@@ -0,0 +1,114 @@
+"""
+Async engine throughput benchmark
+Runs the scan routes' ticket-state lookup at rising concurrency two ways, against
+the database in DATABASE_URL:
+
+    before  sync Session in the threadpool - how the sync `def` routes ran
+    after   AsyncSession on the event loop - the async engine the routes use now
+
+and prints lookups per second and latency for both. Read-only; the connection
+pool settings (DB_POOL_SIZE, DB_MAX_OVERFLOW) apply to both engines.
+
+Usage:
+    python scripts/async_throughput.py              # default concurrency steps
+    python scripts/async_throughput.py 10,50,200    # custom steps
+
+LOAD_STEP_SECONDS (default 10) sets how long each step runs per mode.
+"""
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, AsyncSessionLocal  # noqa: E402
+from models.registration import Ticket  # noqa: E402
+from routes.ticket import ticket_state_query, load_ticket_state  # noqa: E402
+
+DEFAULT_STEPS = [1, 10, 50, 100, 200]
+STEP_SECONDS = float(os.getenv("LOAD_STEP_SECONDS", "10"))
+SERIAL_LIMIT = 1000
+
+
+def load_serials(limit: int = SERIAL_LIMIT) -> list:
+    """Serial codes of existing tickets to look up"""
+    db = SessionLocal()
+    try:
+        return list(db.scalars(select(Ticket.serial_code).order_by(Ticket.id).limit(limit)))
+    finally:
+        db.close()
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def sync_lookup(serial_code: str):
+    db = SessionLocal()
+    try:
+        return db.execute(ticket_state_query(serial_code)).one_or_none()
+    finally:
+        db.close()
+
+
+async def before(serial_code: str):
+    await run_in_threadpool(sync_lookup, serial_code)
+
+
+async def after(serial_code: str):
+    async with AsyncSessionLocal() as db:
+        await load_ticket_state(db, serial_code)
+
+
+async def worker(lookup, offset: int, serials: list, deadline: float, latencies: list):
+    i = offset
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        await lookup(serials[i % len(serials)])
+        latencies.append((time.perf_counter() - start) * 1000)
+        i += 1
+
+
+async def run_step(lookup, concurrency: int, serials: list) -> dict:
+    latencies = []
+    started = time.monotonic()
+    deadline = started + STEP_SECONDS
+    await asyncio.gather(*(worker(lookup, n, serials, deadline, latencies) for n in range(concurrency)))
+    elapsed = time.monotonic() - started
+    return {
+        "lookups_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+    }
+
+
+async def async_throughput(steps: list) -> list:
+    serials = load_serials()
+    if not serials:
+        raise SystemExit("❌ No tickets in the database - approve a registration first")
+
+    print(f"🔧 {len(serials)} serial(s), {STEP_SECONDS:g}s per step and mode")
+    print(f"{'conc':>5} {'before/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'after/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+    report = []
+    for concurrency in steps:
+        sync_step = await run_step(before, concurrency, serials)
+        async_step = await run_step(after, concurrency, serials)
+        speedup = async_step["lookups_per_s"] / sync_step["lookups_per_s"] if sync_step["lookups_per_s"] else 0.0
+        report.append({"concurrency": concurrency, "before": sync_step, "after": async_step, "speedup": speedup})
+        print(f"{concurrency:>5} {sync_step['lookups_per_s']:>9.1f} {sync_step['p50_ms']:>8.1f} "
+              f"{sync_step['p95_ms']:>8.1f} {async_step['lookups_per_s']:>9.1f} "
+              f"{async_step['p50_ms']:>8.1f} {async_step['p95_ms']:>8.1f} {speedup:>7.2f}x")
+    return report
+
+
+if __name__ == "__main__":
+    steps = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else DEFAULT_STEPS
+    asyncio.run(async_throughput(steps))
@@ -0,0 +1,160 @@
+"""
+Connection pool load test
+Ramps concurrent scanner traffic against a running server and samples
+/api/admin/metrics/db-pool while each step runs, to show at which concurrency the
+async pool (the one the scan routes use) runs out of connections.
+
+Each worker alternates GET /verify-ticket/{serial} and POST /scan/{serial}?auto_checkin=true.
+A scan always runs the check-in UPDATE (re-scans of checked-in tickets included), so
+it holds a pool connection; verifies are mostly answered from the ticket index.
+Scanned tickets end up checked in - point it at a staging database.
+
+Serial codes are read from the database in DATABASE_URL, so run it with the
+server's environment.
+
+Usage:
+    python scripts/pool_load.py                                   # http://localhost:8000, default steps
+    python scripts/pool_load.py https://staging.example.com       # another server
+    python scripts/pool_load.py http://localhost:8000 10,50,100   # custom concurrency steps
+
+LOAD_STEP_SECONDS (default 10) sets how long each step runs.
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from sqlalchemy import select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal  # noqa: E402
+from models.registration import Ticket  # noqa: E402
+
+DEFAULT_URL = "http://localhost:8000"
+DEFAULT_STEPS = [5, 10, 20, 40, 80, 160]
+STEP_SECONDS = float(os.getenv("LOAD_STEP_SECONDS", "10"))
+SAMPLE_SECONDS = 0.25
+POOL_NAME = "primary_async"
+SERIAL_LIMIT = 1000
+
+
+def load_serials(limit: int = SERIAL_LIMIT) -> list:
+    """Serial codes of existing tickets to scan"""
+    db = SessionLocal()
+    try:
+        return list(db.scalars(select(Ticket.serial_code).order_by(Ticket.id).limit(limit)))
+    finally:
+        db.close()
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def pool_metrics(client: httpx.AsyncClient, reset: bool = False) -> dict:
+    response = await client.get("/api/admin/metrics/db-pool", params={"reset": str(reset).lower()})
+    response.raise_for_status()
+    return response.json()[POOL_NAME]
+
+
+async def scanner(client: httpx.AsyncClient, worker: int, serials: list, deadline: float, results: dict):
+    """One simulated scanner - verify then scan, round robin over the serials"""
+    headers = {"X-Scanner-Gate": "load-test", "X-Scanner-Device": f"load-{worker}"}
+    i = worker
+    while time.monotonic() < deadline:
+        serial = serials[i % len(serials)]
+        i += 1
+        for method, path, params in (
+            ("GET", f"/verify-ticket/{serial}", None),
+            ("POST", f"/scan/{serial}", {"auto_checkin": "true"}),
+        ):
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params, headers=headers)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            results["latencies_ms"].append((time.perf_counter() - start) * 1000)
+            if not ok:
+                results["errors"] += 1
+
+
+async def sample_pool(client: httpx.AsyncClient, deadline: float, peak: dict):
+    """Poll the pool while the step runs - checked_out is back to zero once it ends"""
+    while time.monotonic() < deadline:
+        status = await pool_metrics(client)
+        peak["in_use"] = max(peak["in_use"], status["checked_out"])
+        await asyncio.sleep(SAMPLE_SECONDS)
+
+
+async def run_step(base_url: str, concurrency: int, serials: list) -> dict:
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await pool_metrics(client, reset=True)
+        results = {"latencies_ms": [], "errors": 0}
+        peak = {"in_use": 0}
+        started = time.monotonic()
+        deadline = started + STEP_SECONDS
+        await asyncio.gather(
+            sample_pool(client, deadline, peak),
+            *(scanner(client, worker, serials, deadline, results) for worker in range(concurrency))
+        )
+        elapsed = time.monotonic() - started
+        status = await pool_metrics(client)
+
+    latencies = results["latencies_ms"]
+    return {
+        "concurrency": concurrency,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "errors": results["errors"],
+        "peak_in_use": peak["in_use"],
+        "capacity": status["size"] + status["max_overflow"],
+        "avg_wait_ms": status["avg_wait_ms"],
+        "max_wait_ms": status["max_wait_ms"],
+        "timeouts": status["timeouts"],
+    }
+
+
+def saturated(step: dict) -> bool:
+    """Every connection was taken, or checkouts had to wait for one"""
+    return step["peak_in_use"] >= step["capacity"] or step["timeouts"] > 0 or step["avg_wait_ms"] >= 1
+
+
+async def pool_load(base_url: str, steps: list) -> list:
+    serials = load_serials()
+    if not serials:
+        raise SystemExit("❌ No tickets in the database - approve a registration first")
+
+    print(f"🔧 {len(serials)} serial(s), {STEP_SECONDS:g}s per step against {base_url}")
+    print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} "
+          f"{'in use':>9} {'avg wait':>9} {'max wait':>9} {'timeouts':>9}")
+    report = []
+    for concurrency in steps:
+        step = await run_step(base_url, concurrency, serials)
+        report.append(step)
+        print(f"{step['concurrency']:>5} {step['requests_per_s']:>8.1f} {step['p50_ms']:>8.1f} "
+              f"{step['p95_ms']:>8.1f} {step['errors']:>7} "
+              f"{step['peak_in_use']:>4}/{step['capacity']:<4} {step['avg_wait_ms']:>9.2f} "
+              f"{step['max_wait_ms']:>9.2f} {step['timeouts']:>9}")
+
+    first = next((step for step in report if saturated(step)), None)
+    if first is None:
+        print(f"✅ Pool not saturated up to {steps[-1]} concurrent scanners")
+    else:
+        print(f"⚠️ Pool saturates at {first['concurrency']} concurrent scanners "
+              f"({first['peak_in_use']}/{first['capacity']} connections, "
+              f"avg checkout wait {first['avg_wait_ms']:.2f} ms, {first['timeouts']} timeout(s))")
+    return report
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_URL
+    steps = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else DEFAULT_STEPS
+    asyncio.run(pool_load(url.rstrip("/"), steps))
@@ -0,0 +1,27 @@
+"""
+Test configuration
+The app reads its settings when `database` is imported, so they are set here,
+before any test module imports the app.
+
+TEST_DATABASE_URL names the Postgres database the tests run against. It must be a
+disposable database - the tests create and drop tables. Without it, tests that
+need a database are skipped.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+# The Supabase client is built at import but not used by these tests
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("AUTO_MIGRATE", "false")
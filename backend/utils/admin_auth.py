@@ -0,0 +1,76 @@
+"""
+Admin identity of a request, for audit entries
+POST /api/admin/login (routes.admin) issues a JWT whose subject is the admin's
+email. The dashboard sends it as a Bearer header; the login response also sets it
+as the access_token cookie. Routes are not gated on it yet, so requests without a
+valid token (scanner HTTP calls) are recorded against UNATTRIBUTED_ADMIN_ID, as
+every audit entry was before.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import jwt
+from fastapi import Cookie, Header
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models.registration import Admin
+
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
+ALGORITHM = "HS256"
+
+# audit_logs.admin_id is required - entries without a known admin keep the first admin's id
+UNATTRIBUTED_ADMIN_ID = 1
+ADMIN_ID_CACHE_SECONDS = float(os.getenv("ADMIN_ID_CACHE_SECONDS", "300"))
+
+_admin_ids: Dict[str, Tuple[Optional[int], float]] = {}  # email -> (id or None, looked up at)
+
+
+@dataclass(frozen=True)
+class AdminIdentity:
+    admin_id: int
+    email: Optional[str] = None
+
+
+UNATTRIBUTED = AdminIdentity(UNATTRIBUTED_ADMIN_ID)
+
+
+def token_email(token: Optional[str]) -> Optional[str]:
+    """Subject (admin email) of a valid, unexpired admin JWT"""
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except jwt.PyJWTError:
+        return None
+
+
+async def admin_id_for_email(email: str) -> Optional[int]:
+    """Id of the active admin with this email - cached, scans call this per request"""
+    cached = _admin_ids.get(email)
+    if cached is not None and time.monotonic() - cached[1] < ADMIN_ID_CACHE_SECONDS:
+        return cached[0]
+    async with AsyncSessionLocal() as db:
+        admin_id = await db.scalar(select(Admin.id).where(Admin.email == email, Admin.is_active.is_(True)))
+    _admin_ids[email] = (admin_id, time.monotonic())
+    return admin_id
+
+
+async def identify_admin(token: Optional[str]) -> AdminIdentity:
+    email = token_email(token)
+    admin_id = await admin_id_for_email(email) if email else None
+    if admin_id is None:
+        return UNATTRIBUTED
+    return AdminIdentity(admin_id, email)
+
+
+async def current_admin(
+    authorization: Optional[str] = Header(None),
+    access_token: Optional[str] = Cookie(None)
+) -> AdminIdentity:
+    """Dependency - the admin whose token came with the request, or UNATTRIBUTED"""
+    token = access_token
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    return await identify_admin(token)
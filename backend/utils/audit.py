@@ -1,6 +1,8 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.registration import AuditLog
-from typing import Optional
+from typing import List, Optional
 import json
 
 
@@ -27,6 +29,57 @@ def log_audit(
     return audit_entry
 
 
+async def log_audit_async(
+    db: AsyncSession,
+    admin_id: int,
+    action: str,
+    details: Optional[dict] = None,
+    registration_id: Optional[int] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None
+):
+    audit_entry = AuditLog(
+        admin_id=admin_id,
+        action=action,
+        details=json.dumps(details) if details else None,
+        registration_id=registration_id,
+        ip_address=ip_address,
+        user_agent=user_agent
+    )
+    
+    db.add(audit_entry)
+    await db.commit()
+    return audit_entry
+
+
+def audit_row(
+    admin_id: int,
+    action: str,
+    details: Optional[dict] = None,
+    registration_id: Optional[int] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None
+) -> dict:
+    """Column values for one audit entry, for add_audit_rows"""
+    return {
+        "admin_id": admin_id,
+        "action": action,
+        "details": json.dumps(details) if details else None,
+        "registration_id": registration_id,
+        "ip_address": ip_address,
+        "user_agent": user_agent
+    }
+
+
+async def add_audit_rows(db: AsyncSession, rows: List[dict]):
+    """
+    Insert audit entries in one statement, inside the caller's transaction
+    Nothing is committed - the entries land together with the change they record
+    """
+    if rows:
+        await db.execute(insert(AuditLog), rows)
+
+
 # Action constants
 class AuditAction:
     LOGIN = "LOGIN"
@@ -43,6 +96,10 @@ class AuditAction:
     REGISTRATION_LIST = "REGISTRATION_LIST"
     NEW_REGISTRATION = "NEW_REGISTRATION"
     TICKET_CHECKIN = "TICKET_CHECKIN"
+    TICKET_CHECKOUT = "TICKET_CHECKOUT"
+    DEACTIVATE_TICKET = "DEACTIVATE_TICKET"
     SEND_APPROVAL_EMAIL = "SEND_APPROVAL_EMAIL"
     SEND_REJECTION_EMAIL = "SEND_REJECTION_EMAIL"
     SEND_PENDING_EMAIL = "SEND_PENDING_EMAIL"
+    SEND_BULK_EMAIL = "SEND_BULK_EMAIL"
+    EXPORT_DATA = "EXPORT_DATA"
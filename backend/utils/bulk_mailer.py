@@ -0,0 +1,358 @@
+"""
+Bulk announcement / reminder mailer
+Sends a MailJob to every matching registration in batches:
+- recipients are read with a streaming cursor in registration id order
+- Brevo: one batch API call per batch (messageVersions + {{params.NAME}} personalisation)
+- SMTP: per-recipient rendering over a pool of persistent connections
+- a shared token bucket caps the send rate, a semaphore caps concurrency
+- Message rows, progress and the resume cursor are committed together per batch,
+  so a crashed job resumes from the last finished batch (at-least-once per batch)
+"""
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+import aiosmtplib
+import sib_api_v3_sdk
+from markupsafe import Markup
+from sqlalchemy import select, insert, update, or_, and_, func
+from starlette.concurrency import run_in_threadpool
+
+from database import AsyncSessionLocal
+from models.registration import Registration, Payment, Message, PaymentStatus, PaymentType
+from models.mail_job import MailJob, MailJobState
+from utils.email import (
+    get_event_settings, build_mime_message,
+    BREVO_API_KEY, SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, USE_TLS, FROM_EMAIL, FROM_NAME
+)
+from utils.email_templates import render_email
+
+load_dotenv()
+
+MAIL_BATCH_SIZE = min(int(os.getenv("MAIL_BATCH_SIZE", "100")), 1000)  # Brevo caps messageVersions
+MAIL_CONCURRENCY = int(os.getenv("MAIL_CONCURRENCY", "4"))
+MAIL_RATE_PER_SECOND = float(os.getenv("MAIL_RATE_PER_SECOND", "5"))
+MAIL_JOB_LEASE_SECONDS = int(os.getenv("MAIL_JOB_LEASE_SECONDS", "120"))
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+_tasks: Dict[int, asyncio.Task] = {}
+
+
+class RateLimiter:
+    """Token bucket shared by every send of this process"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Module-level instance - the lock belongs to whichever loop is running
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        return self._lock
+
+    async def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Batches larger than the bucket wait for a full bucket and go into debt
+                if self._tokens >= min(tokens, self.capacity):
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((min(tokens, self.capacity) - self._tokens) / self.rate)
+
+
+# One bucket for the process - concurrent jobs share MAIL_RATE_PER_SECOND
+mail_rate_limiter = RateLimiter(MAIL_RATE_PER_SECOND)
+
+
+class SMTPPool:
+    """Up to `size` persistent SMTP connections, reconnecting when the server drops one"""
+
+    def __init__(self, size: int = MAIL_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle: List[aiosmtplib.SMTP] = []
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        starttls = USE_TLS and SMTP_PORT == 587
+        smtp = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            use_tls=not starttls,
+            start_tls=starttls,
+            timeout=30
+        )
+        await smtp.connect()
+        await smtp.login(SMTP_USER, SMTP_PASSWORD)
+        return smtp
+
+    async def send(self, message):
+        async with self._semaphore:
+            smtp = self._idle.pop() if self._idle else await self._connect()
+            try:
+                try:
+                    await smtp.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    smtp = await self._connect()
+                    await smtp.send_message(message)
+            except Exception:
+                smtp.close()
+                raise
+            self._idle.append(smtp)
+
+    async def close(self):
+        while self._idle:
+            smtp = self._idle.pop()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+def recipient_query(job: MailJob):
+    """Registrations matching the job filters after the resume cursor, in id order"""
+    query = (
+        select(Registration.id, Registration.name, Registration.email)
+        .join(Payment, Payment.registration_id == Registration.id)
+        .where(Registration.id > job.last_registration_id)
+        .order_by(Registration.id)
+    )
+    if job.status_filter:
+        query = query.where(Payment.status == PaymentStatus(job.status_filter))
+    if job.payment_type_filter:
+        query = query.where(Registration.payment_type == PaymentType(job.payment_type_filter))
+    return query
+
+
+async def count_recipients(db, job: MailJob) -> int:
+    return await db.scalar(select(func.count()).select_from(recipient_query(job).order_by(None).subquery()))
+
+
+def _paragraphs(body: str) -> List[str]:
+    return [p.strip() for p in body.replace("\r\n", "\n").split("\n\n") if p.strip()]
+
+
+class _Sender:
+    """Sends one batch and reports (registration_id, email, sent, error) per recipient"""
+
+    def __init__(self, job: MailJob, event_settings: dict):
+        self.job = job
+        self.event_settings = event_settings
+        self.paragraphs = _paragraphs(job.body)
+        self.limiter = mail_rate_limiter
+        self.smtp_pool = SMTPPool() if not BREVO_API_KEY else None
+
+    def _render(self, name) -> tuple:
+        return render_email(
+            "announcement",
+            self.event_settings,
+            subject=self.job.subject,
+            paragraphs=self.paragraphs,
+            name=name
+        )
+
+    async def send_batch(self, rows) -> List[tuple]:
+        if BREVO_API_KEY:
+            return await self._send_brevo(rows)
+        return await asyncio.gather(*(self._send_smtp(row) for row in rows))
+
+    async def _send_brevo(self, rows) -> List[tuple]:
+        # One rendering for the batch - Brevo substitutes {{params.NAME}} per recipient
+        html_body, text_body = self._render(Markup("{{params.NAME}}"))
+        await self.limiter.acquire(len(rows))
+        try:
+            await run_in_threadpool(self._brevo_call, rows, html_body, text_body)
+            return [(row.id, row.email, True, None) for row in rows]
+        except Exception as e:
+            print(f"❌ Brevo batch for mail job {self.job.id} failed: {str(e)}")
+            return [(row.id, row.email, False, str(e)[:500]) for row in rows]
+
+    def _brevo_call(self, rows, html_body: str, text_body: str):
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = BREVO_API_KEY
+        api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+        api_instance.send_transac_email(sib_api_v3_sdk.SendSmtpEmail(
+            sender={"name": FROM_NAME, "email": FROM_EMAIL},
+            subject=self.job.subject,
+            html_content=html_body,
+            text_content=text_body,
+            message_versions=[
+                sib_api_v3_sdk.SendSmtpEmailMessageVersions(
+                    to=[sib_api_v3_sdk.SendSmtpEmailTo1(email=row.email, name=row.name)],
+                    params={"NAME": row.name}
+                )
+                for row in rows
+            ]
+        ))
+
+    async def _send_smtp(self, row) -> tuple:
+        if not SMTP_USER or not SMTP_PASSWORD:
+            return (row.id, row.email, False, "SMTP credentials not configured")
+        html_body, text_body = self._render(row.name)
+        await self.limiter.acquire()
+        try:
+            await self.smtp_pool.send(build_mime_message(row.email, self.job.subject, html_body, text_body))
+            return (row.id, row.email, True, None)
+        except Exception as e:
+            return (row.id, row.email, False, str(e)[:500])
+
+    async def close(self):
+        if self.smtp_pool:
+            await self.smtp_pool.close()
+
+
+async def _claim(db, job_id: int) -> bool:
+    """Take the job lease - pending jobs, or running jobs whose worker stopped heartbeating"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=MAIL_JOB_LEASE_SECONDS)
+    result = await db.execute(
+        update(MailJob)
+        .where(
+            MailJob.id == job_id,
+            or_(
+                MailJob.state == MailJobState.PENDING,
+                and_(
+                    MailJob.state == MailJobState.RUNNING,
+                    or_(MailJob.heartbeat_at.is_(None), MailJob.heartbeat_at < stale)
+                )
+            )
+        )
+        .values(
+            state=MailJobState.RUNNING,
+            worker_id=WORKER_ID,
+            heartbeat_at=now,
+            started_at=func.coalesce(MailJob.started_at, now)
+        )
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def _keep_lease(job_id: int):
+    """
+    Refresh the lease while the job runs - a batch at a low MAIL_RATE_PER_SECOND
+    (MAIL_BATCH_SIZE / rate seconds) can take longer than MAIL_JOB_LEASE_SECONDS
+    """
+    while True:
+        await asyncio.sleep(MAIL_JOB_LEASE_SECONDS / 3)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(MailJob)
+                    .where(MailJob.id == job_id, MailJob.worker_id == WORKER_ID)
+                    .values(heartbeat_at=datetime.utcnow())
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"⚠️ Mail job {job_id} heartbeat failed: {str(e)}")
+
+
+async def run_mail_job(job_id: int):
+    """Send a mail job to completion (or until it is cancelled)"""
+    async with AsyncSessionLocal() as db:
+        if not await _claim(db, job_id):
+            return
+        job = await db.get(MailJob, job_id)
+        print(f"📨 Mail job {job_id} running from registration #{job.last_registration_id}")
+
+        sender = _Sender(job, await run_in_threadpool(get_event_settings))
+        lease = asyncio.create_task(_keep_lease(job_id))
+        try:
+            async with AsyncSessionLocal() as reader:
+                result = await reader.stream(
+                    recipient_query(job).execution_options(yield_per=MAIL_BATCH_SIZE)
+                )
+                async for rows in result.partitions(MAIL_BATCH_SIZE):
+                    await db.refresh(job)
+                    if job.state == MailJobState.CANCELLED or job.worker_id != WORKER_ID:
+                        print(f"⏹️  Mail job {job_id} stopped (state: {job.state.value})")
+                        return
+
+                    outcomes = await sender.send_batch(rows)
+                    now = datetime.utcnow()
+                    await db.execute(insert(Message), [
+                        {
+                            "registration_id": registration_id,
+                            "message_type": job.message_type,
+                            "subject": job.subject,
+                            "body": f"Bulk mail job #{job.id}",
+                            "recipient_email": email,
+                            "has_attachment": False,
+                            "sent": sent,
+                            "sent_at": now if sent else None,
+                            "error_message": error
+                        }
+                        for registration_id, email, sent, error in outcomes
+                    ])
+                    sent_count = sum(1 for outcome in outcomes if outcome[2])
+                    job.sent += sent_count
+                    job.failed += len(outcomes) - sent_count
+                    job.last_registration_id = rows[-1].id
+                    job.heartbeat_at = now
+                    await db.commit()
+
+            job.state = MailJobState.COMPLETED
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            print(f"✅ Mail job {job_id} completed: {job.sent} sent, {job.failed} failed")
+
+        except asyncio.CancelledError:
+            # Shutdown - leave the job RUNNING so another worker (or the next start) resumes it
+            raise
+        except Exception as e:
+            await db.rollback()
+            job.state = MailJobState.FAILED
+            job.error_message = str(e)[:1000]
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            print(f"❌ Mail job {job_id} failed: {str(e)}")
+        finally:
+            lease.cancel()
+            await sender.close()
+
+
+def start_mail_job(job_id: int):
+    """Run a job in the background of this process (no-op if it is already running here)"""
+    task = _tasks.get(job_id)
+    if task and not task.done():
+        return
+    task = asyncio.create_task(run_mail_job(job_id))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+
+
+async def resume_mail_jobs():
+    """
+    Pick up pending jobs and jobs abandoned by a crashed worker
+    Runs for the lifetime of the app, checking once per lease period
+    """
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                job_ids = (await db.scalars(
+                    select(MailJob.id).where(MailJob.state.in_([MailJobState.PENDING, MailJobState.RUNNING]))
+                )).all()
+            for job_id in job_ids:
+                start_mail_job(job_id)
+        except Exception as e:
+            print(f"⚠️ Failed to resume mail jobs: {str(e)}")
+        await asyncio.sleep(MAIL_JOB_LEASE_SECONDS)
+
+
+async def stop_mail_jobs():
+    for task in list(_tasks.values()):
+        task.cancel()
+    await asyncio.gather(*_tasks.values(), return_exceptions=True)
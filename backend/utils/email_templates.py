@@ -0,0 +1,95 @@
+"""
+Email templates (Jinja2)
+Templates live in templates/email as <name>.html + <name>.txt pairs and are
+compiled once by load_templates() at startup. Parts that depend only on the
+event settings (header, event details, footer) are rendered once per settings
+version and reused for every recipient.
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "email")
+
+EMAIL_TEMPLATES = ("approval", "rejection", "pending", "announcement")
+
+# Settings-only fragments, exposed to templates as `fragments.<name>`
+FRAGMENTS = {
+    "header": "partials/header.html",
+    "event_details": "partials/event_details.html",
+    "footer": "partials/footer.html",
+    "event_details_text": "partials/event_details.txt",
+    "footer_text": "partials/footer.txt",
+}
+
+# Settings versions kept in the fragment cache (old versions are dropped)
+FRAGMENT_CACHE_SIZE = 4
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+    cache_size=-1,
+)
+_compiled = {}
+_fragment_cache: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def load_templates():
+    """Compile every email template and fragment (called once at startup)"""
+    with _lock:
+        for name in EMAIL_TEMPLATES:
+            for ext in ("html", "txt"):
+                path = f"{name}.{ext}"
+                _compiled[path] = _env.get_template(path)
+        for path in FRAGMENTS.values():
+            _compiled[path] = _env.get_template(path)
+    print(f"✅ Compiled {len(_compiled)} email templates")
+
+
+def _template(path: str):
+    template = _compiled.get(path)
+    if template is None:
+        load_templates()
+        template = _compiled[path]
+    return template
+
+
+def get_fragments(event_settings: dict) -> dict:
+    """Pre-rendered settings fragments, cached by event_settings['version']"""
+    version = event_settings.get("version", "")
+    fragments = _fragment_cache.get(version)
+    if fragments is not None:
+        return fragments
+
+    fragments = {}
+    for name, path in FRAGMENTS.items():
+        rendered = _template(path).render(**event_settings)
+        fragments[name] = Markup(rendered) if path.endswith(".html") else rendered
+
+    with _lock:
+        _fragment_cache[version] = fragments
+        while len(_fragment_cache) > FRAGMENT_CACHE_SIZE:
+            _fragment_cache.pop(next(iter(_fragment_cache)))
+    return fragments
+
+
+def render_email(template: str, event_settings: Optional[dict] = None, **context) -> Tuple[str, str]:
+    """
+    Render an email template
+    Templates that show event details need event_settings from get_event_settings()
+
+    Returns:
+        (html_body, text_body)
+    """
+    if event_settings:
+        context = {**event_settings, "fragments": get_fragments(event_settings), **context}
+    return (
+        _template(f"{template}.html").render(**context),
+        _template(f"{template}.txt").render(**context),
+    )
@@ -0,0 +1,354 @@
+"""
+Per-gate scan throughput and latency
+Scanner apps identify themselves with the X-Scanner-Gate / X-Scanner-Device
+headers and report how long their previous scan took on the device (QR detected
+to result shown) in X-Scan-Latency-Ms. Every scan endpoint takes scan_source()
+as a dependency: it times the request on the server and, when the request is
+done, adds it to an in-memory bucket for (minute, gate, device).
+
+Latencies are kept as fixed-bucket histograms, not samples, so buckets from
+several workers and flushes add up and percentiles are computed after merging.
+Every GATE_STATS_FLUSH_SECONDS each worker appends its buckets to the
+gate_rollups table (models.gate_rollup); the live dashboard reads the rollups
+of the last minutes plus this worker's unflushed buckets.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import Depends, Header
+from sqlalchemy import insert, select
+
+from database import AsyncSessionLocal
+from models.gate_rollup import GateRollup
+from utils.admin_auth import current_admin, AdminIdentity, UNATTRIBUTED_ADMIN_ID
+
+GATE_STATS_ENABLED = os.getenv("GATE_STATS_ENABLED", "true").lower() == "true"
+GATE_STATS_FLUSH_SECONDS = float(os.getenv("GATE_STATS_FLUSH_SECONDS", "10"))
+# Unflushed buckets older than this are dropped while the database is unreachable
+GATE_STATS_MAX_PENDING_MINUTES = int(os.getenv("GATE_STATS_MAX_PENDING_MINUTES", "60"))
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000]
+OVERFLOW_BUCKET = "inf"
+
+UNASSIGNED_GATE = "unassigned"
+MAX_LABEL_LENGTH = 100
+
+
+def latency_bucket(ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if ms <= bound:
+            return str(bound)
+    return OVERFLOW_BUCKET
+
+
+def percentile(histogram: Dict[str, int], q: float) -> Optional[float]:
+    """Upper bound (ms) of the bucket holding the q-th quantile, None without samples"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for key in sorted(histogram, key=lambda k: float(k)):
+        seen += histogram[key]
+        if seen >= rank:
+            return float(key)
+    return float("inf")
+
+
+def latency_summary(histogram: Dict[str, int]) -> dict:
+    """Sample count and p50 / p95 / p99 - None without samples or past the last bucket"""
+    summary = {"samples": sum(histogram.values())}
+    for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        value = percentile(histogram, q)
+        summary[name] = None if value == float("inf") else value
+    return summary
+
+
+def add_histogram(into: Dict[str, int], histogram: Dict[str, int]):
+    for key, count in histogram.items():
+        into[key] = into.get(key, 0) + count
+
+
+class GateBucket:
+    """Scans of one (minute, gate, device)"""
+    __slots__ = ("scans", "check_ins", "check_outs", "rejected", "server_latency", "client_latency", "last_scan_at")
+
+    def __init__(self):
+        self.scans = self.check_ins = self.check_outs = self.rejected = 0
+        self.server_latency: Dict[str, int] = {}
+        self.client_latency: Dict[str, int] = {}
+        self.last_scan_at: Optional[datetime] = None
+
+    def merge(self, other: "GateBucket"):
+        self.scans += other.scans
+        self.check_ins += other.check_ins
+        self.check_outs += other.check_outs
+        self.rejected += other.rejected
+        add_histogram(self.server_latency, other.server_latency)
+        add_histogram(self.client_latency, other.client_latency)
+        if other.last_scan_at and (self.last_scan_at is None or other.last_scan_at > self.last_scan_at):
+            self.last_scan_at = other.last_scan_at
+
+
+BucketKey = Tuple[datetime, str, str]  # (minute, gate, device)
+
+
+class ScanSource:
+    """
+    The gate / device / admin a scan request came from, and what it did
+    Endpoints set check_ins / check_outs, or rejected for scans that were turned away
+    """
+
+    def __init__(
+        self,
+        gate: Optional[str],
+        device: Optional[str],
+        client_latency_ms: Optional[float],
+        admin_id: int = UNATTRIBUTED_ADMIN_ID
+    ):
+        self.gate = _label(gate) or UNASSIGNED_GATE
+        self.device = _label(device) or ""
+        self.client_latency_ms = client_latency_ms
+        self.admin_id = admin_id  # Audit entries of the scan
+        self.started = time.perf_counter()
+        self.check_ins = 0
+        self.check_outs = 0
+        self.rejected = False
+
+    @property
+    def label(self) -> Optional[str]:
+        """Stored as tickets.check_in_by / check_out_by - None for scanners that send no identity"""
+        if self.device:
+            return f"{self.gate}/{self.device}"
+        return None if self.gate == UNASSIGNED_GATE else self.gate
+
+    def audit_details(self) -> dict:
+        return {"gate": self.gate, "device": self.device or None}
+
+
+def parse_latency(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _label(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value).strip()[:MAX_LABEL_LENGTH] or None
+
+
+class GateStats:
+    """In-memory per-minute buckets of this worker, flushed to gate_rollups"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[BucketKey, GateBucket] = defaultdict(GateBucket)
+        self.flushed_rows = 0
+        self.flush_failures = 0
+        self._failing = False
+
+    def record(self, source: ScanSource, server_latency_ms: float):
+        now = datetime.utcnow()
+        minute = now.replace(second=0, microsecond=0)
+        with self._lock:
+            bucket = self._buckets[(minute, source.gate, source.device)]
+            bucket.scans += 1
+            bucket.check_ins += source.check_ins
+            bucket.check_outs += source.check_outs
+            bucket.rejected += int(source.rejected)
+            key = latency_bucket(server_latency_ms)
+            bucket.server_latency[key] = bucket.server_latency.get(key, 0) + 1
+            if source.client_latency_ms is not None and source.client_latency_ms >= 0:
+                key = latency_bucket(source.client_latency_ms)
+                bucket.client_latency[key] = bucket.client_latency.get(key, 0) + 1
+            bucket.last_scan_at = now
+
+    def pending(self) -> Dict[BucketKey, GateBucket]:
+        """Copy of the unflushed buckets"""
+        with self._lock:
+            copies = {}
+            for key, bucket in self._buckets.items():
+                copies[key] = GateBucket()
+                copies[key].merge(bucket)
+            return copies
+
+    def _take(self) -> Dict[BucketKey, GateBucket]:
+        with self._lock:
+            buckets, self._buckets = self._buckets, defaultdict(GateBucket)
+            return buckets
+
+    def _put_back(self, buckets: Dict[BucketKey, GateBucket]):
+        oldest = datetime.utcnow() - timedelta(minutes=GATE_STATS_MAX_PENDING_MINUTES)
+        with self._lock:
+            for key, bucket in buckets.items():
+                if key[0] >= oldest:
+                    self._buckets[key].merge(bucket)
+
+    async def flush(self):
+        """Append the buckets collected since the last flush to gate_rollups (one INSERT)"""
+        buckets = self._take()
+        if not buckets:
+            return
+        rows = [
+            {
+                "minute": minute,
+                "gate": gate,
+                "device": device,
+                "scans": bucket.scans,
+                "check_ins": bucket.check_ins,
+                "check_outs": bucket.check_outs,
+                "rejected": bucket.rejected,
+                "server_latency": json.dumps(bucket.server_latency),
+                "client_latency": json.dumps(bucket.client_latency),
+                "last_scan_at": bucket.last_scan_at,
+            }
+            for (minute, gate, device), bucket in buckets.items()
+        ]
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(GateRollup), rows)
+                await db.commit()
+        except Exception:
+            self._put_back(buckets)
+            raise
+        self.flushed_rows += len(rows)
+
+    async def run(self):
+        """Flush every GATE_STATS_FLUSH_SECONDS until cancelled - failed flushes are retried"""
+        while True:
+            await asyncio.sleep(GATE_STATS_FLUSH_SECONDS)
+            try:
+                await self.flush()
+                if self._failing:
+                    print("✅ Gate stats flush recovered")
+                self._failing = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.flush_failures += 1
+                if not self._failing:
+                    print(f"⚠️  Gate stats flush failed, keeping buckets in memory: {e}")
+                self._failing = True
+
+
+gate_stats = GateStats()
+
+
+async def scan_source(
+    x_scanner_gate: Optional[str] = Header(None, description="Gate the scanner is posted at"),
+    x_scanner_device: Optional[str] = Header(None, description="Scanner device id"),
+    x_scan_latency_ms: Optional[str] = Header(None, description="Device-measured duration of its previous scan"),
+    admin: AdminIdentity = Depends(current_admin),
+):
+    """
+    Dependency for scan endpoints - yields the ScanSource, records the scan once the endpoint returns
+    Scans whose endpoint raised (HTTP errors included) count as rejected. A malformed
+    latency header is ignored rather than failing the scan
+    """
+    source = ScanSource(x_scanner_gate, x_scanner_device, parse_latency(x_scan_latency_ms), admin.admin_id)
+    with recording(source):
+        yield source
+
+
+@contextmanager
+def recording(source: ScanSource):
+    """Record the scan when the block exits - an exception marks it rejected"""
+    try:
+        yield source
+    except Exception:
+        source.rejected = True
+        raise
+    finally:
+        if GATE_STATS_ENABLED:
+            gate_stats.record(source, (time.perf_counter() - source.started) * 1000)
+
+
+async def load_rollups(since: datetime) -> List[tuple]:
+    """(minute, gate, device, GateBucket) rows flushed by every worker since `since`"""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(GateRollup).where(GateRollup.minute >= since)
+        )).scalars().all()
+    result = []
+    for row in rows:
+        bucket = GateBucket()
+        bucket.scans, bucket.check_ins, bucket.check_outs, bucket.rejected = (
+            row.scans, row.check_ins, row.check_outs, row.rejected
+        )
+        bucket.server_latency = json.loads(row.server_latency or "{}")
+        bucket.client_latency = json.loads(row.client_latency or "{}")
+        bucket.last_scan_at = row.last_scan_at
+        result.append((row.minute, row.gate, row.device or "", bucket))
+    return result
+
+
+def gate_report(rows: Iterable[tuple], since: datetime) -> dict:
+    """
+    Per-gate totals, per-minute series and latency percentiles
+    rows are (minute, gate, device, GateBucket); the same key may appear several times
+    """
+    merged: Dict[BucketKey, GateBucket] = defaultdict(GateBucket)
+    for minute, gate, device, bucket in rows:
+        if minute >= since:
+            merged[(minute, gate, device)].merge(bucket)
+
+    gates: Dict[str, dict] = {}
+    for (minute, gate, device), bucket in sorted(merged.items()):
+        entry = gates.setdefault(gate, {
+            "total": GateBucket(),
+            "minutes": defaultdict(GateBucket),
+            "devices": defaultdict(GateBucket),
+        })
+        entry["total"].merge(bucket)
+        entry["minutes"][minute].merge(bucket)
+        entry["devices"][device].merge(bucket)
+
+    last_minute = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=1)
+    report = {}
+    for gate, entry in gates.items():
+        total: GateBucket = entry["total"]
+        report[gate] = {
+            "scans": total.scans,
+            "check_ins": total.check_ins,
+            "check_outs": total.check_outs,
+            "rejected": total.rejected,
+            # Last complete minute - the current one is still filling up
+            "check_ins_last_minute": entry["minutes"].get(last_minute, GateBucket()).check_ins,
+            "last_scan_at": total.last_scan_at.isoformat() if total.last_scan_at else None,
+            "server_latency": latency_summary(total.server_latency),
+            "client_latency": latency_summary(total.client_latency),
+            "devices": {
+                device or "unknown": {
+                    "scans": bucket.scans,
+                    "check_ins": bucket.check_ins,
+                    "check_outs": bucket.check_outs,
+                    "rejected": bucket.rejected,
+                    "last_scan_at": bucket.last_scan_at.isoformat() if bucket.last_scan_at else None,
+                    "server_p95_ms": latency_summary(bucket.server_latency)["p95_ms"],
+                    "client_p95_ms": latency_summary(bucket.client_latency)["p95_ms"],
+                }
+                for device, bucket in entry["devices"].items()
+            },
+            "per_minute": [
+                {
+                    "minute": minute.isoformat(),
+                    "scans": bucket.scans,
+                    "check_ins": bucket.check_ins,
+                    "check_outs": bucket.check_outs,
+                    "rejected": bucket.rejected,
+                    "server_p95_ms": latency_summary(bucket.server_latency)["p95_ms"],
+                    "client_p95_ms": latency_summary(bucket.client_latency)["p95_ms"],
+                }
+                for minute, bucket in sorted(entry["minutes"].items())
+            ],
+        }
+    return report
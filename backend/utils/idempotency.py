@@ -0,0 +1,176 @@
+"""
+Idempotency for outbound emails and retried requests
+
+Messages: every email is recorded in `messages` under a key derived from the
+registration id, message type and a hash of its content *before* it is sent.
+A second send of the same email finds the key taken and is skipped, so a
+double-clicked approve or a retried request cannot email the user twice.
+
+Requests: approve, reject and register accept an `Idempotency-Key` header.
+The first response for a key is stored and replayed for any repeat of it.
+"""
+import functools
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import update, delete, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.registration import Message, MessageType
+from models.idempotency_key import IdempotencyKey
+
+load_dotenv()
+
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+# An unsent message older than this is treated as abandoned (crashed mid-send) and may be retried
+MESSAGE_SEND_TIMEOUT_SECONDS = int(os.getenv("MESSAGE_SEND_TIMEOUT_SECONDS", "300"))
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+# ==================== Messages ====================
+
+def message_key(registration_id: int, message_type: MessageType, *content) -> str:
+    """Idempotency key for an email: registration id, message type and content hash"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in content).encode()).hexdigest()[:32]
+    return f"{registration_id}:{message_type.value}:{digest}"
+
+
+def claim_message(db: Session, key: str, **fields) -> Optional[Message]:
+    """
+    Record an email before sending it
+    Returns the Message row to send under, or None when the same email was
+    already sent or is being sent by another request right now. A previous
+    attempt that failed (or was abandoned) is taken over and retried.
+    """
+    message = Message(idempotency_key=key, sent=False, **fields)
+    db.add(message)
+    try:
+        db.commit()
+        return message
+    except IntegrityError:
+        db.rollback()
+
+    now = datetime.utcnow()
+    abandoned = now - timedelta(seconds=MESSAGE_SEND_TIMEOUT_SECONDS)
+    claimed = db.execute(
+        update(Message)
+        .where(
+            Message.idempotency_key == key,
+            Message.sent.is_(False),
+            or_(Message.error_message.isnot(None), Message.created_at < abandoned)
+        )
+        .values(error_message=None, created_at=now, **fields)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        print(f"⏭️  Skipping duplicate email {key}")
+        return None
+    return db.query(Message).filter(Message.idempotency_key == key).one()
+
+
+def finish_message(db: Session, message: Message, sent: bool, error: Optional[str] = None):
+    """Mark a claimed message as sent, or as failed so a later attempt may retry it"""
+    message.sent = sent
+    message.sent_at = datetime.utcnow() if sent else None
+    message.error_message = None if sent else (error or "Email delivery failed")
+    db.commit()
+
+
+# ==================== Requests ====================
+
+def _begin_request(db: Session, key: str, scope: str) -> Optional[JSONResponse]:
+    """Reserve a key - returns the stored response if the key was already used"""
+    cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.key == key,
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.created_at < cutoff
+    ))
+    db.add(IdempotencyKey(key=key, scope=scope))
+    try:
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+
+    stored = db.query(IdempotencyKey).filter(
+        IdempotencyKey.key == key, IdempotencyKey.scope == scope
+    ).first()
+    if stored is None or stored.status_code is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+    return JSONResponse(
+        status_code=stored.status_code,
+        content=json.loads(stored.response_body) if stored.response_body else None,
+        headers={REPLAY_HEADER: "true"}
+    )
+
+
+def _complete_request(db: Session, key: str, scope: str, status_code: int, body):
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.scope == scope)
+        .values(status_code=status_code, response_body=json.dumps(body))
+    )
+    db.commit()
+
+
+def _release_request(db: Session, key: str, scope: str):
+    """Forget a key whose request failed, so the client can retry with it"""
+    db.rollback()
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.key == key,
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.status_code.is_(None)
+    ))
+    db.commit()
+
+
+async def _run(db, fn, *args):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return fn(db, *args)
+
+
+def idempotent(status_code: int = status.HTTP_200_OK):
+    """
+    Route decorator - honour the Idempotency-Key header
+    The route must take `request`, `db` and `idempotency_key` parameters.
+    Successful responses are stored and replayed for repeats of the key;
+    failed requests release the key so they can be retried.
+    """
+    def decorator(route):
+        @functools.wraps(route)
+        async def wrapper(*args, **kwargs):
+            key = kwargs.get("idempotency_key")
+            if not key:
+                return await route(*args, **kwargs)
+
+            request, db = kwargs["request"], kwargs["db"]
+            scope = f"{request.method} {request.url.path}"[:255]
+            key = key.strip()[:255]
+
+            replay = await _run(db, _begin_request, key, scope)
+            if replay is not None:
+                return replay
+            try:
+                result = await route(*args, **kwargs)
+            except BaseException:
+                await _run(db, _release_request, key, scope)
+                raise
+            await _run(db, _complete_request, key, scope, status_code, jsonable_encoder(result))
+            return result
+        return wrapper
+    return decorator
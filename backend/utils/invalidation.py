@@ -0,0 +1,151 @@
+"""
+Cross-process cache invalidation bus (Postgres LISTEN/NOTIFY)
+In-process caches (settings snapshot, ticket index, search index) are kept by
+every worker of every replica. A writer calls notify() inside its transaction:
+on Postgres that issues pg_notify(channel, key), which the server delivers to
+every listener only if and when the transaction commits. Each worker runs
+invalidation_bus.run() in the FastAPI lifespan - a dedicated asyncpg connection
+LISTENing on every subscribed channel - and hands notifications to the cache
+handlers. The writing process also evicts locally right after its commit.
+
+While the listener is disconnected (or on SQLite, which has no NOTIFY) caches
+should not trust their contents for long: invalidation_bus.max_age() caps their
+TTLs at INVALIDATION_FALLBACK_TTL_SECONDS. After a reconnect every cache is
+invalidated, since notifications sent in between were missed.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from typing import Callable, Dict, List
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import ASYNC_DATABASE_URL, async_connect_args
+
+INVALIDATION_FALLBACK_TTL_SECONDS = float(os.getenv("INVALIDATION_FALLBACK_TTL_SECONDS", "5"))
+INVALIDATION_RECONNECT_SECONDS = float(os.getenv("INVALIDATION_RECONNECT_SECONDS", "5"))
+INVALIDATION_PING_SECONDS = float(os.getenv("INVALIDATION_PING_SECONDS", "30"))
+
+ALL_KEYS = "*"
+
+
+# Channel constants
+class Channel:
+    SETTINGS = "cache_settings"  # key: "*"
+    TICKETS = "cache_tickets"  # key: registration id
+    REGISTRATIONS = "cache_registrations"  # key: registration id or "*"
+    TICKET_STATE = "cache_ticket_state"  # key: serial code (check-in / check-out)
+
+
+def _is_postgres() -> bool:
+    return make_url(ASYNC_DATABASE_URL).get_backend_name() == "postgresql"
+
+
+class InvalidationBus:
+    """Channel -> handlers, fed by the LISTEN connection and by local commits"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+        self.connected = False
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]):
+        """handler(key) is called for every invalidation on the channel, from any thread"""
+        self._handlers[channel].append(handler)
+
+    def dispatch(self, channel: str, key: str = ALL_KEYS):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(key)
+            except Exception as e:
+                print(f"⚠️  Cache invalidation handler failed on {channel}: {e}")
+
+    def dispatch_all(self):
+        for channel in list(self._handlers):
+            self.dispatch(channel, ALL_KEYS)
+
+    def max_age(self, seconds: float) -> float:
+        """A cache TTL, shortened while invalidations cannot be received"""
+        return seconds if self.connected else min(seconds, INVALIDATION_FALLBACK_TTL_SECONDS)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self.dispatch(channel, payload or ALL_KEYS)
+
+    async def _listen(self):
+        import asyncpg
+
+        dsn = make_url(ASYNC_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        connection = await asyncpg.connect(dsn, **async_connect_args)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            for channel in self._handlers:
+                await connection.add_listener(channel, self._on_notification)
+            self.connected = True
+            # Anything sent while this worker was not listening was missed
+            self.dispatch_all()
+            print(f"📡 Cache invalidation listener connected ({len(self._handlers)} channels)")
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), INVALIDATION_PING_SECONDS)
+                except asyncio.TimeoutError:
+                    # A silently dropped TCP connection only shows up when used
+                    await asyncio.wait_for(connection.execute("SELECT 1"), INVALIDATION_RECONNECT_SECONDS)
+        finally:
+            self.connected = False
+            if not connection.is_closed():
+                await connection.close()
+
+    async def run(self):
+        """LISTEN until cancelled, reconnecting after errors"""
+        if not _is_postgres():
+            return
+        failing = False
+        while True:
+            try:
+                await self._listen()
+                print("⚠️  Cache invalidation listener disconnected")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not failing:
+                    print(f"⚠️  Cache invalidation listener unavailable, using short cache TTLs: {e}")
+                failing = True
+                await asyncio.sleep(INVALIDATION_RECONNECT_SECONDS)
+                continue
+            failing = False
+
+
+invalidation_bus = InvalidationBus()
+
+_PENDING = "invalidation_pending"
+
+
+def notify(session: Session, channel: str, key=ALL_KEYS):
+    """
+    Invalidate `key` on `channel` in every process once this transaction commits
+    Nothing is sent if it rolls back. Safe to call from session events.
+    """
+    key = str(key)
+    pending = session.info.setdefault(_PENDING, set())
+    if (channel, key) in pending:
+        return
+    pending.add((channel, key))
+    if session.get_bind().dialect.name == "postgresql":
+        session.connection().execute(select(func.pg_notify(channel, key)))
+
+
+async def notify_async(db: AsyncSession, channel: str, key=ALL_KEYS):
+    await db.run_sync(notify, channel, key)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_local(session):
+    for channel, key in session.info.pop(_PENDING, ()):
+        invalidation_bus.dispatch(channel, key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,99 @@
+"""
+Live venue occupancy from striped counters
+Check-ins and check-outs add to the checked_in / checked_out counters in the
+same transaction as the ticket update, so the counters can never disagree with
+the tickets. Each write goes to one random stripe of the counter (see
+models.venue_counter) instead of a single hot row, and a read sums the stripes -
+occupancy never counts ticket rows.
+
+Reads are shared through a short single-flight cache, so any number of
+dashboards polling every second cost at most one small query per
+OCCUPANCY_CACHE_SECONDS per worker.
+"""
+import os
+import random
+from datetime import datetime
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal, AsyncSessionLocal
+from models.registration import Ticket
+from models.venue_counter import VenueCounter
+from utils.singleflight import SingleFlightCache
+
+OCCUPANCY_COUNTER_STRIPES = int(os.getenv("OCCUPANCY_COUNTER_STRIPES", "16"))
+OCCUPANCY_CACHE_SECONDS = float(os.getenv("OCCUPANCY_CACHE_SECONDS", "0.5"))
+
+
+# Counter names
+class Counter:
+    CHECKED_IN = "checked_in"
+    CHECKED_OUT = "checked_out"
+
+
+# Counter -> ticket column whose non-null count is its starting value
+COUNTER_SOURCES = {
+    Counter.CHECKED_IN: Ticket.checked_in_at,
+    Counter.CHECKED_OUT: Ticket.checked_out_at,
+}
+
+occupancy_cache = SingleFlightCache("occupancy", ttl=OCCUPANCY_CACHE_SECONDS)
+
+
+async def add_to_counter(db: AsyncSession, name: str, amount: int = 1):
+    """Add to one random stripe of a counter in the caller's transaction (not committed)"""
+    if not amount:
+        return
+    await db.execute(
+        update(VenueCounter)
+        .where(VenueCounter.name == name, VenueCounter.stripe == random.randrange(OCCUPANCY_COUNTER_STRIPES))
+        .values(value=VenueCounter.value + amount)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def ensure_counters():
+    """
+    Create missing counter stripes at startup
+    A counter without any row yet starts from the ticket check-in / check-out times
+    """
+    db = SessionLocal()
+    try:
+        existing = set(db.execute(select(VenueCounter.name, VenueCounter.stripe)).all())
+        seeded = {name for name, _ in existing}
+        rows = []
+        for name, source in COUNTER_SOURCES.items():
+            start = 0 if name in seeded else db.execute(select(func.count(source))).scalar_one()
+            for stripe in range(OCCUPANCY_COUNTER_STRIPES):
+                if (name, stripe) not in existing:
+                    rows.append({"name": name, "stripe": stripe, "value": start if stripe == 0 else 0})
+        if rows:
+            db.execute(insert(VenueCounter), rows)
+            db.commit()
+    except IntegrityError:
+        # Another worker created them first
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def read_occupancy() -> dict:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(VenueCounter.name, func.sum(VenueCounter.value)).group_by(VenueCounter.name)
+        )).all()
+    totals = {name: int(total or 0) for name, total in rows}
+    checked_in = totals.get(Counter.CHECKED_IN, 0)
+    checked_out = totals.get(Counter.CHECKED_OUT, 0)
+    return {
+        "inside": checked_in - checked_out,
+        "checked_in": checked_in,
+        "checked_out": checked_out,
+        "as_of": datetime.utcnow().isoformat(),
+    }
+
+
+async def get_occupancy() -> dict:
+    """Current occupancy - at most OCCUPANCY_CACHE_SECONDS old"""
+    return await occupancy_cache.get("venue", read_occupancy)
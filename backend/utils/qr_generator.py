@@ -1,23 +1,104 @@
 import qrcode
+from qrcode.util import QRData, MODE_ALPHA_NUM, MODE_8BIT_BYTE
 from PIL import Image, ImageDraw, ImageFont
 import os
-from pathlib import Path
-import tempfile
-from utils.storage import upload_qr_code
+import re
+from io import BytesIO
+from dotenv import load_dotenv
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from utils.storage import upload_qr_code_bytes, delete_qr_code as delete_stored_qr_code
+from utils.ticket_token import encode_ticket_token, TICKET_VALID_UNTIL, SIGNED_TICKETS_ENABLED
 
+load_dotenv()
 
-async def generate_ticket_qr(serial_code: str, name: str, email: str) -> str:
-    qr_data = f'{{"serial_code":"{serial_code}","name":"{name}","email":"{email}"}}'
+ERROR_CORRECTION_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+# Encoding profiles - payload: json (serial, name, email), token (signed, see
+# utils/ticket_token.py) or serial (plain serial code)
+QR_PROFILES = {
+    "legacy": {"payload": "json", "error_correction": "H"},
+    "signed": {"payload": "token", "error_correction": "M"},
+    "serial": {"payload": "serial", "error_correction": "M"},
+}
+
+QR_PROFILE = os.getenv("QR_PROFILE", "signed").lower()
+# Optional override of the profile's error correction level (L, M, Q or H)
+QR_ERROR_CORRECTION = os.getenv("QR_ERROR_CORRECTION", "").upper()
+
+if QR_PROFILES.get(QR_PROFILE, {}).get("payload") == "token" and not SIGNED_TICKETS_ENABLED:
+    print("⚠️  TICKET_SIGNING_KEY is not set (or equals JWT_SECRET_KEY) - QR codes use the serial profile")
+
+# Characters the QR alphanumeric mode can encode (5.5 bits/char vs 8 in byte mode)
+ALPHANUMERIC_PATTERN = re.compile(r"^[0-9A-Z $%*+\-./:]*$")
+
+
+def get_qr_profile(profile: str = None) -> dict:
+    name = (profile or QR_PROFILE).lower()
+    if name not in QR_PROFILES:
+        raise ValueError(f"Unknown QR_PROFILE '{name}'. Use: {', '.join(QR_PROFILES)}")
+    if QR_PROFILES[name]["payload"] == "token" and not SIGNED_TICKETS_ENABLED:
+        # No dedicated TICKET_SIGNING_KEY - plain serials, verified online
+        name = "serial"
+    settings = dict(QR_PROFILES[name], name=name)
+    if QR_ERROR_CORRECTION:
+        if QR_ERROR_CORRECTION not in ERROR_CORRECTION_LEVELS:
+            raise ValueError(f"Unknown QR_ERROR_CORRECTION '{QR_ERROR_CORRECTION}'. Use: L, M, Q or H")
+        settings["error_correction"] = QR_ERROR_CORRECTION
+    return settings
+
+
+def qr_payload_expires(profile: str = None) -> bool:
+    """
+    True when stored QR codes can go stale - signed tokens with a TTL instead of
+    TICKET_VALID_UNTIL. Approve and resend then generate fresh ones.
+    """
+    return get_qr_profile(profile)["payload"] == "token" and TICKET_VALID_UNTIL is None
+
+
+def qr_code_outdated(qr_code_path: Optional[str], serial_code: str) -> bool:
+    """No QR code yet, or one stored under the old serial-named (guessable) key"""
+    return not qr_code_path or qr_code_path.endswith(f"/{serial_code}.png")
+
+
+def build_qr_payload(serial_code: str, name: str, email: str, payload: str) -> str:
+    if payload == "token":
+        return encode_ticket_token(serial_code)
+    if payload == "serial":
+        return serial_code.upper()
+    return f'{{"serial_code":"{serial_code}","name":"{name}","email":"{email}"}}'
+
+
+def build_qr(serial_code: str, name: str, email: str, profile: str = None) -> qrcode.QRCode:
+    """
+    Build the QR matrix for a ticket using an encoding profile
+    Uppercase payloads (serials, signed tokens) are encoded in alphanumeric mode
+    """
+    settings = get_qr_profile(profile)
+    qr_data = build_qr_payload(serial_code, name, email, settings["payload"])
     
-    # Generate QR code
     qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        version=None,
+        error_correction=ERROR_CORRECTION_LEVELS[settings["error_correction"]],
         box_size=10,
         border=4,
     )
-    qr.add_data(qr_data)
+    mode = MODE_ALPHA_NUM if ALPHANUMERIC_PATTERN.match(qr_data) else MODE_8BIT_BYTE
+    qr.add_data(QRData(qr_data, mode=mode))
     qr.make(fit=True)
+    return qr
+
+
+def render_ticket_image(serial_code: str, name: str, email: str, profile: str = None) -> Image.Image:
+    """
+    Render a ticket card (QR code plus serial and name) as a 400x500 image
+    """
+    qr = build_qr(serial_code, name, email, profile)
     
     # Create QR code image
     qr_img = qr.make_image(fill_color="black", back_color="white")
@@ -25,8 +106,8 @@ async def generate_ticket_qr(serial_code: str, name: str, email: str) -> str:
     # Create a larger image with text
     final_img = Image.new('RGB', (400, 500), 'white')
     
-    # Paste QR code
-    qr_img = qr_img.resize((350, 350))
+    # Paste QR code - nearest-neighbour keeps module edges sharp for scanners
+    qr_img = qr_img.resize((350, 350), Image.NEAREST)
     final_img.paste(qr_img, (25, 25))
     
     # Add text below QR code
@@ -53,19 +134,26 @@ async def generate_ticket_qr(serial_code: str, name: str, email: str) -> str:
     draw.text((200, 445), "EVENT TICKET", fill="green", font=font_small, anchor="mm")
     draw.text((200, 465), "Keep this QR code safe!", fill="gray", font=font_small, anchor="mm")
     
-    # Save to temporary file
-    with tempfile.NamedTemporaryFile(mode='wb', suffix='.png', delete=False) as tmp_file:
-        tmp_filepath = tmp_file.name
-        final_img.save(tmp_filepath)
-    
-    # Upload to Supabase Storage
-    public_url = await upload_qr_code(tmp_filepath, serial_code)
+    return final_img
+
+
+def render_ticket_png(serial_code: str, name: str, email: str, profile: str = None) -> bytes:
+    buffer = BytesIO()
+    render_ticket_image(serial_code, name, email, profile).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def generate_ticket_qr(serial_code: str, name: str, email: str, replaces: Optional[str] = None) -> str:
+    # Payload and error correction come from QR_PROFILE (default: signed token, level M)
+    png = render_ticket_png(serial_code, name, email)
     
-    # Delete temporary file (upload_qr_code also deletes it, but just in case)
-    if os.path.exists(tmp_filepath):
-        os.remove(tmp_filepath)
+    public_url = await upload_qr_code_bytes(png, serial_code)
     
-    return public_url
+    # Every upload gets a new key - drop the QR code this one replaces,
+    # or keep it if the upload failed
+    if replaces and public_url:
+        await run_in_threadpool(delete_stored_qr_code, replaces)
+    return public_url or replaces
 
 
 def verify_qr_exists(filepath: str) -> bool:
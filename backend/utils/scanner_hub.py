@@ -0,0 +1,152 @@
+"""
+Ticket state push to connected scanner devices
+Scanners connected to /ws/scanner (routes.scanner_ws) keep a local cache of
+ticket states. The hub listens on the invalidation bus - approvals, rejections
+and deactivations (Channel.TICKETS, keyed by registration) and check-ins /
+check-outs (Channel.TICKET_STATE, keyed by serials) - from every worker and
+replica, and pushes the new state of the affected tickets to the devices
+connected to this worker.
+
+Changes arriving within SCANNER_PUSH_BATCH_SECONDS are coalesced into one
+query and one frame per device. A device that cannot keep up is disconnected
+rather than allowed to hold up the others; it resyncs when it reconnects.
+"""
+import asyncio
+import os
+from typing import Optional, Set
+from sqlalchemy import or_
+
+from database import AsyncSessionLocal
+from models.registration import Ticket
+from utils.invalidation import invalidation_bus, Channel, ALL_KEYS
+from utils.ticket_index import ticket_state_select
+
+SCANNER_PUSH_ENABLED = os.getenv("SCANNER_PUSH_ENABLED", "true").lower() == "true"
+SCANNER_PUSH_BATCH_SECONDS = float(os.getenv("SCANNER_PUSH_BATCH_SECONDS", "0.2"))
+SCANNER_WS_SEND_TIMEOUT_SECONDS = float(os.getenv("SCANNER_WS_SEND_TIMEOUT_SECONDS", "5"))
+
+
+def ticket_push_fields(row) -> dict:
+    """What a scanner caches per ticket - same rows as the ticket index"""
+    return {
+        "serial_code": row.serial_code,
+        "registration_id": row.registration_id,
+        "member_name": row.member_name,
+        "state": row.state.value,
+        "checked_in_at": row.checked_in_at.isoformat() if row.checked_in_at else None,
+        "checked_out_at": row.checked_out_at.isoformat() if row.checked_out_at else None,
+    }
+
+
+class ScannerHub:
+    """Connected scanner sockets of this worker, and the ticket changes waiting to be pushed"""
+
+    def __init__(self):
+        self.connections: Set = set()
+        self._registrations: Set[int] = set()
+        self._serials: Set[str] = set()
+        self._resync = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.pushed_frames = 0
+        self.dropped_connections = 0
+
+    def add(self, connection):
+        self.connections.add(connection)
+
+    def discard(self, connection):
+        self.connections.discard(connection)
+
+    def _changed(self, registration_id=None, serials=(), resync=False):
+        # Runs on the event loop
+        if not self.connections:
+            return
+        if resync:
+            self._resync = True
+        if registration_id is not None:
+            self._registrations.add(registration_id)
+        self._serials.update(serials)
+        self._wake.set()
+
+    def _schedule(self, **changes):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: self._changed(**changes))
+
+    def tickets_changed(self, key: str):
+        """Channel.TICKETS handler (registration id or "*") - any thread"""
+        if key == ALL_KEYS:
+            self._schedule(resync=True)
+        else:
+            self._schedule(registration_id=int(key))
+
+    def ticket_states_changed(self, key: str):
+        """Channel.TICKET_STATE handler (comma-separated serials or "*") - any thread"""
+        if key == ALL_KEYS:
+            self._schedule(resync=True)
+        else:
+            self._schedule(serials=[serial for serial in key.split(",") if serial])
+
+    async def _load(self, registration_ids, serials) -> list:
+        conditions = []
+        if registration_ids:
+            conditions.append(Ticket.registration_id.in_(registration_ids))
+        if serials:
+            conditions.append(Ticket.serial_code.in_(serials))
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(ticket_state_select().where(or_(*conditions)))).all()
+        return [ticket_push_fields(row) for row in rows]
+
+    async def broadcast(self, message: dict):
+        """Send to every connection - ones that time out or fail are closed"""
+        connections = list(self.connections)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send(message), SCANNER_WS_SEND_TIMEOUT_SECONDS) for connection in connections),
+            return_exceptions=True
+        )
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.dropped_connections += 1
+                self.discard(connection)
+                await connection.abort()
+        self.pushed_frames += len(connections)
+
+    async def _push(self):
+        registration_ids, serials, resync = self._registrations, self._serials, self._resync
+        self._registrations, self._serials, self._resync = set(), set(), False
+        if not self.connections:
+            return
+        if resync:
+            # Invalidations may have been missed - devices drop their cache and refill it
+            await self.broadcast({"type": "resync"})
+            return
+        tickets = await self._load(registration_ids, serials)
+        if tickets:
+            await self.broadcast({"type": "tickets", "tickets": tickets})
+
+    async def run(self):
+        """Push coalesced ticket changes until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(SCANNER_PUSH_BATCH_SECONDS)
+            self._wake.clear()
+            try:
+                await self._push()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Scanner push failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.connections),
+            "pushed_frames": self.pushed_frames,
+            "dropped_connections": self.dropped_connections,
+        }
+
+
+scanner_hub = ScannerHub()
+
+invalidation_bus.subscribe(Channel.TICKETS, scanner_hub.tickets_changed)
+invalidation_bus.subscribe(Channel.TICKET_STATE, scanner_hub.ticket_states_changed)
@@ -0,0 +1,206 @@
+"""
+In-memory participant search index (SQLite fallback)
+Postgres answers /api/admin/search from trigram / tsvector indexes; SQLite has
+neither, so development and test databases use this index instead.
+
+Every registration is split into tokens (name and team name words, email, email
+local-part words, phone digits, member names, ticket serials). A query word
+matches a token by prefix (sorted token list + bisect) or, for typos, by trigram
+similarity (trigram -> tokens inverted index). Only alphabetic words are in the
+trigram index - identifiers (emails, phones, serials) are unique per registration
+and would bloat it, so they match by prefix only.
+
+Write paths that change searchable fields (new registrations, deletions) notify
+Channel.REGISTRATIONS, which marks the index dirty in every worker through
+utils.invalidation; the index then compares the table counts / latest registration
+update and rebuilds if they changed. Other writes (bulk inserts, backfills) are
+picked up by the same check every SEARCH_INDEX_CHECK_SECONDS. Scans and approvals
+do not change searchable fields and do not notify.
+"""
+import asyncio
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import select, func
+
+from models.registration import Registration, Ticket
+from models.team_member import TeamMember
+from utils.invalidation import invalidation_bus, Channel
+
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.3"))
+SEARCH_INDEX_CHECK_SECONDS = float(os.getenv("SEARCH_INDEX_CHECK_SECONDS", "30"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Score of a match kind - exact beats prefix beats fuzzy (fuzzy is scaled by similarity)
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+FUZZY_SCALE = 0.8
+
+
+def trigrams(token: str) -> Set[str]:
+    """pg_trgm style trigrams: two leading spaces, one trailing"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower()) if text else []
+
+
+def registration_tokens(name, email, phone, team_name, member_names, serials) -> Set[str]:
+    tokens = set(tokenize(name)) | set(tokenize(team_name))
+    for member_name in member_names:
+        tokens.update(tokenize(member_name))
+    if email:
+        email = email.lower()
+        tokens.add(email)
+        tokens.update(tokenize(email.split("@")[0]))
+    digits = re.sub(r"\D", "", phone or "")
+    if digits:
+        tokens.add(digits)
+        tokens.add(digits[-10:])  # National number, without the country code
+    tokens.update(serial.lower() for serial in serials)
+    return tokens
+
+
+class SearchIndex:
+    """Token / trigram index over registrations"""
+
+    def __init__(self):
+        self.version = None
+        self.dirty = True
+        self._checked_at = 0.0
+        self._postings: Dict[str, Set[int]] = {}
+        self._sorted_tokens: List[str] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._lock = asyncio.Lock()
+
+    def build(self, documents: Iterable[Tuple[int, Set[str]]]):
+        postings = defaultdict(set)
+        for registration_id, tokens in documents:
+            for token in tokens:
+                postings[token].add(registration_id)
+        grams = defaultdict(set)
+        for token in postings:
+            if not token.isalpha():
+                continue
+            for gram in trigrams(token):
+                grams[gram].add(token)
+        self._postings = dict(postings)
+        self._sorted_tokens = sorted(postings)
+        self._trigrams = dict(grams)
+
+    def _match_word(self, word: str) -> Dict[str, float]:
+        """Tokens matching one query word, with their score"""
+        matches = {}
+        start = bisect_left(self._sorted_tokens, word)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(word):
+                break
+            matches[token] = EXACT_SCORE if token == word else PREFIX_SCORE
+
+        if len(word) >= 3 and word.isalpha():
+            word_grams = trigrams(word)
+            shared = Counter()
+            for gram in word_grams:
+                shared.update(self._trigrams.get(gram, ()))
+            for token, count in shared.items():
+                if token in matches:
+                    continue
+                similarity = count / (len(word_grams) + len(trigrams(token)) - count)
+                if similarity >= SEARCH_FUZZY_THRESHOLD:
+                    matches[token] = similarity * FUZZY_SCALE
+        return matches
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """(registration_id, score) best first - every query word must match"""
+        words = tokenize(query)
+        raw = query.strip().lower()
+        if not words:
+            return []
+
+        # Whole query as one token, for emails and serials typed with punctuation -
+        # if it matches, the query was an identifier and its words are not searched
+        if len(words) > 1 or raw != words[0]:
+            whole = {}
+            for token, score in self._match_word(raw).items():
+                for registration_id in self._postings[token]:
+                    whole[registration_id] = max(whole.get(registration_id, 0), score)
+            if whole:
+                return sorted(whole.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+        totals = None
+        for word in words:
+            best: Dict[int, float] = {}
+            for token, score in self._match_word(word).items():
+                for registration_id in self._postings[token]:
+                    if score > best.get(registration_id, 0):
+                        best[registration_id] = score
+            if totals is None:
+                totals = best
+            else:
+                totals = {rid: totals[rid] + score for rid, score in best.items() if rid in totals}
+            if not totals:
+                break
+
+        scores = {rid: total / len(words) for rid, total in (totals or {}).items()}
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    @staticmethod
+    async def current_version(db) -> tuple:
+        """Changes whenever a registration, team member or ticket is added, removed or updated"""
+        return (await db.execute(select(
+            select(func.count(Registration.id)).scalar_subquery(),
+            select(func.max(Registration.updated_at)).scalar_subquery(),
+            select(func.count(TeamMember.id)).scalar_subquery(),
+            select(func.count(Ticket.id)).scalar_subquery(),
+        ))).one()
+
+    async def refresh(self, db):
+        """Rebuild from the database if anything changed since the last build"""
+        check_seconds = invalidation_bus.max_age(SEARCH_INDEX_CHECK_SECONDS)
+        if not self.dirty and time.monotonic() - self._checked_at < check_seconds:
+            return
+        self.dirty = False
+        self._checked_at = time.monotonic()
+        version = tuple(await self.current_version(db))
+        if version == self.version:
+            return
+        async with self._lock:
+            if version == self.version:
+                return
+            members = defaultdict(list)
+            for registration_id, member_name in await db.execute(
+                select(TeamMember.registration_id, TeamMember.name)
+            ):
+                members[registration_id].append(member_name)
+            serials = defaultdict(list)
+            for registration_id, serial_code in await db.execute(
+                select(Ticket.registration_id, Ticket.serial_code)
+            ):
+                serials[registration_id].append(serial_code)
+            registrations = await db.execute(select(
+                Registration.id, Registration.name, Registration.email,
+                Registration.phone, Registration.team_name
+            ))
+            self.build(
+                (reg.id, registration_tokens(
+                    reg.name, reg.email, reg.phone, reg.team_name, members[reg.id], serials[reg.id]
+                ))
+                for reg in registrations
+            )
+            self.version = version
+            print(f"🔎 Search index rebuilt ({len(self._postings)} tokens)")
+
+
+search_index = SearchIndex()
+
+def _invalidate_search_index(key):
+    search_index.dirty = True
+
+
+invalidation_bus.subscribe(Channel.REGISTRATIONS, _invalidate_search_index)
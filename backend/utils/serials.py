@@ -0,0 +1,113 @@
+"""
+Ticket serial allocation
+Serial numbers are reserved in blocks from a Postgres sequence and handed out
+from an in-process cache, so tickets can be built before the registration row
+has an id. Every serial ends in a Luhn mod 36 check character.
+
+Formats:
+    EVT26-000123-K      individual ticket
+    TEAM000045-A-K      team ticket (one number per team, letter per member)
+Legacy serials (EVT25-000123, TEAM045-A) are still accepted everywhere.
+"""
+import asyncio
+import re
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Sequence, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base
+
+# Numbers reserved per sequence call - the sequence INCREMENTs by this much.
+# Changing it requires ALTER SEQUENCE ticket_serial_seq INCREMENT BY <n>.
+SERIAL_BLOCK_SIZE = 100
+
+ticket_serial_seq = Sequence(
+    "ticket_serial_seq", start=1, increment=SERIAL_BLOCK_SIZE, metadata=Base.metadata
+)
+
+CHECK_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+SERIAL_PATTERN = re.compile(r"^(EVT\d{2}-\d{6,}|TEAM\d{6,}-[A-Z])-[0-9A-Z]$")
+LEGACY_SERIAL_PATTERN = re.compile(r"^(EVT\d{2}-[0-9A-Z]+|TEAM\d{3,}-[A-Z])$")
+
+
+def check_char(body: str) -> str:
+    """Luhn mod 36 check character for a serial body (hyphens ignored)"""
+    n = len(CHECK_ALPHABET)
+    factor = 2
+    total = 0
+    for char in reversed(body.replace("-", "")):
+        addend = factor * CHECK_ALPHABET.index(char)
+        factor = 1 if factor == 2 else 2
+        total += addend // n + addend % n
+    return CHECK_ALPHABET[(n - total % n) % n]
+
+
+def has_valid_check(serial: str) -> bool:
+    body, _, check = serial.rpartition("-")
+    return check_char(body) == check
+
+
+def is_valid_serial(serial: str) -> bool:
+    """
+    Cheap offline validation - a current-format serial must carry a correct
+    check character, legacy serials only have to match their old format
+    """
+    serial = serial.strip().upper()
+    if SERIAL_PATTERN.match(serial):
+        return has_valid_check(serial)
+    return bool(LEGACY_SERIAL_PATTERN.match(serial))
+
+
+def format_serial(number: int, is_bulk: bool = False, member_index: int = 0) -> str:
+    if is_bulk:
+        body = f"TEAM{number:06d}-{chr(65 + member_index)}"
+    else:
+        body = f"EVT{datetime.now().strftime('%y')}-{number:06d}"
+    return f"{body}-{check_char(body)}"
+
+
+class SerialAllocator:
+    """
+    Hands out serial numbers from blocks reserved with one nextval() each
+    Blocks are per process, so numbers are unique but not contiguous across workers
+    Non-Postgres databases (local SQLite) use an in-process counter seeded from
+    the highest serial already stored
+    """
+
+    def __init__(self, block_size: int = SERIAL_BLOCK_SIZE):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _reserve_block(self, db: AsyncSession):
+        if db.bind.dialect.name == "postgresql":
+            start = await db.scalar(select(ticket_serial_seq.next_value()))
+            self._next, self._end = start, start + self.block_size
+            return
+
+        if self._end == 0:
+            rows = await db.execute(text("SELECT serial_code FROM tickets WHERE serial_code LIKE '%-%-_'"))
+            numbers = [
+                int(re.search(r"\d{6,}", code).group())
+                for (code,) in rows if SERIAL_PATTERN.match(code)
+            ]
+            self._next = self._end = max(numbers, default=0) + 1
+        self._end += self.block_size
+
+    async def allocate(self, db: AsyncSession, count: int = 1) -> List[int]:
+        numbers = []
+        async with self._lock:
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    await self._reserve_block(db)
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+        return numbers
+
+
+serial_allocator = SerialAllocator()
@@ -0,0 +1,228 @@
+"""
+Cross-worker shared-memory cache for read-mostly lookup data
+With several uvicorn workers every process would otherwise hold (and refresh)
+its own copy of hot data. A SharedSnapshot is a versioned key -> JSON value
+table in a file under SHARED_CACHE_DIR (tmpfs /dev/shm when available): one
+process builds it and publishes it with an atomic rename, every worker maps the
+file read-only and looks keys up in place - the pages live once in the OS page
+cache, however many workers map them.
+
+File layout (little endian):
+  header   magic, version, created_at (unix time), entry count
+  entries  (key offset, key length, value offset, value length) sorted by key
+  data     UTF-8 keys and JSON values
+
+Readers re-check the file at most every SHARED_CACHE_CHECK_SECONDS and remap it
+when a new version was renamed into place; the old mapping stays valid until
+then. LeaderLock (flock) picks the single writer for data that must not be
+rebuilt by every worker - the lock is released by the OS if that worker dies,
+and another worker takes over.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows - no flock, so no shared cache
+    fcntl = None
+
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true" and fcntl is not None
+SHARED_CACHE_CHECK_SECONDS = float(os.getenv("SHARED_CACHE_CHECK_SECONDS", "0.5"))
+
+
+def _default_cache_dir() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    # One directory per database, so deployments sharing a host do not share snapshots
+    database = hashlib.sha1(os.getenv("DATABASE_URL", "").encode()).hexdigest()[:10]
+    return os.path.join(base, f"event-ticketing-{database}")
+
+
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR") or _default_cache_dir()
+
+MAGIC = b"ETSNAP01"
+HEADER = struct.Struct("<8sQdI")  # magic, version, created_at, count
+ENTRY = struct.Struct("<IIII")  # key offset, key length, value offset, value length
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "value"):  # Enum
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_value(value) -> bytes:
+    """Snapshot value encoding (compact JSON)"""
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+
+
+class SharedSnapshot:
+    """Versioned key -> JSON value table shared by all workers through mmap"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = os.path.join(SHARED_CACHE_DIR, f"{name}.snap")
+        self._map: Optional[mmap.mmap] = None
+        self._file_id = None
+        self._checked_at = 0.0
+        self.version = 0
+        self.created_at = 0.0
+        self._count = 0
+
+    # ---------- Writing ----------
+
+    def publish(self, items: Iterable[Tuple[str, Any]]) -> int:
+        """Write a new version of the snapshot and atomically replace the old one"""
+        return self.publish_encoded((key.encode(), encode_value(value)) for key, value in items)
+
+    def publish_encoded(self, items: Iterable[Tuple[bytes, bytes]]) -> int:
+        """publish() for keys and values already encoded with encode_value"""
+        if not SHARED_CACHE_ENABLED:
+            return 0
+        encoded = sorted(items)
+        version = self._current_version() + 1
+        data_start = HEADER.size + ENTRY.size * len(encoded)
+
+        entries = bytearray()
+        data = bytearray()
+        for key, value in encoded:
+            key_offset = data_start + len(data)
+            data += key
+            value_offset = data_start + len(data)
+            data += value
+            entries += ENTRY.pack(key_offset, len(key), value_offset, len(value))
+
+        os.makedirs(SHARED_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{self.name}.", suffix=".tmp", dir=SHARED_CACHE_DIR)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, version, time.time(), len(encoded)))
+                f.write(entries)
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._checked_at = 0.0  # Map the new version on the next read
+        return version
+
+    def invalidate(self):
+        """Remove the snapshot - readers see a miss and rebuild it"""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._checked_at = 0.0
+
+    def _current_version(self) -> int:
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, _, _ = HEADER.unpack(f.read(HEADER.size))
+            return version if magic == MAGIC else 0
+        except (FileNotFoundError, struct.error):
+            return 0
+
+    # ---------- Reading ----------
+
+    def _refresh(self) -> Optional[mmap.mmap]:
+        """Current mapping, remapped if a new version replaced the file"""
+        now = time.monotonic()
+        if now - self._checked_at < SHARED_CACHE_CHECK_SECONDS:
+            return self._map
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return None
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return self._map
+
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            self._close()
+            return None
+        magic, version, created_at, count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            mapped.close()
+            self._close()
+            return None
+        self._close()
+        self._map, self._file_id = mapped, file_id
+        self.version, self.created_at, self._count = version, created_at, count
+        return mapped
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+        self._map, self._file_id = None, None
+        self.version, self.created_at, self._count = 0, 0.0, 0
+
+    @property
+    def available(self) -> bool:
+        return SHARED_CACHE_ENABLED and self._refresh() is not None
+
+    def __len__(self):
+        return self._count if self.available else 0
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Value for key (binary search in the mapping), or None if missing / older than max_age"""
+        if not SHARED_CACHE_ENABLED:
+            return None
+        mapped = self._refresh()
+        if mapped is None:
+            return None
+        if max_age is not None and time.time() - self.created_at > max_age:
+            return None
+        target = key.encode()
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_offset, key_length, value_offset, value_length = ENTRY.unpack_from(
+                mapped, HEADER.size + mid * ENTRY.size
+            )
+            probe = mapped[key_offset:key_offset + key_length]
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return json.loads(mapped[value_offset:value_offset + value_length])
+        return None
+
+
+class LeaderLock:
+    """Non-blocking exclusive flock - held by exactly one worker at a time"""
+
+    def __init__(self, name: str):
+        self.path = os.path.join(SHARED_CACHE_DIR, f"{name}.lock")
+        self._fd = None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None or not SHARED_CACHE_ENABLED:
+            return True
+        os.makedirs(SHARED_CACHE_DIR, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)  # Closing the descriptor drops the flock
+            self._fd = None
@@ -0,0 +1,152 @@
+"""
+Single-flight request coalescing with keyed TTL caching
+When ten admins open the dashboard at once, or a cache entry expires under load,
+every request would otherwise run the same expensive query (or Cloudinary
+download) in parallel. SingleFlight runs one computation per key and hands its
+result - or its exception - to every caller that asked while it was running.
+
+SingleFlightCache keeps the results for `ttl` seconds. After that an entry is
+stale for another `stale_ttl` seconds: callers get the stale value immediately
+while one background refresh replaces it, so expiry never makes a crowd wait on
+the database. Past the stale window callers wait for one shared load.
+
+Caches subscribed to invalidation bus channels drop their entries when those
+channels fire (in every worker), and use invalidation_bus.max_age() to shorten
+their TTLs while invalidations cannot be received. A load that was started
+before an invalidation still answers its callers but is not stored.
+
+Loaders run as their own tasks, independent of the request that started them -
+they must open their own database session (database.async_read_session).
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple
+
+from utils.invalidation import invalidation_bus, ALL_KEYS
+
+Loader = Callable[[], Awaitable[Any]]
+
+# Every SingleFlightCache, for the metrics endpoint
+caches: Dict[str, "SingleFlightCache"] = {}
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def running(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def start(self, key: Hashable, loader: Loader) -> asyncio.Task:
+        """The in-flight task for key, started with loader() if there is none"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    async def do(self, key: Hashable, loader: Loader) -> Any:
+        """Result of the shared computation - a cancelled caller does not cancel it for the others"""
+        return await asyncio.shield(self.start(key, loader))
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller went away
+
+
+class SingleFlightCache:
+    """Keyed TTL cache with stale-while-revalidate, loading each key once at a time"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0,
+        max_entries: int = 256,
+        channels: Iterable[str] = (),
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.channels = tuple(channels)
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}  # key -> (value, stored at, monotonic)
+        self._flight = SingleFlight()
+        self._generation = 0
+        self.hits = self.stale_hits = self.misses = self.coalesced = self.refresh_failures = 0
+        for channel in self.channels:
+            invalidation_bus.subscribe(channel, self.invalidate)
+        caches[name] = self
+
+    def _lifetimes(self) -> Tuple[float, float]:
+        if not self.channels:
+            return self.ttl, self.stale_ttl
+        return invalidation_bus.max_age(self.ttl), invalidation_bus.max_age(self.stale_ttl)
+
+    async def get(self, key: Hashable, loader: Loader) -> Any:
+        """Cached value for key, loading it with loader() (shared by concurrent callers) when missing"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            ttl, stale_ttl = self._lifetimes()
+            if age < ttl:
+                self.hits += 1
+                return value
+            if age < ttl + stale_ttl:
+                self.stale_hits += 1
+                self._revalidate(key, loader)
+                return value
+
+        if self._flight.running(key):
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return await self._flight.do(key, lambda: self._load(key, loader))
+
+    def _revalidate(self, key: Hashable, loader: Loader):
+        if self._flight.running(key):
+            return
+        task = self._flight.start(key, lambda: self._load(key, loader))
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_failures += 1
+            print(f"⚠️  {self.name} cache refresh failed, serving stale value: {task.exception()}")
+
+    async def _load(self, key: Hashable, loader: Loader) -> Any:
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, key: Any = ALL_KEYS):
+        """Drop every entry - invalidation bus handler, any thread"""
+        self._generation += 1
+        self._entries = {}
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._flight._calls),
+            "ttl_s": self.ttl,
+            "stale_ttl_s": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refresh_failures": self.refresh_failures,
+        }
@@ -1,84 +1,338 @@
+"""
+File storage backends
+Cloudinary (production), local disk and in-memory implementations behind one interface.
+The active backend is selected with STORAGE_BACKEND=cloudinary|local|memory
+"""
 import os
+from abc import ABC, abstractmethod
 from typing import Optional
 from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+from starlette.concurrency import run_in_threadpool
+import mimetypes
+import threading
 import uuid
 from io import BytesIO
+import httpx
 
 load_dotenv()
 
-# Configure Cloudinary
-CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
-CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
-CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary").lower()
 
-cloudinary.config(
-    cloud_name=CLOUDINARY_CLOUD_NAME,
-    api_key=CLOUDINARY_API_KEY,
-    api_secret=CLOUDINARY_API_SECRET
+# Local storage configuration
+LOCAL_STORAGE_DIR = os.getenv(
+    "LOCAL_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "uploads")
 )
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000").rstrip("/")
+FILES_ROUTE = "/files"
 
-# Folder names in Cloudinary
+# Folder names (Cloudinary folders / local sub-directories)
 PAYMENT_FOLDER = "event-tickets/payments"
 QR_FOLDER = "event-tickets/qr-codes"
+PAYMENT_QR_FOLDER = "qr_codes/payment"
+
+IMAGE_FORMATS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
+
+
+class StorageBackend(ABC):
+    """
+    Storage interface - keys are folder-style paths including the file extension
+    e.g. "event-tickets/payments/1b4e28ba-2fa1-11d2-883f-0016d3cca427.jpg"
+    """
+    name = "base"
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        """Store data under key and return its public URL"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return stored bytes or None if the key does not exist"""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Remove the key - True if something was deleted"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL of the key"""
+
+    @abstractmethod
+    def key_from_url(self, file_url: str) -> Optional[str]:
+        """Map a URL produced by this backend back to its key (None if foreign)"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path for zero-copy serving, if the backend keeps files on disk"""
+        return None
+
+    async def aput(self, key: str, data: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        return await run_in_threadpool(self.put, key, data, content_type)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await run_in_threadpool(self.get, key)
+
+    async def adelete(self, key: str) -> bool:
+        return await run_in_threadpool(self.delete, key)
+
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+        import cloudinary.utils
+
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+            secure=True
+        )
+        self._uploader = cloudinary.uploader
+        self._utils = cloudinary.utils
+
+    @staticmethod
+    def _split(key: str):
+        public_id, ext = os.path.splitext(key)
+        return public_id, ext.lstrip('.').lower()
+
+    def _resource_type(self, ext: str) -> str:
+        return "image" if ext in IMAGE_FORMATS else "raw"
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        public_id, ext = self._split(key)
+        resource_type = self._resource_type(ext)
+        options = {
+            "public_id": public_id if resource_type == "image" else key,
+            "resource_type": resource_type,
+            "overwrite": True
+        }
+        if resource_type == "image":
+            options["format"] = ext or "png"
+        result = self._uploader.upload(BytesIO(data), **options)
+        return result.get("secure_url")
+
+    def get(self, key: str) -> Optional[bytes]:
+        response = httpx.get(self.url(key))
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    def delete(self, key: str) -> bool:
+        public_id, ext = self._split(key)
+        resource_type = self._resource_type(ext)
+        result = self._uploader.destroy(
+            public_id if resource_type == "image" else key,
+            resource_type=resource_type
+        )
+        return result.get("result") == "ok"
+
+    def url(self, key: str) -> str:
+        public_id, ext = self._split(key)
+        resource_type = self._resource_type(ext)
+        if resource_type == "image":
+            return self._utils.cloudinary_url(public_id, format=ext, secure=True)[0]
+        return self._utils.cloudinary_url(key, resource_type="raw", secure=True)[0]
+
+    def key_from_url(self, file_url: str) -> Optional[str]:
+        # https://res.cloudinary.com/<cloud>/image/upload/v123/<folder>/<id>.<ext>
+        if "res.cloudinary.com" not in file_url:
+            return None
+        parts = file_url.split("?")[0].split("/")
+        try:
+            upload_idx = parts.index("upload")
+        except ValueError:
+            return None
+        path_parts = parts[upload_idx + 1:]
+        if path_parts and path_parts[0].startswith("v") and path_parts[0][1:].isdigit():
+            path_parts = path_parts[1:]
+        return "/".join(path_parts) or None
+
+
+class LocalStorage(StorageBackend):
+    """Stores files under LOCAL_STORAGE_DIR and serves them from the /files route"""
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORAGE_DIR, base_url: str = PUBLIC_BASE_URL):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+        os.makedirs(self.root, exist_ok=True)
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = os.path.abspath(os.path.join(self.root, key))
+        # Reject keys escaping the storage root (e.g. "../../etc/passwd")
+        if os.path.commonpath([self.root, path]) != self.root:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        path = self.local_path(key)
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return self.url(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.local_path(key)
+        if not path or not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def delete(self, key: str) -> bool:
+        path = self.local_path(key)
+        if not path or not os.path.isfile(path):
+            return False
+        os.remove(path)
+        return True
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}{FILES_ROUTE}/{key}"
+
+    def key_from_url(self, file_url: str) -> Optional[str]:
+        prefix = f"{self.base_url}{FILES_ROUTE}/"
+        if not file_url.startswith(prefix):
+            return None
+        return file_url[len(prefix):].split("?")[0]
+
+
+class MemoryStorage(LocalStorage):
+    """Process-local storage for tests and offline benchmarks"""
+    name = "memory"
+
+    def __init__(self, base_url: str = PUBLIC_BASE_URL):
+        self.base_url = base_url
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            self._files[key] = bytes(data)
+        return self.url(key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._files.get(key)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._files.pop(key, None) is not None
+
+    async def aput(self, key: str, data: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        return self.put(key, data, content_type)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def adelete(self, key: str) -> bool:
+        return self.delete(key)
+
+
+STORAGE_BACKENDS = {
+    "cloudinary": CloudinaryStorage,
+    "local": LocalStorage,
+    "memory": MemoryStorage,
+}
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Get the configured storage backend (created on first use)
+    """
+    global _storage
+    if _storage is None:
+        backend_cls = STORAGE_BACKENDS.get(STORAGE_BACKEND)
+        if backend_cls is None:
+            raise ValueError(
+                f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}'. Use: {', '.join(STORAGE_BACKENDS)}"
+            )
+        _storage = backend_cls()
+    return _storage
+
+
+def guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+async def fetch_file(file_url: str) -> Optional[bytes]:
+    """
+    Read a stored file by URL
+    Files owned by the active backend are read directly, anything else is downloaded
+    """
+    storage = get_storage()
+    key = storage.key_from_url(file_url)
+    if key:
+        return await storage.aget(key)
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(file_url)
+        if response.status_code != 200:
+            return None
+        return response.content
 
 
 async def initialize_storage_buckets():
-    print("✅ Cloudinary is configured and ready")
+    storage = get_storage()
+    print(f"✅ {storage.name.capitalize()} storage is configured and ready")
     return True
 
 
 async def upload_payment_screenshot(file_content: bytes, filename: str) -> Optional[str]:
     try:
         file_ext = os.path.splitext(filename)[1].lower().replace('.', '')
-        unique_id = f"{uuid.uuid4()}"
-        
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            BytesIO(file_content),
-            folder=PAYMENT_FOLDER,
-            public_id=unique_id,
-            resource_type="image",
-            format=file_ext if file_ext in ['jpg', 'jpeg', 'png', 'gif', 'webp'] else 'jpg'
-        )
-        
-        return result.get("secure_url")
-        
+        if file_ext not in IMAGE_FORMATS:
+            file_ext = 'jpg'
+        key = f"{PAYMENT_FOLDER}/{uuid.uuid4()}.{file_ext}"
+
+        return await get_storage().aput(key, file_content, guess_content_type(key))
+
     except Exception as e:
         print(f"❌ Failed to upload payment screenshot: {str(e)}")
         return None
 
 
-async def upload_qr_code(file_path: str, serial_code: str) -> Optional[str]:
+async def upload_qr_code_bytes(file_content: bytes, serial_code: str) -> Optional[str]:
     try:
-        result = cloudinary.uploader.upload(
-            file_path,
-            folder=QR_FOLDER,
-            public_id=serial_code,
-            resource_type="image",
-            format="png"
-        )
-        
-        return result.get("secure_url")
-        
+        # Random key - /files is public and serials are sequential, so a serial-named
+        # QR code would hand anyone a working ticket
+        key = f"{QR_FOLDER}/{uuid.uuid4()}.png"
+        return await get_storage().aput(key, file_content, "image/png")
+
     except Exception as e:
         print(f"❌ Failed to upload QR code: {str(e)}")
         return None
 
 
+async def upload_payment_qr(file_content: bytes, qr_type: str, filename: str) -> Optional[str]:
+    """Upload the admin-provided payment QR (individual or bulk), replacing any previous one"""
+    file_ext = os.path.splitext(filename or "")[1].lower().replace('.', '')
+    if file_ext not in IMAGE_FORMATS:
+        file_ext = 'png'
+    key = f"{PAYMENT_QR_FOLDER}/{qr_type}_qr.{file_ext}"
+    return await get_storage().aput(key, file_content, guess_content_type(key))
+
+
+def _delete_by_url(file_url: str) -> bool:
+    storage = get_storage()
+    key = storage.key_from_url(file_url)
+    if not key:
+        return False
+    return storage.delete(key)
+
+
 def delete_payment_screenshot(file_url: str) -> bool:
     try:
-        parts = file_url.split("/")
-        upload_idx = parts.index("upload")
-        public_id_parts = parts[upload_idx + 2:]
-        public_id = "/".join(public_id_parts).split(".")[0]
-        
-        cloudinary.uploader.destroy(f"{PAYMENT_FOLDER}/{public_id}")
-        
-        return True
-        
+        return _delete_by_url(file_url)
+
     except Exception as e:
         print(f"❌ Failed to delete payment screenshot: {str(e)}")
         return False
@@ -86,15 +340,8 @@ def delete_payment_screenshot(file_url: str) -> bool:
 
 def delete_qr_code(file_url: str) -> bool:
     try:
-        parts = file_url.split("/")
-        upload_idx = parts.index("upload")
-        public_id_parts = parts[upload_idx + 2:]
-        public_id = "/".join(public_id_parts).split(".")[0]
-        
-        cloudinary.uploader.destroy(f"{QR_FOLDER}/{public_id}")
-        
-        return True
-        
+        return _delete_by_url(file_url)
+
     except Exception as e:
         print(f"❌ Failed to delete QR code: {str(e)}")
         return False
@@ -0,0 +1,151 @@
+"""
+Ticket bundle PDFs for team registrations
+All tickets of a registration are rendered into one multi-page PDF (one page per
+ticket) in a worker process, so the approval email carries a single compact
+attachment instead of one PNG per member.
+
+Bundles are cached in memory and in the storage backend, keyed by registration id
+and a digest of the tickets' contents, so re-sends reuse them until a ticket changes.
+A bundle holds every admissible ticket of the team and storage may be publicly
+served (/files), so the digest is an HMAC under BUNDLE_KEY_SECRET - the ticket
+fields it covers are printed on every ticket and would make a plain hash guessable.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from utils.storage import get_storage
+
+load_dotenv()
+
+# 0 renders in a thread of the API process instead of a worker process
+TICKET_BUNDLE_WORKERS = int(os.getenv("TICKET_BUNDLE_WORKERS", "1"))
+TICKET_BUNDLE_CACHE_SIZE = int(os.getenv("TICKET_BUNDLE_CACHE_SIZE", "64"))
+
+BUNDLE_FOLDER = "event-tickets/bundles"
+# Server-side only. Unset: a random secret per process (bundles are not shared
+# between workers or restarts, they are just rendered again)
+BUNDLE_KEY_SECRET = (os.getenv("BUNDLE_KEY_SECRET") or os.urandom(32).hex()).encode()
+# Bilevel pages keep the PDF small; the threshold keeps grey/green text visible
+_BILEVEL_THRESHOLD = 200
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def render_bundle_pdf(tickets: List[Tuple[str, str]], email: str) -> bytes:
+    """
+    Render (serial_code, member_name) tickets into a multi-page PDF
+    Runs inside the worker process - arguments and result must be picklable
+    """
+    from utils.qr_generator import render_ticket_image
+
+    pages = [
+        render_ticket_image(serial_code, member_name, email)
+        .convert("L")
+        .point(lambda v: 255 if v >= _BILEVEL_THRESHOLD else 0, mode="1")
+        for serial_code, member_name in tickets
+    ]
+    buffer = BytesIO()
+    pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:], resolution=150)
+    return buffer.getvalue()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=TICKET_BUNDLE_WORKERS)
+        return _executor
+
+
+def shutdown_bundle_workers():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def bundle_version(tickets) -> str:
+    """Keyed digest of the ticket fields printed in the bundle - changes whenever a ticket does"""
+    from utils.qr_generator import get_qr_profile, qr_payload_expires
+    from utils.ticket_token import TICKET_VALID_UNTIL
+
+    digest = hmac.new(BUNDLE_KEY_SECRET, get_qr_profile()["name"].encode(), hashlib.sha256)
+    # Token expiry is printed in the QR codes - TTL tokens get a fresh bundle every day
+    digest.update(f"|expires:{int(time.time() // 86400) if qr_payload_expires() else TICKET_VALID_UNTIL}".encode())
+    for ticket in sorted(tickets, key=lambda t: t.id):
+        digest.update(f"|{ticket.id}:{ticket.serial_code}:{ticket.member_name}:{ticket.is_active}".encode())
+    return digest.hexdigest()[:32]
+
+
+def _cache_get(key: str) -> Optional[bytes]:
+    with _cache_lock:
+        content = _cache.get(key)
+        if content is not None:
+            _cache.move_to_end(key)
+        return content
+
+
+def _cache_put(key: str, content: bytes):
+    with _cache_lock:
+        _cache[key] = content
+        _cache.move_to_end(key)
+        while len(_cache) > TICKET_BUNDLE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+async def get_ticket_bundle(registration, tickets) -> Optional[Tuple[str, bytes]]:
+    """
+    PDF bundle with every ticket of a registration
+
+    Returns:
+        (filename, pdf bytes) ready to attach, or None if rendering failed
+    """
+    filename = f"tickets-{registration.id}.pdf"
+    key = f"{BUNDLE_FOLDER}/{registration.id}-{bundle_version(tickets)}.pdf"
+
+    content = _cache_get(key)
+    if content is not None:
+        return filename, content
+
+    storage = get_storage()
+    try:
+        content = await storage.aget(key)
+    except Exception as e:
+        print(f"⚠️ Failed to read cached ticket bundle {key}: {str(e)}")
+        content = None
+
+    if content is None:
+        ticket_rows = [(t.serial_code, t.member_name) for t in sorted(tickets, key=lambda t: t.id)]
+        try:
+            if TICKET_BUNDLE_WORKERS > 0:
+                loop = asyncio.get_running_loop()
+                content = await loop.run_in_executor(
+                    _get_executor(), render_bundle_pdf, ticket_rows, registration.email
+                )
+            else:
+                content = await run_in_threadpool(render_bundle_pdf, ticket_rows, registration.email)
+        except Exception as e:
+            print(f"❌ Failed to render ticket bundle for registration {registration.id}: {str(e)}")
+            return None
+
+        try:
+            await storage.aput(key, content, "application/pdf")
+        except Exception as e:
+            print(f"⚠️ Failed to store ticket bundle {key}: {str(e)}")
+
+    _cache_put(key, content)
+    return filename, content
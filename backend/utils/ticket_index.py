@@ -0,0 +1,280 @@
+"""
+Worker-resident ticket state for zero-query verification
+Every worker keeps the verification state of every ticket in memory, keyed by
+serial: the denormalized ticket state, check-in time and the fields the scanner
+displays. /verify-ticket answers from it without touching the database, and
+keeps answering while the database is briefly unreachable.
+
+The index is loaded once at startup and then kept current from a changes cursor:
+every TICKET_INDEX_POLL_SECONDS it re-reads the tickets whose ticket or
+registration row was updated since the last poll (minus an overlap
+window, so rows committed late or stamped by a worker with a slightly skewed
+clock are not missed). A changed ticket count triggers a full reload, which is
+how deleted tickets leave the index. Check-ins made by this worker are applied
+immediately; other workers pick them up on their next poll. Approvals and other
+changes announced on the invalidation bus trigger a poll straight away.
+
+With several workers only one of them (elected with utils.shared_cache.LeaderLock)
+polls the database. It publishes the records as a shared mmap snapshot that the
+other workers read in place, instead of each holding its own copy.
+
+Verification is advisory - check-ins are always decided by the conditional
+UPDATE in routes.ticket, so a stale entry can never admit a ticket twice.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import select, func, union
+from starlette.concurrency import run_in_threadpool
+
+from database import AsyncSessionLocal
+from models.registration import Registration, Ticket, TicketState
+from utils.shared_cache import SharedSnapshot, LeaderLock, SHARED_CACHE_ENABLED, encode_value
+from utils.invalidation import invalidation_bus, Channel
+
+TICKET_INDEX_ENABLED = os.getenv("TICKET_INDEX_ENABLED", "true").lower() == "true"
+TICKET_INDEX_POLL_SECONDS = float(os.getenv("TICKET_INDEX_POLL_SECONDS", "2"))
+TICKET_INDEX_OVERLAP_SECONDS = float(os.getenv("TICKET_INDEX_OVERLAP_SECONDS", "10"))
+TICKET_INDEX_RELOAD_SECONDS = float(os.getenv("TICKET_INDEX_RELOAD_SECONDS", "600"))
+
+# Column order of ticket_state_select() rows and TicketRecord fields
+STATE_COLUMNS = (
+    Ticket.id.label("ticket_id"),
+    Ticket.registration_id,
+    Ticket.serial_code,
+    Ticket.member_name,
+    Ticket.state,
+    Ticket.checked_in_at,
+    Ticket.checked_out_at,
+    Registration.email,
+    Registration.phone,
+    Registration.team_name,
+)
+
+
+def ticket_state_select():
+    """Ticket state and registration contact details - one row per ticket"""
+    return select(*STATE_COLUMNS).join(Registration, Registration.id == Ticket.registration_id)
+
+
+class TicketRecord:
+    """Verification state of one ticket - same fields as a ticket_state_select() row"""
+    __slots__ = tuple(column.key for column in STATE_COLUMNS)
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_shared(cls, values: list) -> "TicketRecord":
+        """Record from its JSON form in the shared snapshot"""
+        record = cls(*values)
+        record.state = TicketState(record.state)
+        if record.checked_in_at is not None:
+            record.checked_in_at = datetime.fromisoformat(record.checked_in_at)
+        if record.checked_out_at is not None:
+            record.checked_out_at = datetime.fromisoformat(record.checked_out_at)
+        return record
+
+
+def changed_ticket_ids(since: datetime):
+    """Tickets whose ticket or registration row changed after `since`"""
+    return union(
+        select(Ticket.id).where(Ticket.updated_at > since),
+        select(Ticket.id)
+        .join(Registration, Registration.id == Ticket.registration_id)
+        .where(Registration.updated_at > since),
+    )
+
+
+# Snapshots written by a build with other record fields are never read
+SNAPSHOT_NAME = "tickets-" + hashlib.sha1(" ".join(TicketRecord.__slots__).encode()).hexdigest()[:8]
+
+
+class TicketIndex:
+    """
+    Serial -> TicketRecord for every ticket
+    One worker (the LeaderLock holder) polls the database and publishes the
+    records as a shared snapshot; the other workers look serials up in the
+    snapshot, plus the tickets they changed themselves since it was written.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, TicketRecord] = {}
+        self._encoded: Dict[str, Tuple[TicketRecord, bytes]] = {}  # Leader: snapshot encoding per record
+        self._local: Dict[str, Tuple[TicketRecord, float]] = {}  # Followers: own writes not yet in the snapshot
+        self._loaded = False
+        self._changed = False
+        self.snapshot = SharedSnapshot(SNAPSHOT_NAME)
+        self.leader = LeaderLock("ticket-index")
+        self.is_leader = False
+        self.watermark: Optional[datetime] = None  # Changes after this are not in the index yet
+        self.synced_at: Optional[float] = None  # monotonic time of the last successful poll
+        self._loaded_at = 0.0
+        self._failing = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded if self.is_leader else self.snapshot.available
+
+    def __len__(self):
+        return len(self._records) if self.is_leader else len(self.snapshot)
+
+    def get(self, serial_code: str) -> Optional[TicketRecord]:
+        if self.is_leader:
+            return self._records.get(serial_code)
+        local = self._local.get(serial_code)
+        if local is not None and time.monotonic() - local[1] < TICKET_INDEX_OVERLAP_SECONDS:
+            return local[0]
+        values = self.snapshot.get(serial_code)
+        return TicketRecord.from_shared(values) if values is not None else None
+
+    def put_rows(self, rows: Iterable):
+        """Insert or replace tickets from ticket_state_select() rows"""
+        now = time.monotonic()
+        for row in rows:
+            record = TicketRecord(*row)
+            if not self.is_leader:
+                self._local[record.serial_code] = (record, now)
+                continue
+            current = self._records.get(record.serial_code)
+            if current is None or current.values() != record.values():
+                self._records[record.serial_code] = record
+                self._changed = True
+
+    async def load(self, db):
+        started = datetime.utcnow()
+        records = {}
+        result = await db.stream(ticket_state_select().execution_options(yield_per=5000))
+        async for rows in result.partitions():
+            for row in rows:
+                records[row.serial_code] = TicketRecord(*row)
+        self._records = records
+        self.watermark = started
+        self._loaded = True
+        self._changed = True
+        self._loaded_at = time.monotonic()
+        print(f"🎟️  Ticket index loaded ({len(records)} tickets)")
+
+    async def sync(self, db):
+        """Apply changes since the last poll, or reload everything if tickets were added / removed"""
+        if not self._loaded or time.monotonic() - self._loaded_at > TICKET_INDEX_RELOAD_SECONDS:
+            await self.load(db)
+            return
+        started = datetime.utcnow()
+        since = self.watermark - timedelta(seconds=TICKET_INDEX_OVERLAP_SECONDS)
+        changed = (await db.execute(
+            ticket_state_select().where(Ticket.id.in_(changed_ticket_ids(since)))
+        )).all()
+        self.put_rows(changed)
+        self.watermark = started
+
+        ticket_count = await db.scalar(select(func.count(Ticket.id)))
+        if ticket_count != len(self._records):
+            await self.load(db)
+
+    async def publish(self):
+        """Write the records to the shared snapshot if they changed since the last one"""
+        if not self._changed:
+            return
+        self._changed = False
+        self._encoded = await run_in_threadpool(
+            self._publish_records, list(self._records.items()), self._encoded
+        )
+
+    def _publish_records(self, records, previous: dict) -> dict:
+        """Encode (reusing the previous encoding of unchanged records) and publish"""
+        encoded = {}
+        for serial_code, record in records:
+            cached = previous.get(serial_code)
+            encoded[serial_code] = cached if cached and cached[0] is record else (record, encode_value(record.values()))
+        self.snapshot.publish_encoded((serial_code.encode(), value) for serial_code, (_, value) in encoded.items())
+        return encoded
+
+    def _drop_expired_local(self):
+        cutoff = time.monotonic() - TICKET_INDEX_OVERLAP_SECONDS
+        for serial_code in [s for s, (_, written) in self._local.items() if written < cutoff]:
+            del self._local[serial_code]
+
+    def request_sync(self, key=None):
+        """Poll now instead of at the next interval - invalidation bus handler, any thread"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wake.wait(), TICKET_INDEX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def run(self):
+        """
+        Poll for changes until cancelled - database errors keep the last state
+        Workers that do not hold the leader lock retry it every poll, so one
+        takes over if the leader exits
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                if not self.is_leader and self.leader.try_acquire():
+                    self.is_leader = True
+                    self._local.clear()
+                    if SHARED_CACHE_ENABLED:
+                        print(f"🎟️  Worker {os.getpid()} now maintains the shared ticket index")
+                try:
+                    if self.is_leader:
+                        async with AsyncSessionLocal() as db:
+                            await self.sync(db)
+                        await self.publish()
+                        self.synced_at = time.monotonic()
+                    else:
+                        self._drop_expired_local()
+                    if self._failing:
+                        print("✅ Ticket index sync recovered")
+                    self._failing = False
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if not self._failing:
+                        print(f"⚠️  Ticket index sync failed, serving last known state: {e}")
+                    self._failing = True
+                await self._wait()
+        finally:
+            self.leader.release()
+            self.is_leader = False
+
+
+ticket_index = TicketIndex()
+
+# Approvals, rejections and registration changes are applied without waiting for the next poll
+invalidation_bus.subscribe(Channel.TICKETS, ticket_index.request_sync)
+invalidation_bus.subscribe(Channel.REGISTRATIONS, ticket_index.request_sync)
+
+
+def lookup_ticket(serial_code: str) -> Optional[TicketRecord]:
+    """Indexed ticket state, or None when the index is off, not loaded yet or lacks the serial"""
+    if not TICKET_INDEX_ENABLED or not ticket_index.loaded:
+        return None
+    return ticket_index.get(serial_code)
+
+
+def reindex_tickets(db, registration_id: int):
+    """
+    Put a registration's committed ticket states into this worker's index (sync Session)
+    Admin approve / reject / deactivate call it so the next scan here sees the change
+    without waiting for the poll or the leader's snapshot, like check-ins do
+    """
+    if TICKET_INDEX_ENABLED:
+        ticket_index.put_rows(db.execute(
+            ticket_state_select().where(Ticket.registration_id == registration_id)
+        ).all())
@@ -0,0 +1,145 @@
+"""
+Signed ticket tokens for QR codes
+A token lets gates accept or reject a ticket offline; check-ins are synced afterwards.
+The scanner app carries the same key and a port of decode_ticket_token
+(ticket_scanner/lib/ticket_token.dart) - keep the two in step. The key ships
+inside every scanner build, so anyone holding the APK can mint tickets: it must
+be dedicated to tickets and never reused for anything else (JWTs in particular).
+
+Layout (big-endian), base32 without padding, prefixed with "TK:":
+    version   1 byte
+    event_id  2 bytes
+    expires   4 bytes   unix seconds
+    serial    n bytes   ASCII ticket serial
+    mac      10 bytes   HMAC-SHA256 of everything above, truncated
+"""
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TICKET_SIGNING_KEY = os.getenv("TICKET_SIGNING_KEY", "").encode()
+# Signed tickets need their own key - a key shared with JWT_SECRET_KEY would let
+# anyone who unpacks the scanner app forge admin tokens
+SIGNED_TICKETS_ENABLED = bool(TICKET_SIGNING_KEY) and TICKET_SIGNING_KEY != os.getenv(
+    "JWT_SECRET_KEY", "your-secret-key-change-in-production"
+).encode()
+TICKET_EVENT_ID = int(os.getenv("TICKET_EVENT_ID", "1"))
+TICKET_TOKEN_TTL_DAYS = int(os.getenv("TICKET_TOKEN_TTL_DAYS", "30"))
+
+
+def _parse_valid_until(value: str) -> Optional[int]:
+    """Unix seconds of an ISO date / datetime (UTC unless it has an offset); a bare date means its end"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if len(value) == 10:
+        moment = moment.replace(hour=23, minute=59, second=59)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+# Event end - tokens stay valid until then however early the ticket was approved.
+# Without it tokens expire TICKET_TOKEN_TTL_DAYS after the QR is generated, and
+# approve / resend re-issue signed QR codes (utils.qr_generator.qr_payload_expires)
+TICKET_VALID_UNTIL = _parse_valid_until(os.getenv("TICKET_VALID_UNTIL", "").strip())
+
+TOKEN_PREFIX = "TK:"
+TOKEN_VERSION = 1
+MAC_SIZE = 10
+_HEADER = struct.Struct(">BHI")
+
+
+class TicketTokenError(ValueError):
+    """Raised when a token is malformed, forged, expired or for another event"""
+
+
+@dataclass(frozen=True)
+class TicketToken:
+    serial_code: str
+    event_id: int
+    expires_at: int
+
+
+def _require_key(key: bytes):
+    if not key or (key == TICKET_SIGNING_KEY and not SIGNED_TICKETS_ENABLED):
+        raise TicketTokenError("Signed tickets are not enabled")
+
+
+def _mac(data: bytes, key: bytes) -> bytes:
+    return hmac.new(key, data, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def token_expires_at(now: Optional[int] = None) -> int:
+    """Expiry for a token issued now"""
+    if TICKET_VALID_UNTIL is not None:
+        return TICKET_VALID_UNTIL
+    return (now if now is not None else int(time.time())) + TICKET_TOKEN_TTL_DAYS * 86400
+
+
+def is_ticket_token(value: str) -> bool:
+    return value.strip().upper().startswith(TOKEN_PREFIX)
+
+
+def encode_ticket_token(
+    serial_code: str,
+    expires_at: Optional[int] = None,
+    event_id: int = TICKET_EVENT_ID,
+    key: bytes = TICKET_SIGNING_KEY
+) -> str:
+    _require_key(key)
+    if expires_at is None:
+        expires_at = token_expires_at()
+    body = _HEADER.pack(TOKEN_VERSION, event_id, expires_at) + serial_code.encode("ascii")
+    encoded = base64.b32encode(body + _mac(body, key)).decode("ascii").rstrip("=")
+    return f"{TOKEN_PREFIX}{encoded}"
+
+
+def decode_ticket_token(
+    token: str,
+    event_id: int = TICKET_EVENT_ID,
+    key: bytes = TICKET_SIGNING_KEY,
+    now: Optional[int] = None
+) -> TicketToken:
+    """
+    Verify a token and return its contents
+    Raises TicketTokenError with a user-facing reason on any failure
+    """
+    token = token.strip().upper()
+    if not token.startswith(TOKEN_PREFIX):
+        raise TicketTokenError("Not a ticket token")
+    _require_key(key)
+    encoded = token[len(TOKEN_PREFIX):]
+    try:
+        raw = base64.b32decode(encoded + "=" * (-len(encoded) % 8))
+    except ValueError:
+        raise TicketTokenError("Malformed ticket token")
+    if len(raw) <= _HEADER.size + MAC_SIZE:
+        raise TicketTokenError("Malformed ticket token")
+
+    body, mac = raw[:-MAC_SIZE], raw[-MAC_SIZE:]
+    if not hmac.compare_digest(mac, _mac(body, key)):
+        raise TicketTokenError("Ticket signature is invalid")
+
+    version, token_event, expires_at = _HEADER.unpack_from(body)
+    if version != TOKEN_VERSION:
+        raise TicketTokenError("Unsupported ticket token version")
+    if token_event != event_id:
+        raise TicketTokenError("Ticket is for a different event")
+    if expires_at < (now if now is not None else int(time.time())):
+        raise TicketTokenError("Ticket has expired")
+
+    return TicketToken(
+        serial_code=body[_HEADER.size:].decode("ascii"),
+        event_id=token_event,
+        expires_at=expires_at
+    )
@@ -0,0 +1,64 @@
+import 'dart:convert';
+
+import 'package:flutter_secure_storage/flutter_secure_storage.dart';
+import 'package:http/http.dart' as http;
+
+import 'scanner_identity.dart';
+
+/// Check-ins accepted offline, synced to the backend afterwards.
+/// Pending serials survive app restarts (stored in secure storage).
+class CheckinQueue {
+  static const String _storageKey = 'pending_checkins';
+
+  final FlutterSecureStorage storage;
+  final Set<String> _seen = {};
+  final List<String> _pending = [];
+  bool _syncing = false;
+
+  CheckinQueue(this.storage);
+
+  int get pendingCount => _pending.length;
+
+  Future<void> load() async {
+    final saved = await storage.read(key: _storageKey);
+    if (saved != null) {
+      _pending.addAll(List<String>.from(json.decode(saved)));
+      _seen.addAll(_pending);
+    }
+  }
+
+  /// Returns false if this device already admitted the ticket.
+  Future<bool> enqueue(String serialCode) async {
+    if (!_seen.add(serialCode)) return false;
+    _pending.add(serialCode);
+    await _save();
+    return true;
+  }
+
+  /// Posts pending check-ins; network errors and 5xx responses are retried later.
+  Future<void> sync(String apiBaseUrl) async {
+    if (_syncing || _pending.isEmpty) return;
+    _syncing = true;
+    try {
+      for (final serialCode in List<String>.from(_pending)) {
+        try {
+          final response = await http.post(
+            Uri.parse('$apiBaseUrl/mark-used/$serialCode'),
+            headers: ScannerIdentity.headers(),
+          );
+          if (response.statusCode >= 500) break;
+          // 2xx, or a 4xx the server will keep rejecting (already checked in, ...)
+          _pending.remove(serialCode);
+        } catch (e) {
+          break;
+        }
+      }
+      await _save();
+    } finally {
+      _syncing = false;
+    }
+  }
+
+  Future<void> _save() =>
+      storage.write(key: _storageKey, value: json.encode(_pending));
+}
@@ -0,0 +1,192 @@
+import 'package:flutter/material.dart';
+import 'package:http/http.dart' as http;
+import 'dart:convert';
+import 'scanner_identity.dart';
+
+/// Every ticket of a team, checked in together from one scan
+class GroupCheckinScreen extends StatefulWidget {
+  final String serialCode;
+  final String apiBaseUrl;
+
+  const GroupCheckinScreen({
+    super.key,
+    required this.serialCode,
+    required this.apiBaseUrl,
+  });
+
+  @override
+  State<GroupCheckinScreen> createState() => _GroupCheckinScreenState();
+}
+
+class _GroupCheckinScreenState extends State<GroupCheckinScreen> {
+  Map<String, dynamic>? group;
+  final Set<String> selected = {};
+  bool isLoading = true;
+  bool isSubmitting = false;
+
+  @override
+  void initState() {
+    super.initState();
+    _loadGroup();
+  }
+
+  List<dynamic> get tickets => group?['tickets'] ?? [];
+
+  void _showGroup(Map<String, dynamic> data) {
+    group = data;
+    selected
+      ..clear()
+      ..addAll(
+        tickets
+            .where((t) => t['can_check_in'] == true)
+            .map((t) => t['serial_code'] as String),
+      );
+  }
+
+  Future<void> _loadGroup() async {
+    try {
+      final response = await http.get(
+        Uri.parse('${widget.apiBaseUrl}/scan/${widget.serialCode}/group'),
+        headers: ScannerIdentity.headers(),
+      );
+      if (!mounted) return;
+
+      final data = json.decode(response.body);
+      if (response.statusCode == 200) {
+        setState(() {
+          _showGroup(data);
+          isLoading = false;
+        });
+      } else {
+        setState(() {
+          isLoading = false;
+        });
+        _showMessage(data['detail'] ?? 'Failed to load team tickets', false);
+      }
+    } catch (e) {
+      if (!mounted) return;
+      setState(() {
+        isLoading = false;
+      });
+      _showMessage('Error connecting to server: $e', false);
+    }
+  }
+
+  Future<void> _checkInSelected() async {
+    setState(() {
+      isSubmitting = true;
+    });
+
+    try {
+      // One request for the whole subset - applied as a single update
+      final response = await http.post(
+        Uri.parse(
+          '${widget.apiBaseUrl}/scan/${widget.serialCode}/group/checkin',
+        ),
+        headers: ScannerIdentity.headers({'Content-Type': 'application/json'}),
+        body: json.encode({'serial_codes': selected.toList()}),
+      );
+      if (!mounted) return;
+
+      final data = json.decode(response.body);
+      if (response.statusCode == 200) {
+        setState(() {
+          _showGroup(data);
+        });
+        _showMessage(data['message'] ?? 'Team checked in', true);
+      } else {
+        _showMessage(data['detail'] ?? 'Failed to check in team', false);
+      }
+    } catch (e) {
+      if (mounted) _showMessage('Error connecting to server: $e', false);
+    } finally {
+      if (mounted) {
+        setState(() {
+          isSubmitting = false;
+        });
+      }
+    }
+  }
+
+  void _showMessage(String message, bool success) {
+    ScaffoldMessenger.of(context).showSnackBar(
+      SnackBar(
+        content: Text(success ? '✅ $message' : message),
+        backgroundColor: success ? Colors.green : Colors.red,
+        duration: const Duration(seconds: 2),
+      ),
+    );
+  }
+
+  @override
+  Widget build(BuildContext context) {
+    return Scaffold(
+      appBar: AppBar(
+        title: Text(group?['team_name'] ?? 'Team Check-in'),
+        backgroundColor: Theme.of(context).colorScheme.inversePrimary,
+      ),
+      body: isLoading
+          ? const Center(child: CircularProgressIndicator())
+          : Column(
+              children: [
+                Expanded(
+                  child: ListView(
+                    children: [
+                      for (final ticket in tickets)
+                        CheckboxListTile(
+                          value: selected.contains(ticket['serial_code']),
+                          onChanged: ticket['can_check_in'] == true
+                              ? (checked) {
+                                  setState(() {
+                                    if (checked == true) {
+                                      selected.add(ticket['serial_code']);
+                                    } else {
+                                      selected.remove(ticket['serial_code']);
+                                    }
+                                  });
+                                }
+                              : null,
+                          title: Text(ticket['member_name'] ?? 'N/A'),
+                          subtitle: Text(
+                            '${ticket['serial_code']}\n${ticket['message']}',
+                          ),
+                          isThreeLine: true,
+                          secondary: Icon(
+                            ticket['checked_in'] == true
+                                ? Icons.cancel
+                                : ticket['can_check_in'] == true
+                                    ? Icons.check_circle
+                                    : Icons.block,
+                            color: ticket['can_check_in'] == true
+                                ? Colors.green
+                                : Colors.red,
+                          ),
+                        ),
+                    ],
+                  ),
+                ),
+                Padding(
+                  padding: const EdgeInsets.all(16),
+                  child: SizedBox(
+                    width: double.infinity,
+                    child: ElevatedButton(
+                      onPressed: selected.isEmpty || isSubmitting
+                          ? null
+                          : _checkInSelected,
+                      style: ElevatedButton.styleFrom(
+                        backgroundColor: Colors.green,
+                        foregroundColor: Colors.white,
+                        padding: const EdgeInsets.symmetric(vertical: 16),
+                      ),
+                      child: Text(
+                        'Check In ${selected.length} Selected',
+                        style: const TextStyle(fontSize: 18),
+                      ),
+                    ),
+                  ),
+                ),
+              ],
+            ),
+    );
+  }
+}
@@ -1,8 +1,15 @@
 import 'package:flutter/material.dart';
 import 'package:mobile_scanner/mobile_scanner.dart';
 import 'package:http/http.dart' as http;
+import 'dart:async';
 import 'dart:convert';
 import 'package:flutter_secure_storage/flutter_secure_storage.dart';
+import 'serial_check.dart';
+import 'ticket_token.dart';
+import 'checkin_queue.dart';
+import 'group_checkin.dart';
+import 'scanner_identity.dart';
+import 'scanner_socket.dart';
 
 void main() {
   runApp(const TicketVerifierApp());
@@ -246,13 +253,32 @@ class _ScannerScreenState extends State<ScannerScreen> {
   final MobileScannerController controller = MobileScannerController();
   final TextEditingController manualSerialController = TextEditingController();
   final storage = const FlutterSecureStorage();
+  late final CheckinQueue checkinQueue = CheckinQueue(storage);
+  Timer? _syncTimer;
   bool isProcessing = false;
+  // Check valid tickets in straight from the scan, without the details screen
+  bool autoCheckin = false;
   String? adminEmail;
 
   @override
   void initState() {
     super.initState();
     _loadAdminInfo();
+    _startCheckinSync();
+  }
+
+  Future<void> _startCheckinSync() async {
+    await ScannerIdentity.load(storage);
+    final token = await storage.read(key: 'admin_token');
+    if (token != null) {
+      // Scans go over one persistent connection once it is up
+      ScannerSocket.shared.connect(widget.apiBaseUrl, token);
+    }
+    await checkinQueue.load();
+    checkinQueue.sync(widget.apiBaseUrl);
+    _syncTimer = Timer.periodic(const Duration(seconds: 15), (_) {
+      checkinQueue.sync(widget.apiBaseUrl);
+    });
   }
 
   Future<void> _loadAdminInfo() async {
@@ -261,6 +287,7 @@ class _ScannerScreenState extends State<ScannerScreen> {
   }
 
   Future<void> _logout() async {
+    ScannerSocket.shared.close();
     await storage.delete(key: 'admin_token');
     await storage.delete(key: 'admin_email');
     if (mounted) {
@@ -273,6 +300,8 @@ class _ScannerScreenState extends State<ScannerScreen> {
 
   @override
   void dispose() {
+    ScannerSocket.shared.close();
+    _syncTimer?.cancel();
     controller.dispose();
     manualSerialController.dispose();
     super.dispose();
@@ -281,22 +310,62 @@ class _ScannerScreenState extends State<ScannerScreen> {
   Future<void> verifyTicket(String serialCode) async {
     if (isProcessing) return;
 
+    // Reject mistyped or forged codes before making a network call
+    if (!TicketToken.isToken(serialCode) && !SerialCheck.isValid(serialCode)) {
+      _showErrorDialog('Invalid serial code. Please check and try again.');
+      return;
+    }
+
     setState(() {
       isProcessing = true;
     });
+    // Device-side scan time, reported to the gate dashboard with the next request
+    final stopwatch = Stopwatch()..start();
 
     try {
-      final response = await http.get(
-        Uri.parse('${widget.apiBaseUrl}/verify-ticket/$serialCode'),
-      );
+      // One round trip: verify, and with auto check-in also admit the ticket
+      // (over the scanner socket when connected, else a plain request)
+      final ScanReply response;
+      if (ScannerSocket.shared.isReady) {
+        response = await ScannerSocket.shared.request('scan', serialCode, {
+          'auto_checkin': autoCheckin,
+        });
+      } else {
+        response = ScanReply.fromHttp(await http.post(
+          Uri.parse(
+            '${widget.apiBaseUrl}/scan/$serialCode?auto_checkin=$autoCheckin',
+          ),
+          headers: ScannerIdentity.headers(),
+        ));
+      }
 
       if (!mounted) return;
+      ScannerIdentity.lastScanMs = stopwatch.elapsedMilliseconds;
 
       if (response.statusCode == 200) {
-        final data = json.decode(response.body);
+        final data = response.body;
+
+        if (data['checked_in_now'] == true) {
+          ScaffoldMessenger.of(context).showSnackBar(
+            SnackBar(
+              content: Text('✅ ${data['message']}'),
+              backgroundColor: Colors.green,
+              duration: const Duration(seconds: 2),
+            ),
+          );
+          setState(() {
+            isProcessing = false;
+          });
+          return;
+        }
 
-        // Check if ticket is valid
-        if (data['valid'] != true) {
+        // Check if ticket is valid - checked-in tickets still open their
+        // details, where the holder can be checked out
+        final details = data['details'];
+        final canCheckOut = details != null &&
+            details['checked_in'] == true &&
+            details['checked_out'] != true;
+        if (data['valid'] != true && !canCheckOut) {
           _showErrorDialog(data['message'] ?? 'Ticket verification failed');
           setState(() {
             isProcessing = false;
@@ -319,8 +388,9 @@ class _ScannerScreenState extends State<ScannerScreen> {
           });
         });
       } else {
-        final error = json.decode(response.body);
-        _showErrorDialog(error['detail'] ?? 'Ticket verification failed');
+        _showErrorDialog(
+          response.body['detail'] ?? 'Ticket verification failed',
+        );
         setState(() {
           isProcessing = false;
         });
@@ -333,6 +403,57 @@ class _ScannerScreenState extends State<ScannerScreen> {
     }
   }
 
+  /// Accept a signed QR token offline and queue its check-in for syncing
+  Future<void> admitToken(String token) async {
+    if (isProcessing) return;
+    if (!TicketToken.canVerifyOffline) {
+      verifyTicket(token);
+      return;
+    }
+
+    setState(() {
+      isProcessing = true;
+    });
+
+    try {
+      final ticket = TicketToken.verify(token);
+      // Pushed by the server - a ticket deactivated, rejected or admitted at
+      // another gate is refused even though its token is valid
+      final knownState = ScannerSocket.shared.ticketStates[ticket.serialCode];
+      if (knownState != null && knownState != 'valid') {
+        _showErrorDialog(
+          'Ticket ${ticket.serialCode} cannot be admitted (${knownState.replaceAll('_', ' ')}).',
+        );
+        return;
+      }
+      final admitted = await checkinQueue.enqueue(ticket.serialCode);
+      if (!mounted) return;
+
+      if (!admitted) {
+        _showErrorDialog(
+          'Ticket ${ticket.serialCode} was already admitted at this gate.',
+        );
+      } else {
+        ScaffoldMessenger.of(context).showSnackBar(
+          SnackBar(
+            content: Text('✅ ${ticket.serialCode} admitted'),
+            backgroundColor: Colors.green,
+            duration: const Duration(seconds: 2),
+          ),
+        );
+        checkinQueue.sync(widget.apiBaseUrl);
+      }
+    } on TicketTokenException catch (e) {
+      if (mounted) _showErrorDialog(e.message);
+    } finally {
+      if (mounted) {
+        setState(() {
+          isProcessing = false;
+        });
+      }
+    }
+  }
+
   void _showErrorDialog(String message) {
     showDialog(
       context: context,
@@ -400,6 +521,15 @@ class _ScannerScreenState extends State<ScannerScreen> {
         ),
         backgroundColor: Theme.of(context).colorScheme.inversePrimary,
         actions: [
+          IconButton(
+            icon: Icon(autoCheckin ? Icons.done_all : Icons.done),
+            tooltip: autoCheckin ? 'Auto check-in on' : 'Auto check-in off',
+            onPressed: () {
+              setState(() {
+                autoCheckin = !autoCheckin;
+              });
+            },
+          ),
           IconButton(
             icon: const Icon(Icons.logout),
             onPressed: () {
@@ -469,6 +599,12 @@ class _ScannerScreenState extends State<ScannerScreen> {
                           if (barcode.rawValue != null && !isProcessing) {
                             String serialCode = barcode.rawValue!;
 
+                            // Signed tokens are validated on the device
+                            if (TicketToken.isToken(serialCode)) {
+                              admitToken(serialCode);
+                              break;
+                            }
+
                             // Check if QR code contains JSON
                             try {
                               final qrData = json.decode(serialCode);
@@ -545,9 +681,12 @@ class DetailsScreen extends StatelessWidget {
 
   Future<void> markAsUsed(BuildContext context) async {
     try {
-      final response = await http.post(
-        Uri.parse('$apiBaseUrl/mark-used/$serialCode'),
-      );
+      final response = ScannerSocket.shared.isReady
+          ? await ScannerSocket.shared.request('checkin', serialCode)
+          : ScanReply.fromHttp(await http.post(
+              Uri.parse('$apiBaseUrl/mark-used/$serialCode'),
+              headers: ScannerIdentity.headers(),
+            ));
 
       if (!context.mounted) return;
 
@@ -569,10 +708,41 @@ class DetailsScreen extends StatelessWidget {
           ),
         );
       } else {
-        final error = json.decode(response.body);
         _showErrorDialog(
           context,
-          error['detail'] ?? 'Failed to mark ticket as used',
+          response.body['detail'] ?? 'Failed to mark ticket as used',
+        );
+      }
+    } catch (e) {
+      _showErrorDialog(context, 'Error connecting to server: $e');
+    }
+  }
+
+  Future<void> checkOut(BuildContext context) async {
+    try {
+      final response = ScannerSocket.shared.isReady
+          ? await ScannerSocket.shared.request('checkout', serialCode)
+          : ScanReply.fromHttp(await http.post(
+              Uri.parse('$apiBaseUrl/scan/$serialCode/checkout'),
+              headers: ScannerIdentity.headers(),
+            ));
+
+      if (!context.mounted) return;
+
+      final data = response.body;
+      if (response.statusCode == 200 && data['checked_out_now'] == true) {
+        ScaffoldMessenger.of(context).showSnackBar(
+          SnackBar(
+            content: Text('👋 ${data['message']}'),
+            backgroundColor: Colors.blueGrey,
+            duration: const Duration(seconds: 2),
+          ),
+        );
+        Navigator.pop(context); // Go back to scanner
+      } else {
+        _showErrorDialog(
+          context,
+          data['message'] ?? data['detail'] ?? 'Failed to check out ticket',
         );
       }
     } catch (e) {
@@ -599,6 +769,7 @@ class DetailsScreen extends StatelessWidget {
   @override
   Widget build(BuildContext context) {
     final bool isCheckedIn = ticketData['checked_in'] ?? false;
+    final bool isCheckedOut = ticketData['checked_out'] ?? false;
 
     return Scaffold(
       appBar: AppBar(
@@ -626,7 +797,11 @@ class DetailsScreen extends StatelessWidget {
                         const SizedBox(width: 10),
                         Expanded(
                           child: Text(
-                            isCheckedIn ? 'ALREADY CHECKED IN' : 'VALID TICKET',
+                            isCheckedOut
+                                ? 'CHECKED OUT'
+                                : isCheckedIn
+                                    ? 'ALREADY CHECKED IN'
+                                    : 'VALID TICKET',
                             style: TextStyle(
                               fontSize: 24,
                               fontWeight: FontWeight.bold,
@@ -653,6 +828,11 @@ class DetailsScreen extends StatelessWidget {
                         'Checked In At',
                         ticketData['check_in_time'] ?? 'N/A',
                       ),
+                    if (isCheckedOut)
+                      _buildDetailRow(
+                        'Checked Out At',
+                        ticketData['check_out_time'] ?? 'N/A',
+                      ),
                   ],
                 ),
               ),
@@ -671,6 +851,48 @@ class DetailsScreen extends StatelessWidget {
                   child: const Text('Check In', style: TextStyle(fontSize: 18)),
                 ),
               ),
+            if (isCheckedIn && !isCheckedOut)
+              SizedBox(
+                width: double.infinity,
+                child: ElevatedButton.icon(
+                  onPressed: () => checkOut(context),
+                  icon: const Icon(Icons.logout),
+                  label: const Text(
+                    'Check Out',
+                    style: TextStyle(fontSize: 18),
+                  ),
+                  style: ElevatedButton.styleFrom(
+                    backgroundColor: Colors.blueGrey,
+                    foregroundColor: Colors.white,
+                    padding: const EdgeInsets.symmetric(vertical: 16),
+                  ),
+                ),
+              ),
+            if (ticketData['team_name'] != null) ...[
+              const SizedBox(height: 10),
+              SizedBox(
+                width: double.infinity,
+                child: ElevatedButton.icon(
+                  onPressed: () => Navigator.pushReplacement(
+                    context,
+                    MaterialPageRoute(
+                      builder: (context) => GroupCheckinScreen(
+                        serialCode: serialCode,
+                        apiBaseUrl: apiBaseUrl,
+                      ),
+                    ),
+                  ),
+                  icon: const Icon(Icons.groups),
+                  label: const Text(
+                    'Check In Team',
+                    style: TextStyle(fontSize: 18),
+                  ),
+                  style: ElevatedButton.styleFrom(
+                    padding: const EdgeInsets.symmetric(vertical: 16),
+                  ),
+                ),
+              ),
+            ],
             const SizedBox(height: 10),
             SizedBox(
               width: double.infinity,
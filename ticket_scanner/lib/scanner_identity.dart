@@ -0,0 +1,48 @@
+import 'dart:math';
+
+import 'package:flutter_secure_storage/flutter_secure_storage.dart';
+
+/// Gate / device headers sent with every scan request, for per-gate
+/// throughput and latency on the backend's live gate dashboard.
+class ScannerIdentity {
+  static const String _storageKey = 'scanner_device_id';
+
+  /// Gate this build is posted at (--dart-define=SCANNER_GATE=north)
+  static const String gate = String.fromEnvironment('SCANNER_GATE');
+
+  static String? deviceId;
+
+  /// How long the previous scan took on this device (QR detected -> result
+  /// shown), reported with the next request
+  static int? lastScanMs;
+
+  /// Random device id, generated once and kept in secure storage
+  static Future<void> load(FlutterSecureStorage storage) async {
+    deviceId = await storage.read(key: _storageKey);
+    if (deviceId == null) {
+      final random = Random.secure();
+      deviceId = List.generate(
+        8,
+        (_) => random.nextInt(256).toRadixString(16).padLeft(2, '0'),
+      ).join();
+      await storage.write(key: _storageKey, value: deviceId);
+    }
+  }
+
+  /// Reported once - the next request after a scan carries it
+  static int? takeLastScanMs() {
+    final latency = lastScanMs;
+    lastScanMs = null;
+    return latency;
+  }
+
+  static Map<String, String> headers([Map<String, String>? extra]) {
+    final latency = takeLastScanMs();
+    return {
+      if (gate.isNotEmpty) 'X-Scanner-Gate': gate,
+      if (deviceId != null) 'X-Scanner-Device': deviceId!,
+      if (latency != null) 'X-Scan-Latency-Ms': '$latency',
+      ...?extra,
+    };
+  }
+}
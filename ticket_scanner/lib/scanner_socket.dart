@@ -0,0 +1,148 @@
+import 'dart:async';
+import 'dart:convert';
+
+import 'package:http/http.dart' as http;
+import 'package:web_socket_channel/web_socket_channel.dart';
+
+import 'scanner_identity.dart';
+
+/// Reply to a scan request - same status code and body as the HTTP endpoint.
+class ScanReply {
+  final int statusCode;
+  final Map<String, dynamic> body;
+
+  ScanReply(this.statusCode, this.body);
+
+  factory ScanReply.fromHttp(http.Response response) => ScanReply(
+        response.statusCode,
+        Map<String, dynamic>.from(json.decode(response.body)),
+      );
+}
+
+/// Persistent connection to the backend's /ws/scanner channel.
+/// Authenticates once with the admin token, then sends each scan as a small
+/// frame instead of a new HTTPS request. Ticket states pushed by the server
+/// (approvals, deactivations, check-ins at other gates) are kept in
+/// [ticketStates]. Reconnects on its own; callers fall back to HTTP while
+/// [isReady] is false.
+class ScannerSocket {
+  static final ScannerSocket shared = ScannerSocket();
+
+  static const Duration requestTimeout = Duration(seconds: 10);
+  static const Duration reconnectDelay = Duration(seconds: 3);
+  static const int closeUnauthorized = 4401;
+
+  /// Serial code -> ticket state ('valid', 'checked_in', 'deactivated', ...)
+  final Map<String, String> ticketStates = {};
+
+  final Map<int, Completer<ScanReply>> _waiting = {};
+  WebSocketChannel? _channel;
+  Timer? _reconnectTimer;
+  String? _apiBaseUrl;
+  String? _token;
+  bool _ready = false;
+  bool _closed = true;
+  int _nextId = 0;
+
+  bool get isReady => _ready;
+
+  void connect(String apiBaseUrl, String token) {
+    _apiBaseUrl = apiBaseUrl;
+    _token = token;
+    _closed = false;
+    _open();
+  }
+
+  void close() {
+    _closed = true;
+    _reconnectTimer?.cancel();
+    _channel?.sink.close();
+  }
+
+  void _open() {
+    final base = Uri.parse(_apiBaseUrl!);
+    final uri = base.replace(
+      scheme: base.scheme == 'https' ? 'wss' : 'ws',
+      path: '/ws/scanner',
+    );
+    final channel = WebSocketChannel.connect(uri);
+    _channel = channel;
+    channel.sink.add(json.encode({
+      'type': 'auth',
+      'token': _token,
+      'gate': ScannerIdentity.gate,
+      'device': ScannerIdentity.deviceId,
+    }));
+    channel.stream.listen(
+      _onFrame,
+      onDone: () => _onClosed(channel),
+      onError: (_) => _onClosed(channel),
+      cancelOnError: true,
+    );
+  }
+
+  void _onFrame(dynamic frame) {
+    final message = Map<String, dynamic>.from(json.decode(frame as String));
+    switch (message['type']) {
+      case 'ready':
+        _ready = true;
+      case 'result':
+        _waiting.remove(message['id'])?.complete(
+              ScanReply(
+                message['status'] as int,
+                Map<String, dynamic>.from(message['body']),
+              ),
+            );
+      case 'tickets':
+        for (final ticket in message['tickets'] as List<dynamic>) {
+          ticketStates[ticket['serial_code'] as String] =
+              ticket['state'] as String;
+        }
+      case 'resync':
+        // The server may have missed changes - forget everything cached
+        ticketStates.clear();
+    }
+  }
+
+  void _onClosed(WebSocketChannel channel) {
+    if (_channel != channel) return;
+    _ready = false;
+    _channel = null;
+    for (final waiting in _waiting.values) {
+      waiting.completeError(StateError('Scanner connection closed'));
+    }
+    _waiting.clear();
+    // A rejected token needs a new login, not a retry
+    if (_closed || channel.closeCode == closeUnauthorized) return;
+    _reconnectTimer = Timer(reconnectDelay, _open);
+  }
+
+  /// Send a verify / scan / checkin / checkout request over the socket
+  Future<ScanReply> request(
+    String type,
+    String serialCode, [
+    Map<String, dynamic> fields = const {},
+  ]) {
+    final channel = _channel;
+    if (!_ready || channel == null) {
+      return Future.error(StateError('Scanner connection not ready'));
+    }
+    final id = _nextId++;
+    final completer = Completer<ScanReply>();
+    _waiting[id] = completer;
+    channel.sink.add(json.encode({
+      'type': type,
+      'id': id,
+      'serial': serialCode,
+      'latency_ms': ScannerIdentity.takeLastScanMs(),
+      ...fields,
+    }));
+    return completer.future.timeout(
+      requestTimeout,
+      onTimeout: () {
+        _waiting.remove(id);
+        throw TimeoutException('No reply from server', requestTimeout);
+      },
+    );
+  }
+}
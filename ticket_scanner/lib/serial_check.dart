@@ -0,0 +1,35 @@
+/// Offline ticket serial validation (mirrors backend/utils/serials.py).
+///
+/// Current serials end in a Luhn mod 36 check character:
+///   EVT26-000123-K, TEAM000045-A-K
+/// Legacy serials (EVT25-000123, TEAM045-A) only have to match their format.
+class SerialCheck {
+  static const String _alphabet = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ';
+
+  static final RegExp _serialPattern =
+      RegExp(r'^(EVT\d{2}-\d{6,}|TEAM\d{6,}-[A-Z])-[0-9A-Z]$');
+  static final RegExp _legacyPattern =
+      RegExp(r'^(EVT\d{2}-[0-9A-Z]+|TEAM\d{3,}-[A-Z])$');
+
+  static String checkChar(String body) {
+    final n = _alphabet.length;
+    var factor = 2;
+    var total = 0;
+    final chars = body.replaceAll('-', '').split('').reversed;
+    for (final char in chars) {
+      final addend = factor * _alphabet.indexOf(char);
+      factor = factor == 2 ? 1 : 2;
+      total += addend ~/ n + addend % n;
+    }
+    return _alphabet[(n - total % n) % n];
+  }
+
+  static bool isValid(String serial) {
+    final code = serial.trim().toUpperCase();
+    if (_serialPattern.hasMatch(code)) {
+      final split = code.lastIndexOf('-');
+      return checkChar(code.substring(0, split)) == code.substring(split + 1);
+    }
+    return _legacyPattern.hasMatch(code);
+  }
+}
@@ -0,0 +1,106 @@
+import 'dart:convert';
+import 'dart:typed_data';
+
+import 'package:crypto/crypto.dart';
+
+/// Offline verification of signed QR ticket tokens.
+/// Port of backend/utils/ticket_token.py - keep the two in step.
+///
+/// Layout (big-endian), base32 without padding, prefixed with "TK:":
+///   version 1 byte | event_id 2 bytes | expires 4 bytes (unix seconds)
+///   | serial n bytes (ASCII) | mac 10 bytes (truncated HMAC-SHA256)
+class TicketToken {
+  static const String prefix = 'TK:';
+  static const int version = 1;
+  static const int macSize = 10;
+  static const int _headerSize = 7;
+  static const String _base32Alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567';
+
+  // Provisioned at build time: --dart-define=TICKET_SIGNING_KEY=... --dart-define=TICKET_EVENT_ID=1
+  // The key can be extracted from the APK - it is a dedicated ticket key, never JWT_SECRET_KEY.
+  static const String signingKey = String.fromEnvironment('TICKET_SIGNING_KEY');
+  static const int eventId = int.fromEnvironment('TICKET_EVENT_ID', defaultValue: 1);
+
+  final String serialCode;
+  final int expiresAt;
+
+  const TicketToken(this.serialCode, this.expiresAt);
+
+  static bool isToken(String value) =>
+      value.trim().toUpperCase().startsWith(prefix);
+
+  /// Offline verification is only possible when the app was built with a key.
+  static bool get canVerifyOffline => signingKey.isNotEmpty;
+
+  /// Returns the verified token, throws [TicketTokenException] otherwise.
+  static TicketToken verify(
+    String token, {
+    String key = signingKey,
+    int event = eventId,
+    DateTime? now,
+  }) {
+    final value = token.trim().toUpperCase();
+    if (!value.startsWith(prefix)) {
+      throw const TicketTokenException('Not a ticket token');
+    }
+    final raw = _base32Decode(value.substring(prefix.length));
+    if (raw == null || raw.length <= _headerSize + macSize) {
+      throw const TicketTokenException('Malformed ticket token');
+    }
+
+    final body = raw.sublist(0, raw.length - macSize);
+    final mac = raw.sublist(raw.length - macSize);
+    final expected = Hmac(sha256, utf8.encode(key))
+        .convert(body)
+        .bytes
+        .sublist(0, macSize);
+    var diff = 0;
+    for (var i = 0; i < macSize; i++) {
+      diff |= mac[i] ^ expected[i];
+    }
+    if (diff != 0) {
+      throw const TicketTokenException('Ticket signature is invalid');
+    }
+
+    final header = ByteData.sublistView(body, 0, _headerSize);
+    if (header.getUint8(0) != version) {
+      throw const TicketTokenException('Unsupported ticket token version');
+    }
+    if (header.getUint16(1) != event) {
+      throw const TicketTokenException('Ticket is for a different event');
+    }
+    final expiresAt = header.getUint32(3);
+    final nowSeconds =
+        (now ?? DateTime.now()).millisecondsSinceEpoch ~/ 1000;
+    if (expiresAt < nowSeconds) {
+      throw const TicketTokenException('Ticket has expired');
+    }
+
+    return TicketToken(ascii.decode(body.sublist(_headerSize)), expiresAt);
+  }
+
+  static Uint8List? _base32Decode(String input) {
+    final out = <int>[];
+    var buffer = 0;
+    var bits = 0;
+    for (final char in input.split('')) {
+      final value = _base32Alphabet.indexOf(char);
+      if (value < 0) return null;
+      buffer = ((buffer << 5) | value) & 0xFFFF;
+      bits += 5;
+      if (bits >= 8) {
+        bits -= 8;
+        out.add((buffer >> bits) & 0xFF);
+      }
+    }
+    return Uint8List.fromList(out);
+  }
+}
+
+class TicketTokenException implements Exception {
+  final String message;
+  const TicketTokenException(this.message);
+
+  @override
+  String toString() => message;
+}
@@ -0,0 +1,34 @@
+import 'package:flutter_test/flutter_test.dart';
+
+import 'package:ticket_scanner/serial_check.dart';
+import 'package:ticket_scanner/ticket_token.dart';
+
+// Vectors produced by backend/utils/ticket_token.py with key 'test-key'
+const token = 'TK:AEAAC5ZVSQAFIRKBJUYDAMBQGQ2S2QJNK5AYA7WPBPYRB42IVY';
+const otherEventToken = 'TK:AEAAE5ZVSQAFIRKBJUYDAMBQGQ2S2QJNK7C4BERAWRRSQFKIR4';
+
+void main() {
+  final now = DateTime.utc(2030, 1, 1);
+
+  test('verifies a backend-signed token', () {
+    final ticket = TicketToken.verify(token, key: 'test-key', event: 1, now: now);
+    expect(ticket.serialCode, 'TEAM000045-A-W');
+    expect(ticket.expiresAt, 2000000000);
+  });
+
+  test('rejects wrong key, other event and expired tokens', () {
+    expect(() => TicketToken.verify(token, key: 'other', event: 1, now: now),
+        throwsA(isA<TicketTokenException>()));
+    expect(() => TicketToken.verify(otherEventToken, key: 'test-key', event: 1, now: now),
+        throwsA(isA<TicketTokenException>()));
+    expect(() => TicketToken.verify(token, key: 'test-key', event: 1, now: DateTime.utc(2040)),
+        throwsA(isA<TicketTokenException>()));
+  });
+
+  test('serial check digits match the backend', () {
+    expect(SerialCheck.isValid('TEAM000045-A-W'), isTrue);
+    expect(SerialCheck.isValid('EVT26-000001-A'), isTrue);
+    expect(SerialCheck.isValid('EVT26-000001-B'), isFalse);
+    expect(SerialCheck.isValid('EVT25-000123'), isTrue);
+  });
+}